@@ -0,0 +1,166 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError: #not available on Windows, spill files are then not locked
+    fcntl = None
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+class DatasetCache:
+    """
+    In process LRU cache of DataFrames under a memory budget, optionally spilled to Feather files.
+
+    Keys are tuples describing how a dataset was produced, their last item is the version of the
+    data, e.g. ("sql", db, query, table fingerprint) or ("parquet", path, options, file mtimes),
+    see ParquetReader / PostgresConnectorContextManager.
+    With spill_dir every loaded dataset is also written as an Arrow IPC (Feather) file named by
+    the hash of its key, so other xdist workers and later runs skip the load. Writing a new version
+    of a dataset removes the spill files of its older versions. Loads are serialized per dataset with
+    a file lock, so under xdist one worker materializes a dataset while the others wait and then map
+    the uncompressed file.
+    Cached DataFrames are returned as shallow copies, treat them as read only.
+    """
+
+    def __init__(self, max_bytes=1024 ** 3, spill_dir=None):
+        self.max_bytes = max_bytes #memory budget of the in process entries, 0 keeps nothing in memory
+        self.spill_dir = spill_dir #None = no spill
+        self.entries = OrderedDict() #key -> (df, size in bytes), least recently used first
+        self.size = 0
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @staticmethod
+    def key_hash(key):
+        return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+    def _spill_prefix(self, key):
+        #Shared by every version of a dataset
+        return self.key_hash(key[:-1])[:32]
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{self._spill_prefix(key)}-{self.key_hash(key)[:32]}.feather")
+
+    def _remove_old_versions(self, key, path):
+        prefix = f"{self._spill_prefix(key)}-"
+        for name in os.listdir(self.spill_dir):
+            old_path = os.path.join(self.spill_dir, name)
+            if name.startswith(prefix) and name.endswith(".feather") and old_path != path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass #already removed by another worker
+
+    @staticmethod
+    def _size(df):
+        return int(df.memory_usage(index=True, deep=True).sum())
+
+    def _remember(self, key, df):
+        #Keep df in memory and evict the least recently used entries until the budget is met
+        size = self._size(df)
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (df, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def _read_spill(self, key):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            #uncompressed files are mapped, Arrow buffers are not copied into the process
+            return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+        except Exception as e:
+            print(f"Could not read dataset cache file {path}: {e}")
+            return None
+
+    def _write_spill(self, key, df):
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            #written aside and renamed, so concurrent workers never read a partial file
+            feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp_path,
+                                  compression="uncompressed")
+            os.replace(tmp_path, path)
+            self._remove_old_versions(key, path)
+        except Exception as e:
+            #e.g. object columns Arrow can not convert, the dataset is only cached in memory
+            print(f"Could not spill dataset to {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get(self, key):
+        #Cached df or None, memory first then spill files
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy(deep=False)
+        df = self._read_spill(key)
+        if df is None:
+            return None
+        self.spill_hits += 1
+        self._remember(key, df)
+        return df.copy(deep=False)
+
+    def put(self, key, df):
+        self._remember(key, df)
+        self._write_spill(key, df)
+
+    @contextmanager
+    def _spill_lock(self, key):
+        #Exclusive lock of one dataset across processes, held while it is looked up and loaded
+        if not self.spill_dir or fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.spill_dir, f"{self._spill_prefix(key)}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_or_load(self, key, load):
+        #Return the cached df of key, or call load() and cache its result
+        #only one process loads a given dataset, the others wait for its spill file
+        with self._spill_lock(key):
+            df = self.get(key)
+            if df is not None:
+                print(f"Dataset cache hit: {key[0]} {self.key_hash(key)[:12]}")
+                return df
+            self.misses += 1
+            df = load()
+            self.put(key, df)
+        return df.copy(deep=False)
+
+    def clear(self):
+        #Drop the in process entries, spill files are kept
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {"hits": self.hits, "spill_hits": self.spill_hits, "misses": self.misses,
+                "entries": len(self.entries), "bytes": self.size}
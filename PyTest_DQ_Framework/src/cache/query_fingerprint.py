@@ -0,0 +1,65 @@
+#Cheap fingerprint of the tables a query reads, used to validate cached query results.
+#It changes when the data of any referenced table may have changed:
+# - etl_table_versions: version bumped by the data_dev loaders in the same transaction as their load,
+#   keyed by schema qualified table name (partitions use the row of their partitioned table)
+# - pg_stat_user_tables: inserted / updated / deleted tuple counters, for any other writer
+#   (the statistics are flushed asynchronously, a change can take up to a second to show)
+# - pg_relation_filenode: changes on TRUNCATE, VACUUM FULL, CLUSTER and table rewrites
+
+TABLE_FINGERPRINT_QUERY = """
+SELECT r.schema_name || '.' || r.relation_name AS relation,
+       pg_relation_filenode(c.oid) AS filenode,
+       s.n_tup_ins,
+       s.n_tup_upd,
+       s.n_tup_del,
+       root_ns.nspname || '.' || root.relname AS root_relation
+FROM unnest(%(schemas)s::text[], %(relations)s::text[]) AS r(schema_name, relation_name)
+JOIN pg_class c ON c.oid = to_regclass(format('%%I.%%I', r.schema_name, r.relation_name))
+JOIN pg_class root ON root.oid = COALESCE(pg_partition_root(c.oid), c.oid)
+JOIN pg_namespace root_ns ON root_ns.oid = root.relnamespace
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+ORDER BY 1
+"""
+
+TABLE_VERSIONS_QUERY = """
+SELECT table_name, version
+FROM etl_table_versions
+WHERE table_name = ANY(%(table_names)s)
+ORDER BY table_name
+"""
+
+
+def _plan_relations(plan, relations):
+    #Walk an EXPLAIN (FORMAT JSON) plan, subplans and CTEs are nested under "Plans"
+    if "Relation Name" in plan:
+        relations.add((plan.get("Schema", "public"), plan["Relation Name"]))
+    for child in plan.get("Plans", []):
+        _plan_relations(child, relations)
+
+
+def referenced_relations(cursor, sql):
+    #(schema, table) pairs the query reads, views are already expanded by the planner
+    cursor.execute(f"EXPLAIN (VERBOSE, FORMAT JSON) {sql.strip().rstrip(';')}")
+    explain = cursor.fetchone()[0]
+    relations = set()
+    for statement in explain:
+        _plan_relations(statement["Plan"], relations)
+    return sorted(relations)
+
+
+def table_fingerprint(cursor, relations):
+    #Tuple that changes whenever the data of one of the relations may have changed
+    if not relations:
+        return ()
+    cursor.execute(TABLE_FINGERPRINT_QUERY, {"schemas": [schema for schema, _ in relations],
+                                             "relations": [relation for _, relation in relations]})
+    tables = [tuple(row) for row in cursor.fetchall()]
+
+    versions = ()
+    cursor.execute("SELECT to_regclass('etl_table_versions') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        #partitions are versioned through their partitioned table, e.g. public.visits_p202401 -> public.visits
+        table_names = sorted({root for *_, root in tables})
+        cursor.execute(TABLE_VERSIONS_QUERY, {"table_names": table_names})
+        versions = tuple(tuple(row) for row in cursor.fetchall())
+    return tuple(tables), versions
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import threading
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+#Arrow IPC sidecar written next to a Parquet dataset by data_dev LoadParquet (arrow_sidecar=True).
+#It is only used when its manifest matches the Parquet files: same file list and same content hash,
+#computed like data_dev/src/data/arrow_sidecar.py parquet_content_hash.
+
+SIDECAR_FILE = "_sidecar.arrow"
+SIDECAR_MANIFEST = "_sidecar.json"
+SIDECAR_FORMAT_VERSION = 1
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+_verified_hashes = {} #(dataset path, files state) -> content hash, files are only hashed once per process
+_verified_lock = threading.Lock()
+
+
+def parquet_content_hash(full_path, files):
+    #sha256 over the relative path, a NUL byte and the bytes of every file, in order
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(file.encode("utf-8") + b"\0")
+        with open(os.path.join(full_path, file), "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _content_hash(full_path, files):
+    files_state = []
+    for file in files:
+        stat = os.stat(os.path.join(full_path, file))
+        files_state.append((file, stat.st_mtime_ns, stat.st_size))
+    key = (os.path.abspath(full_path), tuple(files_state))
+    with _verified_lock:
+        content_hash = _verified_hashes.get(key)
+    if content_hash is None:
+        content_hash = parquet_content_hash(full_path, files)
+        with _verified_lock:
+            _verified_hashes[key] = content_hash
+    return content_hash
+
+
+def read_sidecar(full_path, parquet_files):
+    """
+    Memory map the sidecar of the dataset at full_path as an Arrow table, None if it can not be used.
+
+    parquet_files are the files the caller would read otherwise, the sidecar is only returned when it was
+    written from exactly these files. Its buffers point into the mapped file, nothing is decoded or copied
+    except the partition columns, which are dictionary encoded again like the Parquet read does.
+    """
+    manifest_path = os.path.join(full_path, SIDECAR_MANIFEST)
+    sidecar_path = os.path.join(full_path, SIDECAR_FILE)
+    if not os.path.exists(manifest_path) or not os.path.exists(sidecar_path):
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        files = [os.path.relpath(file, full_path).replace(os.sep, "/") for file in parquet_files]
+        if manifest.get("format_version") != SIDECAR_FORMAT_VERSION or manifest.get("files") != sorted(files):
+            print(f"Arrow sidecar of {full_path} does not list the same Parquet files, ignored")
+            return None
+        if os.path.getsize(sidecar_path) != manifest.get("sidecar_bytes"):
+            print(f"Arrow sidecar of {full_path} has an unexpected size, ignored")
+            return None
+        if _content_hash(full_path, manifest["files"]) != manifest.get("parquet_sha256"):
+            print(f"Arrow sidecar of {full_path} does not match the Parquet content hash, ignored")
+            return None
+
+        table = pa.ipc.open_file(pa.memory_map(sidecar_path)).read_all()
+        if table.num_rows != manifest.get("num_rows"):
+            print(f"Arrow sidecar of {full_path} has {table.num_rows} rows instead of {manifest.get('num_rows')}, ignored")
+            return None
+        for column in manifest.get("dictionary_columns", []):
+            index = table.schema.get_field_index(column)
+            table = table.set_column(index, column, pc.dictionary_encode(table.column(column)))
+        print(f"Using Arrow sidecar of {full_path}: {table.num_rows} rows")
+        return table
+    except Exception as e:
+        print(f"Could not read Arrow sidecar of {full_path}: {e}")
+        return None
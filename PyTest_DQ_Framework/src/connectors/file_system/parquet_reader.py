@@ -1,52 +1,171 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import os
 import glob
+from concurrent.futures import ThreadPoolExecutor
+from src.connectors.file_system.arrow_sidecar import read_sidecar
+from src.data_quality.data_set_summary import summarize_batches
+from src.data_quality.reconciliation import filter_buckets, summarize_buckets
 
 class ParquetReader:
     """Provides functionality to read and process Parquet files"""
 
-    def __init__(self,base_path="/parquet_data"): #Default is "/parquet_data
+    def __init__(self,base_path="/parquet_data", max_workers=None, cache=None, prefer_sidecar=True): #Default is "/parquet_data
         self.base_path = base_path
+        self.max_workers = max_workers #None = ThreadPoolExecutor default, 1 = sequential read
+        self.cache = cache #optional DatasetCache shared by the reads of the session
+        self.prefer_sidecar = prefer_sidecar #memory map the verified Arrow sidecar of LoadParquet instead of decoding Parquet
 
-    def process(self,relative_path, include_subfolders=False):
+    @staticmethod
+    def _find_parquet_files(full_path, include_subfolders):
+        if include_subfolders: #recursive to check subfolders
+            pattern = os.path.join(full_path,"**","*.parquet")
+            parquet_files = glob.glob(pattern,recursive=True)
+        else: #only specify directory
+            pattern = os.path.join(full_path, "*.parquet")
+            parquet_files = glob.glob(pattern)
+
+        if not parquet_files:
+            raise FileNotFoundError (f"No parquet files found at : {full_path}")
+        print(f"Found {len(parquet_files)} parquet file(s) at: {full_path}")
+        return sorted(parquet_files) #sorted, so the output row order does not depend on the file system
+
+    @staticmethod
+    def _to_expression(filters):
+        #filters can be a pyarrow expression or DNF tuples, e.g. [("partition_date", "=", "2024-01")]
+        if filters is None or isinstance(filters, ds.Expression):
+            return filters
+        return pq.filters_to_expression(filters)
+
+    @staticmethod
+    def _open_dataset(full_path, parquet_files):
+        #Hive partitioning restores the partition keys (partition_date=...) as dictionary columns
+        return ds.dataset(
+            parquet_files,
+            format="parquet",
+            partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+            partition_base_dir=full_path
+        )
+
+    def _sidecar_dataset(self, full_path, parquet_files):
+        #In memory dataset over the mapped sidecar, None when there is none or it does not match the files
+        if not self.prefer_sidecar:
+            return None
+        table = read_sidecar(full_path, parquet_files)
+        return ds.dataset(table) if table is not None else None
+
+    @staticmethod
+    def _read_fragment(fragment, schema, columns, filter_expression):
+        try:
+            table = fragment.to_table(schema=schema, columns=columns, filter=filter_expression)
+            print(f"Successfully read: {os.path.basename(fragment.path)} - {table.num_rows} rows")
+            return table
+        except Exception as e:
+            print(f"Could not read {fragment.path}: {e}")
+            return None
+
+    def process(self,relative_path, include_subfolders=False, max_workers=None, columns=None, filters=None):
         #Read Parquet files and return dataframe
+        #columns: only read these column chunks, filters: prune partitions and filter rows
         full_path = os.path.join(self.base_path,relative_path)
+        max_workers = max_workers if max_workers is not None else self.max_workers
 
         try:
-            if include_subfolders: #recursive to check subfolders
-                pattern = os.path.join(full_path,"**","*.parquet")
-                parquet_files = glob.glob(pattern,recursive=True)
-            else: #only specify directory
-                pattern = os.path.join(full_path, "*.parquet")
-                parquet_files = glob.glob(pattern)
-
-            if not parquet_files:
-                raise FileNotFoundError (f"No parquet files found at : {full_path}")
-            print(f"Found {len(parquet_files)} parquet file(s) at: {full_path}")
-
-            #Read and process all parquet files
-            data_frames = []
-            for file_path in parquet_files:
-                try:
-                    df = pd.read_parquet(file_path)
-                    data_frames.append(df)
-                    print(f"Successfully read: {os.path.basename(file_path)} - {len(df)} rows")
-                except Exception as e:
-                    print(f"Could not read {file_path}: {e}")
-
-            if not data_frames:
-                raise Exception(f"No data could be read from Parquet files at: {full_path}")
-
-            if len(data_frames) == 1:
-                combined_df = data_frames[0]
-            else:
-                combined_df = pd.concat(data_frames, ignore_index=True)
+            parquet_files = self._find_parquet_files(full_path, include_subfolders)
+            if self.cache is None:
+                return self._read_files(full_path, parquet_files, max_workers, columns, filters)
+
+            #Files are part of the key with their mtime and size, a rewritten dataset is read again
+            files_state = []
+            for file in parquet_files:
+                stat = os.stat(file)
+                files_state.append((os.path.relpath(file, full_path), stat.st_mtime_ns, stat.st_size))
+            key = ("parquet", os.path.abspath(full_path), include_subfolders,
+                   tuple(columns) if columns is not None else None, repr(filters), tuple(files_state))
+            return self.cache.get_or_load(
+                key, lambda: self._read_files(full_path, parquet_files, max_workers, columns, filters)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to process parquet files from {full_path}: {e}")
 
+    def _read_files(self, full_path, parquet_files, max_workers, columns, filters):
+        #Read the found files into one dataframe
+        filter_expression = self._to_expression(filters)
+        sidecar = self._sidecar_dataset(full_path, parquet_files)
+        if sidecar is not None:
+            #Same rows and schema as the Parquet read, only the selected columns are converted
+            combined_df = sidecar.to_table(columns=columns, filter=filter_expression).to_pandas()
             print(f"Combined Dataframe shape: {combined_df.shape}")
             return combined_df
 
-        except Exception as e:
-            raise Exception(f"Failed to process parquet files from {full_path}: {e}")
+        dataset = self._open_dataset(full_path, parquet_files)
+
+        #Partition pruning: only files whose partition keys can match the filter are read
+        fragments = list(dataset.get_fragments(filter=filter_expression))
+        if len(fragments) < len(parquet_files):
+            print(f"Partition pruning kept {len(fragments)} of {len(parquet_files)} file(s)")
+        if not fragments:
+            return dataset.schema.empty_table().select(columns or dataset.schema.names).to_pandas()
+
+        def read(fragment):
+            return self._read_fragment(fragment, dataset.schema, columns, filter_expression)
+
+        #Read all parquet files in parallel, map keeps the tables in file order
+        if max_workers == 1 or len(fragments) == 1:
+            tables = [read(fragment) for fragment in fragments]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                tables = list(executor.map(read, fragments))
+        tables = [table for table in tables if table is not None]
+
+        if not tables:
+            raise Exception(f"No data could be read from Parquet files at: {full_path}")
+
+        #Concatenate once at the Arrow level and convert to pandas only once
+        combined_table = pa.concat_tables(tables, promote_options="default")
+        combined_df = combined_table.to_pandas()
+
+        print(f"Combined Dataframe shape: {combined_df.shape}")
+        return combined_df
+
+    def iter_batches(self, relative_path, include_subfolders=False, batch_size=65536, columns=None, filters=None):
+        #Stream Parquet files as Arrow record batches, only one batch is decoded at a time
+        full_path = os.path.join(self.base_path, relative_path)
+        parquet_files = self._find_parquet_files(full_path, include_subfolders)
+        dataset = self._sidecar_dataset(full_path, parquet_files)
+        if dataset is None:
+            dataset = self._open_dataset(full_path, parquet_files)
+
+        yield from dataset.to_batches(
+            columns=columns,
+            filter=self._to_expression(filters),
+            batch_size=batch_size
+        )
+
+    def summarize(self, relative_path, spec, include_subfolders=False, filters=None):
+        #Aggregate summary (see data_set_summary.SummarySpec) computed with Arrow, only the spec columns are read
+        return summarize_batches(
+            self.iter_batches(relative_path, include_subfolders, columns=spec.columns(), filters=filters),
+            spec
+        )
+
+    def summarize_buckets(self, relative_path, spec, include_subfolders=False, filters=None):
+        #Per bucket row counts and checksums (see reconciliation.BucketSpec), only the spec columns are read
+        return summarize_buckets(
+            self.iter_batches(relative_path, include_subfolders, columns=spec.columns(), filters=filters),
+            spec
+        )
+
+    def read_buckets(self, relative_path, spec, buckets, include_subfolders=False, filters=None):
+        #Rows that fall into the given buckets as a dataframe, streamed so other buckets are never held in memory
+        table = filter_buckets(
+            self.iter_batches(relative_path, include_subfolders, columns=spec.columns(), filters=filters),
+            spec,
+            buckets
+        )
+        return table.to_pandas()
 
     def read_single_file(self, file_path):
         try:
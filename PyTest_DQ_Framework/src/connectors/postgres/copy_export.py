@@ -0,0 +1,91 @@
+import io
+from decimal import Decimal
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import psycopg2.extensions
+
+#Postgres type OID -> Arrow type the CSV column is parsed into
+#numeric (1700) is kept as text and turned into Decimal afterwards, like psycopg2 does
+COPY_ARROW_TYPES = {
+    16: pa.bool_(),              # bool
+    20: pa.int64(),              # int8
+    21: pa.int64(),              # int2
+    23: pa.int64(),              # int4
+    700: pa.float64(),           # float4
+    701: pa.float64(),           # float8
+    1082: pa.date32(),           # date
+    1114: pa.timestamp("us"),    # timestamp
+    1184: pa.timestamp("us", "UTC"),  # timestamptz, COPY writes it with the session UTC offset
+    25: pa.string(),             # text
+    1042: pa.string(),           # bpchar
+    1043: pa.string(),           # varchar
+    19: pa.string(),             # name
+}
+NUMERIC_OID = 1700
+
+
+def _strip_query(sql):
+    return sql.strip().rstrip(";")
+
+
+def describe_query(cursor, sql):
+    #Column names and type OIDs of a query, without fetching any row
+    cursor.execute(f"SELECT * FROM ({_strip_query(sql)}) AS copy_query LIMIT 0")
+    return [(desc[0], desc[1]) for desc in cursor.description]
+
+
+def copy_query_to_table(cursor, sql, columns=None):
+    """
+    Run COPY (sql) TO STDOUT in CSV format and parse the stream with the Arrow CSV reader.
+
+    Returns the Arrow table and the (name, type oid) description of its columns.
+    Columns with a type missing from COPY_ARROW_TYPES are returned as text.
+    """
+    columns = columns or describe_query(cursor, sql)
+    #positional names, the query itself may return duplicated column names
+    positional = [f"c{i}" for i in range(len(columns))]
+    column_types = {name: COPY_ARROW_TYPES.get(oid, pa.string()) for name, (_, oid) in zip(positional, columns)}
+
+    buffer = io.BytesIO()
+    cursor.copy_expert(f"COPY ({_strip_query(sql)}) TO STDOUT WITH (FORMAT csv)", buffer)
+    buffer.seek(0)
+
+    table = pa_csv.read_csv(
+        buffer,
+        read_options=pa_csv.ReadOptions(column_names=positional),
+        #quoted values may span lines, an empty line is a row whose single column is NULL
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True, ignore_empty_lines=False),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            null_values=[""],  # COPY writes NULL as an unquoted empty field
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,  # "" is an empty string, not NULL
+            true_values=["t"],
+            false_values=["f"]
+        )
+    )
+    return table, columns
+
+
+def copy_query_to_df(cursor, sql):
+    """COPY based equivalent of fetchall() + pd.DataFrame, with the same column types"""
+    table, columns = copy_query_to_table(cursor, sql)
+    df = table.to_pandas()
+    df.columns = [name for name, _ in columns]
+
+    for position, (_, oid) in enumerate(columns):
+        if oid in COPY_ARROW_TYPES:
+            continue
+        values = table.column(position).to_pylist()
+        if oid == NUMERIC_OID:
+            converted = [None if value is None else Decimal(value) for value in values]
+        else:
+            #any other type: let psycopg2 cast the text exactly as the DB-API path would
+            caster = psycopg2.extensions.string_types.get(oid)
+            if caster is None:
+                continue
+            converted = [caster(value, cursor) for value in values]
+        df.isetitem(position, pd.Series(converted, dtype=object, index=df.index))
+    return df
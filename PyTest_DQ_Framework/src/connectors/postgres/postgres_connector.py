@@ -1,17 +1,30 @@
 
+import uuid
 import psycopg2
 import psycopg2.extras
 import pandas as pd
 
+from src.connectors.postgres.copy_export import copy_query_to_df, describe_query
+from src.data_quality.data_set_summary import summary_query, summary_from_row
+from src.data_quality.reconciliation import bucket_summary_query, bucket_rows_query
+from src.cache.query_fingerprint import referenced_relations, table_fingerprint
+
 class PostgresConnectorContextManager:
-    def __init__(self, db_host: str, db_name: str, db_port: int, db_user:str, db_password: str ):
+    def __init__(self, db_host: str, db_name: str, db_port: int, db_user:str, db_password: str,
+                 itersize: int = 10000, cache=None, lazy: bool = False):
         self.db_user = db_user
         self.db_password = db_password
         self.db_name = db_name
         self.db_port = db_port
         self.db_host = db_host
+        self.itersize = itersize #default rows per fetchmany round trip of server side (named) cursors
+        self.cache = cache #optional DatasetCache, query results are keyed by database, query text and table fingerprint
+        self.query_relations = {} #query text -> tables it reads, see query_fingerprint
+        self.lazy = lazy #connect on first use instead of __enter__, e.g. xdist workers served by the shared cache
+        self.connection = None
+        self._cursor = None
 
-    def __enter__(self):
+    def _connect(self):
         # create connection
         try:
             self.connection = psycopg2.connect(user=self.db_user,
@@ -20,28 +33,68 @@ class PostgresConnectorContextManager:
                                                database = self.db_name,
                                                port = self.db_port
                                                )
-            self.cursor = self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            return self
+            self._cursor = self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
         except Exception as e:
             raise Exception (f"Unable to connect to PostreSQL: {e}")
 
+    @property
+    def cursor(self):
+        #a lazy connector opens its connection here, the first time a query needs it
+        if self._cursor is None and self.lazy:
+            self._connect()
+        return self._cursor
+
+    def __enter__(self):
+        if not self.lazy:
+            self._connect()
+        return self
+
     def __exit__(self, exc_type, exc_value, exc_tb):
         # close conn
         """Closing the connection """
         try:
-            if self.cursor:
-                self.cursor.close()
-            if self.cursor.connection:
+            if self._cursor:
+                self._cursor.close()
+            if self.connection:
                 self.connection.close()
         except Exception as e:
             print(f"DB connection failed to close: {e}")
 
-    def get_data_sql(self, sql):
+    def _cache_key(self, sql):
+        #get_data_sql and get_data_copy return the same dataframe, they share cache entries
+        #the fingerprint of the read tables is the last part of the key, so persisted results of
+        #a query are replaced as soon as its tables change. None = the query can not be cached
+        sql = sql.strip()
+        try:
+            if sql not in self.query_relations:
+                self.query_relations[sql] = referenced_relations(self.cursor, sql)
+            fingerprint = table_fingerprint(self.cursor, self.query_relations[sql])
+        except Exception as e:
+            self.connection.rollback()
+            print(f"Query result is not cached, could not fingerprint its tables: {e}")
+            return None
+        return ("sql", self.db_host, self.db_port, self.db_name, sql, fingerprint)
+
+    def _cached(self, sql, load):
+        key = self._cache_key(sql) if self.cache is not None else None
+        if key is None:
+            return load()
+        return self.cache.get_or_load(key, load)
+
+    def get_data_sql(self, sql, server_side=False):
         # exec query, result = pandas df
         """Execute SQL query to get pandas dataframe"""
+        return self._cached(sql, lambda: self._get_data_sql(sql, server_side))
+
+    def _get_data_sql(self, sql, server_side):
         if not self.cursor:
             raise Exception("Unable to established connection with the DB ")
 
+        if server_side:
+            #rows are fetched in itersize batches as plain tuples, no DictRow copy
+            chunks = list(self.get_data_sql_chunks(sql))
+            return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
         try:
             self.cursor.execute(sql)
             #getting the column names
@@ -55,3 +108,91 @@ class PostgresConnectorContextManager:
         except Exception as e:
             raise Exception(f"Failed to execute SQL query {e}")
 
+    def get_data_copy(self, sql):
+        # exec query through COPY ... TO STDOUT, result = pandas df
+        """Execute SQL query via COPY and get pandas dataframe with the same types as get_data_sql"""
+        return self._cached(sql, lambda: self._get_data_copy(sql))
+
+    def _get_data_copy(self, sql):
+        if not self.cursor:
+            raise Exception("Unable to established connection with the DB ")
+
+        try:
+            return copy_query_to_df(self.cursor, sql)
+        except Exception as e:
+            self.connection.rollback()
+            raise Exception(f"Failed to execute SQL query via COPY {e}")
+
+    def get_data_summary(self, sql, spec):
+        # exec the aggregates of a SummarySpec server side, result = one DataSetSummary
+        """Summarize the result of a SQL query in Postgres (counts, nulls, ranges, distinct keys, checksum)"""
+        if not self.cursor:
+            raise Exception("Unable to established connection with the DB ")
+
+        try:
+            columns = describe_query(self.cursor, sql)
+            self.cursor.execute(summary_query(sql, columns, spec))
+            return summary_from_row(self.cursor.fetchone(), columns, spec)
+        except ValueError:
+            raise
+        except Exception as e:
+            self.connection.rollback()
+            raise Exception(f"Failed to summarize SQL query {e}")
+
+    def get_bucket_summary(self, sql, spec):
+        # exec the per bucket counts and checksums of a BucketSpec server side
+        """Return {bucket: (row count, checksum)} of the result of a SQL query, computed in Postgres"""
+        if not self.cursor:
+            raise Exception("Unable to established connection with the DB ")
+
+        try:
+            columns = describe_query(self.cursor, sql)
+            self.cursor.execute(bucket_summary_query(sql, columns, spec))
+            return {row[0]: (int(row[1]), int(row[2])) for row in self.cursor.fetchall()}
+        except ValueError:
+            raise
+        except Exception as e:
+            self.connection.rollback()
+            raise Exception(f"Failed to summarize SQL query buckets {e}")
+
+    def get_bucket_rows(self, sql, spec, buckets):
+        # exec query filtered on some buckets of a BucketSpec, result = pandas df
+        """Get the rows of a SQL query that fall into the given buckets"""
+        if not self.cursor:
+            raise Exception("Unable to established connection with the DB ")
+
+        try:
+            columns = describe_query(self.cursor, sql)
+        except Exception as e:
+            self.connection.rollback()
+            raise Exception(f"Failed to execute SQL query {e}")
+        return self.get_data_sql(bucket_rows_query(sql, columns, spec, buckets))
+
+    def get_data_sql_chunks(self, sql, chunk_size=None):
+        # exec query on a server side cursor, yields pandas df chunks
+        """Stream the result of a SQL query as pandas dataframes of chunk_size rows"""
+        if not self.cursor:
+            raise Exception("Unable to established connection with the DB ")
+
+        chunk_size = chunk_size or self.itersize
+        #named cursor = server side, the result set stays in Postgres until fetched
+        cursor = self.connection.cursor(name=f"dqe_{uuid.uuid4().hex}")
+        try:
+            cursor.execute(sql)
+            yielded = False
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows and yielded:
+                    break
+                columns = [desc[0] for desc in cursor.description]
+                yield pd.DataFrame.from_records(rows, columns=columns)
+                yielded = True
+                if len(rows) < chunk_size:
+                    break
+        except Exception as e:
+            #failed statement aborts the transaction, keep the connection usable
+            self.connection.rollback()
+            raise Exception(f"Failed to execute SQL query {e}")
+        finally:
+            if not cursor.closed:
+                cursor.close()
@@ -0,0 +1,307 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.data_quality.data_set_diff import row_hashes
+
+
+# Declarative checks. They only describe what to validate, CheckSuite decides how.
+
+@dataclass
+class NotEmptyCheck:
+    name: str = "not_empty"
+
+
+@dataclass
+class NotNullCheck:
+    column_names: Optional[List[str]] = None
+    name: str = "not_null"
+
+
+@dataclass
+class ValueRangeCheck:
+    column_name: str
+    min_value: Any = None
+    max_value: Any = None
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.name is None:
+            self.name = f"value_range[{self.column_name}]"
+
+
+@dataclass
+class AllowedValuesCheck:
+    column_name: str
+    allowed_values: List[Any] = field(default_factory=list)
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.name is None:
+            self.name = f"allowed_values[{self.column_name}]"
+
+
+@dataclass
+class DuplicatesCheck:
+    column_names: Optional[List[str]] = None
+    name: str = "duplicates"
+
+
+@dataclass
+class CheckResult:
+    name: str
+    passed: bool
+    failed_count: int = 0
+    message: Optional[str] = None
+
+    def assert_passed(self):
+        assert self.passed, self.message
+
+
+@dataclass
+class CheckSuiteResult:
+    """Combined outcome of a CheckSuite run, results are keyed by check name"""
+    results: Dict[str, CheckResult]
+    row_count: int
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    @property
+    def passed(self):
+        return all(result.passed for result in self.results.values())
+
+    @property
+    def failures(self):
+        return [result for result in self.results.values() if not result.passed]
+
+    def assert_passed(self):
+        messages = [f"{result.name}: {result.message}" for result in self.failures]
+        assert not messages, "\n".join(messages)
+
+
+class _ColumnAccumulator:
+    """Collects everything the suite needs from one column in a single pass"""
+
+    def __init__(self, column_name):
+        self.column_name = column_name
+        self.ranges = []  # (min_value, max_value)
+        self.allowed = []  # allowed values lists
+        self.null_count = 0
+        self.below_min = {}
+        self.above_max = {}
+        self.invalid_count = {}
+        self.invalid_sample = {}
+
+    def add_range(self, min_value, max_value):
+        key = (min_value, max_value)
+        if key not in self.below_min:
+            self.ranges.append(key)
+            self.below_min[key] = 0
+            self.above_max[key] = 0
+        return key
+
+    def add_allowed(self, allowed_values):
+        key = len(self.allowed)
+        self.allowed.append(allowed_values)
+        self.invalid_count[key] = 0
+        self.invalid_sample[key] = []
+        return key
+
+    def update(self, series):
+        if not self.ranges and not self.allowed:
+            self.null_count += int(series.isna().sum())
+            return
+
+        #One hash pass per column, every check is then evaluated on the distinct values
+        value_counts = series.value_counts(dropna=False, sort=False)
+        uniques = pd.Series(value_counts.index.to_numpy())
+        counts = value_counts.to_numpy()
+
+        self.null_count += int(counts[uniques.isna().to_numpy()].sum())
+
+        for min_value, max_value in self.ranges:
+            key = (min_value, max_value)
+            if min_value is not None:
+                self.below_min[key] += int(counts[(uniques < min_value).to_numpy()].sum())
+            if max_value is not None:
+                self.above_max[key] += int(counts[(uniques > max_value).to_numpy()].sum())
+
+        for key, allowed_values in enumerate(self.allowed):
+            invalid = ~uniques.isin(allowed_values).to_numpy()
+            self.invalid_count[key] += int(counts[invalid].sum())
+            sample = self.invalid_sample[key]
+            if len(sample) < 5:
+                candidates = uniques[invalid]
+                candidates = candidates[~candidates.isin(sample)]  # distinct across batches too
+                sample.extend(candidates.head(5 - len(sample)).tolist())
+
+
+class _DuplicatesAccumulator:
+    """
+    Keeps one uint64 hash per row of the checked column subset.
+
+    Rows are counted as duplicates when their 64 bit hashes are equal, not by comparing
+    values like df.duplicated, so a hash collision (odds of about n^2 / 2^65 for n rows)
+    would count two different rows. -0.0 is folded into 0.0 first, as df.duplicated
+    treats them as equal.
+    """
+
+    def __init__(self, column_names):
+        self.column_names = column_names
+        self.hashes = []
+
+    def update(self, df):
+        subset = df[self.column_names] if self.column_names else df
+        float_positions = [i for i, dtype in enumerate(subset.dtypes) if pd.api.types.is_float_dtype(dtype)]
+        if float_positions:
+            subset = subset.copy()
+            for i in float_positions:
+                subset.isetitem(i, subset.iloc[:, i] + 0.0)  # -0.0 + 0.0 == 0.0
+        self.hashes.append(row_hashes(subset))
+
+    def duplicates_count(self):
+        if not self.hashes:
+            return 0
+        counts = pd.Series(np.concatenate(self.hashes)).value_counts()
+        return int(counts[counts > 1].sum())
+
+
+class CheckSuite:
+    """
+    Runs a list of declarative checks against one DataFrame.
+
+    Checks are compiled into one accumulator per column, so null counts, range
+    violations and allowed-value misses for a column come from a single pass
+    instead of one scan per check.
+    """
+
+    def __init__(self, checks):
+        if not isinstance(checks, list):
+            raise TypeError(f"checks must be a list, got {type(checks)}")
+        names = [check.name for check in checks]
+        duplicated_names = {name for name in names if names.count(name) > 1}
+        if duplicated_names:
+            raise ValueError(f"Check names must be unique, duplicated: {sorted(duplicated_names)}")
+        self.checks = checks
+
+    def _compile(self, columns):
+        #Validate the checks against the available columns and build the accumulators
+        #columns is None when no batch was read, the referenced columns can not be validated then
+        column_plans = {}
+        duplicate_plans = {}
+        bindings = []
+
+        def column_plan(column_name):
+            if columns is not None and column_name not in columns:
+                raise ValueError(f"Column '{column_name}' not found in DataFrame")
+            if column_name not in column_plans:
+                column_plans[column_name] = _ColumnAccumulator(column_name)
+            return column_plans[column_name]
+
+        for check in self.checks:
+            if isinstance(check, NotEmptyCheck):
+                bindings.append((check, None))
+            elif isinstance(check, NotNullCheck):
+                column_names = check.column_names if check.column_names is not None else list(columns or [])
+                if not isinstance(column_names, list):
+                    raise TypeError(f"column_names must be a list, got {type(column_names)}")
+                bindings.append((check, [column_plan(column) for column in column_names]))
+            elif isinstance(check, ValueRangeCheck):
+                plan = column_plan(check.column_name)
+                bindings.append((check, (plan, plan.add_range(check.min_value, check.max_value))))
+            elif isinstance(check, AllowedValuesCheck):
+                if not isinstance(check.allowed_values, list):
+                    raise TypeError(f"allowed_values must be a list, got {type(check.allowed_values)}")
+                plan = column_plan(check.column_name)
+                bindings.append((check, (plan, plan.add_allowed(check.allowed_values))))
+            elif isinstance(check, DuplicatesCheck):
+                for column in check.column_names or []:
+                    if columns is not None and column not in columns:
+                        raise ValueError(f"Column '{column}' not found in DataFrame")
+                key = tuple(check.column_names or ())
+                if key not in duplicate_plans:
+                    duplicate_plans[key] = _DuplicatesAccumulator(check.column_names)
+                bindings.append((check, duplicate_plans[key]))
+            else:
+                raise TypeError(f"Unsupported check type: {type(check)}")
+
+        return column_plans, duplicate_plans, bindings
+
+    def _execute(self, frames):
+        column_plans = duplicate_plans = bindings = None
+        row_count = 0
+        for df in frames:
+            if bindings is None:
+                column_plans, duplicate_plans, bindings = self._compile(df.columns.tolist())
+            row_count += len(df)
+            for column_name, plan in column_plans.items():
+                plan.update(df[column_name])
+            for plan in duplicate_plans.values():
+                plan.update(df)
+
+        if bindings is None:
+            #An empty stream (e.g. a dataset without rows) fails not_empty like an empty DataFrame
+            column_plans, duplicate_plans, bindings = self._compile(None)
+        results = {check.name: self._result(check, binding, row_count) for check, binding in bindings}
+        return CheckSuiteResult(results=results, row_count=row_count)
+
+    @staticmethod
+    def _result(check, binding, row_count):
+        if isinstance(check, NotEmptyCheck):
+            return CheckResult(check.name, row_count > 0, 0 if row_count else 1,
+                               None if row_count else "Dataframe is empty")
+
+        if isinstance(check, NotNullCheck):
+            messages = [f"Column '{plan.column_name}' has {plan.null_count} null values"
+                        for plan in binding if plan.null_count]
+            failed = sum(plan.null_count for plan in binding)
+            return CheckResult(check.name, failed == 0, failed, "; ".join(messages) or None)
+
+        if isinstance(check, ValueRangeCheck):
+            plan, key = binding
+            below, above = plan.below_min[key], plan.above_max[key]
+            messages = []
+            if below:
+                messages.append(f"Column '{plan.column_name}' has {below} values below minimum {check.min_value}")
+            if above:
+                messages.append(f"Column '{plan.column_name}' has {above} values above maximum {check.max_value}")
+            return CheckResult(check.name, not messages, below + above, "; ".join(messages) or None)
+
+        if isinstance(check, AllowedValuesCheck):
+            plan, key = binding
+            invalid_count = plan.invalid_count[key]
+            if not invalid_count:
+                return CheckResult(check.name, True)
+            sample_invalid = plan.invalid_sample[key]
+            message = f"Column '{plan.column_name}' has {invalid_count} invalid values"
+            if invalid_count > 5:
+                message += f" (sample: {sample_invalid}...)"
+            else:
+                message += f": {sample_invalid}"
+            return CheckResult(check.name, False, invalid_count, message)
+
+        duplicates_count = binding.duplicates_count()
+        return CheckResult(check.name, duplicates_count == 0, duplicates_count,
+                           f"Found {duplicates_count} duplicate records" if duplicates_count else None)
+
+    def run(self, df):
+        """Run every check against df with one pass per referenced column"""
+        return self._execute([df])
+
+    def run_batches(self, batches):
+        """
+        Run every check over an iterable of DataFrames or Arrow record batches.
+
+        Partial results are accumulated batch by batch, so only one batch is held in
+        memory at a time. The duplicates check keeps one 8 byte hash per row.
+        An empty iterable is checked as an empty DataFrame: not_empty fails and
+        the other checks pass, their columns can not be validated.
+        """
+        return self._execute(self._to_frames(batches))
+
+    @staticmethod
+    def _to_frames(batches):
+        for batch in batches:
+            yield batch if isinstance(batch, pd.DataFrame) else batch.to_pandas()
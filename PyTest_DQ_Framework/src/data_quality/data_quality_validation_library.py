@@ -1,5 +1,9 @@
 import pandas as pd
 
+from src.data_quality.check_suite import CheckSuite
+from src.data_quality.data_set_diff import compare_data_sets
+from src.data_quality.reconciliation import ReconciliationResult, mismatched_buckets
+
 
 class DataQualityLibrary:
     """
@@ -22,18 +26,50 @@ class DataQualityLibrary:
         assert duplicates_count == 0, f"Found {duplicates_count} duplicate records"
 
     @staticmethod
-    #Compare row counts btw dataframes
+    #Compare row counts btw dataframes, also accepts DataSetSummary objects
     def check_count(df1, df2):
         count1 = len(df1)
         count2 = len(df2)
         assert count1 == count2, f"Count mismatch: {count1} vs {count2}"
 
     @staticmethod
-    #Check if the dfs have same data
-    def check_data_full_data_set(df1, df2):
-        set1 = set(df1.itertuples(index=False, name=None))
-        set2 = set(df2.itertuples(index=False, name=None))
-        assert set1 == set2, f"Dataframe data does not match"
+    #Compare aggregate summaries (db_connection.get_data_summary vs parquet_reader.summarize)
+    def check_summary(summary1, summary2):
+        mismatches = summary1.compare(summary2)
+        assert not mismatches, "Summary mismatch: " + "; ".join(mismatches)
+
+    @staticmethod
+    #Get the row level differences btw dataframes (missing, extra, duplicate count mismatches)
+    def get_data_set_diff(df1, df2, column_names=None):
+        return compare_data_sets(df1, df2, column_names)
+
+    @staticmethod
+    #Check if the dfs have same data, rows are compared as multisets of hashes
+    #df1 can also be an iterable of df chunks, e.g. db_connection.get_data_sql_chunks(query)
+    def check_data_full_data_set(df1, df2, column_names=None):
+        diff = compare_data_sets(df1, df2, column_names)
+        assert diff.is_equal, f"Dataframe data does not match: {diff.summary()}"
+
+    @staticmethod
+    #Compare a source query with a parquet dataset bucket by bucket (see reconciliation.BucketSpec)
+    #Only per bucket counts and checksums are transferred, full rows are read for the mismatched buckets only
+    def reconcile_data_sets(db_connection, sql, parquet_reader, relative_path, spec, include_subfolders=True):
+        source_buckets = db_connection.get_bucket_summary(sql, spec)
+        target_buckets = parquet_reader.summarize_buckets(relative_path, spec, include_subfolders)
+        mismatched = mismatched_buckets(source_buckets, target_buckets)
+        diff = None
+        if mismatched:
+            source_rows = db_connection.get_bucket_rows(sql, spec, mismatched)
+            target_rows = parquet_reader.read_buckets(relative_path, spec, mismatched, include_subfolders)
+            diff = compare_data_sets(source_rows, target_rows, spec.checksum_columns)
+        return ReconciliationResult(source_buckets, target_buckets, mismatched, diff)
+
+    @staticmethod
+    #Same as check_data_full_data_set, through reconcile_data_sets
+    def check_reconciliation(db_connection, sql, parquet_reader, relative_path, spec, include_subfolders=True):
+        result = DataQualityLibrary.reconcile_data_sets(db_connection, sql, parquet_reader, relative_path,
+                                                        spec, include_subfolders)
+        assert result.is_equal, f"Dataframe data does not match: {result.summary()}"
 
     @staticmethod
     #Check if the df has data
@@ -71,6 +107,16 @@ class DataQualityLibrary:
             above_max = (df[column_name] > max_value).sum()
             assert above_max == 0, f"Column '{column_name}' has {above_max} values above maximum {max_value}"
 
+    @staticmethod
+    #Run a list of declarative checks (see check_suite) in one pass over the df
+    def run_check_suite(df, checks):
+        return CheckSuite(checks).run(df)
+
+    @staticmethod
+    #Same as run_check_suite but over streamed batches (e.g. ParquetReader.iter_batches)
+    def run_check_suite_batches(batches, checks):
+        return CheckSuite(checks).run_batches(batches)
+
     @staticmethod
     #Check if values in a column are in the allowed list
     def check_allowed_values(df, column_name, allowed_values):
@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+
+
+@dataclass
+class DataSetDiff:
+    """
+    Structured result of comparing two DataFrames as multisets of rows.
+
+    missing_rows: rows of df1 whose value combination is absent from df2.
+    extra_rows: rows of df2 whose value combination is absent from df1.
+    count_mismatches: one row per value combination present in both frames but
+        with a different number of occurrences, plus 'count_df1' / 'count_df2'.
+    """
+    missing_rows: pd.DataFrame
+    extra_rows: pd.DataFrame
+    count_mismatches: pd.DataFrame
+
+    @property
+    def is_equal(self):
+        return self.missing_rows.empty and self.extra_rows.empty and self.count_mismatches.empty
+
+    def summary(self, sample_size=5):
+        #Short human readable description, used in assertion messages
+        parts = [f"{len(self.missing_rows)} missing row(s)",
+                 f"{len(self.extra_rows)} extra row(s)",
+                 f"{len(self.count_mismatches)} duplicate count mismatch(es)"]
+        message = ", ".join(parts)
+        for label, frame in (("missing", self.missing_rows),
+                             ("extra", self.extra_rows),
+                             ("count mismatch", self.count_mismatches)):
+            if not frame.empty:
+                sample = frame.head(sample_size).to_dict(orient="records")
+                message += f"\n  {label} sample: {sample}"
+        return message
+
+
+def _canonical_column(series, like=None):
+    """
+    Cast a column to the dtype it is hashed with.
+
+    DB-API python objects (Decimal, date, int) are converted to the dtypes parquet
+    gives us, numbers are hashed as float64 and datetimes as datetime64[ns], so the
+    same value hashes equally on both sides. 'like' is the canonical column of the
+    other side and is used when this side can not tell (e.g. an all-null chunk).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(series.cat.categories.dtype)
+    if series.dtype == object:
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        if kind in ("decimal", "integer", "floating", "mixed-integer-float"):
+            series = pd.to_numeric(series)
+        elif kind in ("date", "datetime", "datetime64"):
+            series = pd.to_datetime(series)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        series = series.astype("float64")
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        series = series.astype("datetime64[ns]")
+    if like is not None and series.dtype != like.dtype and series.isna().all():
+        series = series.astype(like.dtype)
+    return series
+
+
+def _resolve_columns(column_names, *frames):
+    if not isinstance(column_names, list):
+        raise TypeError(f"column_names must be a list, got {type(column_names)}")
+    for column in column_names:
+        for df in frames:
+            if column not in df.columns:
+                raise ValueError(f"Column '{column}' not found in DataFrame")
+    return column_names
+
+
+def canonical_frame(df, column_names, like=None):
+    """Select column_names in that order, with every column cast to its canonical dtype"""
+    return pd.DataFrame({
+        column: _canonical_column(df[column], None if like is None else like[column])
+        for column in column_names
+    })
+
+
+def row_hashes(df):
+    """One uint64 per row, computed column by column in a vectorized way"""
+    if df.empty:
+        return np.empty(0, dtype="uint64")
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _hash_counts(hashes, name):
+    return pd.Series(hashes, dtype="uint64").value_counts().rename(name)
+
+
+def build_diff(missing_rows, hashes1, df2, hashes2):
+    """
+    Turn row hashes of both sides into a DataSetDiff.
+
+    missing_rows are the df1 rows whose hash does not occur in df2, they are
+    passed in because df1 may have been streamed. Extra rows and count
+    mismatches are pulled back from df2 for the hashes that disagree.
+    """
+    counts = pd.concat([_hash_counts(hashes1, "count_df1"),
+                        _hash_counts(hashes2, "count_df2")], axis=1).fillna(0).astype("int64")
+    counts = counts[counts["count_df1"] != counts["count_df2"]]
+    extra = counts.index[counts["count_df1"] == 0].to_numpy()
+    mismatched = counts[(counts["count_df1"] > 0) & (counts["count_df2"] > 0)]
+
+    extra_rows = df2.iloc[np.flatnonzero(np.isin(hashes2, extra))].reset_index(drop=True)
+
+    #Mismatched rows exist on both sides, one representative per hash is enough
+    first_seen = ~pd.Series(hashes2).duplicated().to_numpy()
+    positions = np.flatnonzero(np.isin(hashes2, mismatched.index.to_numpy()) & first_seen)
+    count_mismatches = df2.iloc[positions].reset_index(drop=True)
+    matched_counts = mismatched.loc[hashes2[positions]]
+    count_mismatches["count_df1"] = matched_counts["count_df1"].to_numpy()
+    count_mismatches["count_df2"] = matched_counts["count_df2"].to_numpy()
+
+    return DataSetDiff(missing_rows=missing_rows.reset_index(drop=True),
+                       extra_rows=extra_rows,
+                       count_mismatches=count_mismatches)
+
+
+def _compare_chunks(chunks, df2, column_names):
+    #df1 is streamed: keep its hashes (8 bytes per row) and only the rows df2 does not have
+    right = None
+    hashes2 = known_hashes = None
+    hashes1 = []
+    missing_parts = []
+    for chunk in chunks:
+        if right is None:
+            if column_names is None:
+                column_names = chunk.columns.tolist()
+            column_names = _resolve_columns(column_names, chunk, df2)
+            right = canonical_frame(df2, column_names)
+            hashes2 = row_hashes(right)
+            known_hashes = np.unique(hashes2)
+        _resolve_columns(column_names, chunk)
+        chunk_hashes = row_hashes(canonical_frame(chunk, column_names, like=right))
+        hashes1.append(chunk_hashes)
+        absent = np.flatnonzero(~np.isin(chunk_hashes, known_hashes))
+        if len(absent):
+            missing_parts.append(chunk[column_names].iloc[absent])
+
+    if right is None:
+        #Empty stream, every df2 row is extra
+        column_names = _resolve_columns(column_names if column_names is not None else df2.columns.tolist(), df2)
+        hashes2 = row_hashes(canonical_frame(df2, column_names))
+
+    missing_rows = pd.concat(missing_parts) if missing_parts else df2[column_names].iloc[0:0]
+    hashes1 = np.concatenate(hashes1) if hashes1 else np.empty(0, dtype="uint64")
+    return build_diff(missing_rows, hashes1, df2[column_names], hashes2)
+
+
+def compare_data_sets(df1, df2, column_names=None):
+    """
+    Compare two datasets as multisets of rows using vectorized row hashes.
+
+    Only one uint64 per row is kept for the comparison itself; the actual rows are
+    pulled back from the inputs for the hashes that do not match. df1 can also be
+    an iterable of DataFrame chunks (e.g. a server side cursor), then only its
+    hashes and its rows missing from df2 are kept in memory.
+    """
+    if not isinstance(df1, pd.DataFrame):
+        return _compare_chunks(df1, df2, column_names)
+
+    if column_names is None:
+        column_names = df1.columns.tolist()
+    column_names = _resolve_columns(column_names, df1, df2)
+
+    right = canonical_frame(df2, column_names)
+    hashes1 = row_hashes(canonical_frame(df1, column_names, like=right))
+    hashes2 = row_hashes(right)
+
+    missing = np.flatnonzero(~np.isin(hashes1, hashes2))
+    return build_diff(df1[column_names].iloc[missing], hashes1, df2[column_names], hashes2)
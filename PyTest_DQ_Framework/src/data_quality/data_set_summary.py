@@ -0,0 +1,323 @@
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+#Aggregate summaries of a data set: the Postgres side is one SQL query returning a single row,
+#the Parquet side is computed with Arrow over record batches, both in the same canonical form.
+
+#Postgres type OID -> canonical kind, any other type is compared as text
+NUMBER_OIDS = {20, 21, 23, 700, 701, 1700}  # int8, int2, int4, float4, float8, numeric
+TEMPORAL_OIDS = {1082, 1114, 1184}  # date, timestamp, timestamptz
+BOOL_OID = 16
+
+ROW_SEPARATOR = "\x1f"  # unit separator between the columns of the canonical row text
+NULL_TEXT = "\\N"  # canonical text of NULL, like COPY
+ROW_HASH_HEX_DIGITS = 15  # the first 60 bits of md5(row text) are summed, so the checksum is order independent
+ROW_HASH_LOW_BITS = 30  # row hashes are summed as two 30 bit halves, so int64 sums can not overflow
+
+
+@dataclass
+class SummarySpec:
+    """
+    Describes what is aggregated on both sides, the row count is always computed.
+
+    key_columns: count of distinct key combinations (nulls form their own key, like DISTINCT).
+    null_columns: count of nulls per column.
+    range_columns: min and max per column.
+    checksum_columns: sum of the md5 hashes of the canonical text of these columns, per row.
+    decimals: numbers are compared after rounding to this many decimals.
+    """
+    key_columns: Optional[List[str]] = None
+    null_columns: Optional[List[str]] = None
+    range_columns: Optional[List[str]] = None
+    checksum_columns: Optional[List[str]] = None
+    decimals: int = 6
+
+    def columns(self):
+        #Every column the spec needs, in first use order
+        columns = []
+        for column_names in (self.key_columns, self.null_columns, self.range_columns, self.checksum_columns):
+            for column in column_names or []:
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+
+@dataclass
+class DataSetSummary:
+    """Result of a SummarySpec on one side, len() is the row count so check_count accepts summaries"""
+    row_count: int
+    null_counts: Dict[str, int] = field(default_factory=dict)
+    ranges: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)
+    distinct_keys: Optional[int] = None
+    checksum: Optional[int] = None
+
+    def __len__(self):
+        return self.row_count
+
+    def compare(self, other):
+        #List of differences with another summary, empty when they match
+        messages = []
+        if self.row_count != other.row_count:
+            messages.append(f"Count mismatch: {self.row_count} vs {other.row_count}")
+        for column, null_count in self.null_counts.items():
+            if null_count != other.null_counts.get(column):
+                messages.append(f"Column '{column}' null count mismatch: {null_count} vs {other.null_counts.get(column)}")
+        for column, value_range in self.ranges.items():
+            if value_range != other.ranges.get(column):
+                messages.append(f"Column '{column}' range mismatch: {value_range} vs {other.ranges.get(column)}")
+        if self.distinct_keys != other.distinct_keys:
+            messages.append(f"Distinct key count mismatch: {self.distinct_keys} vs {other.distinct_keys}")
+        if self.checksum != other.checksum:
+            messages.append(f"Checksum mismatch: {self.checksum} vs {other.checksum}")
+        return messages
+
+
+def _kind_of_oid(oid):
+    if oid in NUMBER_OIDS:
+        return "number"
+    if oid in TEMPORAL_OIDS:
+        return "temporal"
+    if oid == BOOL_OID:
+        return "bool"
+    return "text"
+
+
+def _kind_of_arrow_type(arrow_type):
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "number"
+    if pa.types.is_date(arrow_type) or pa.types.is_timestamp(arrow_type):
+        return "temporal"
+    if pa.types.is_boolean(arrow_type):
+        return "bool"
+    return "text"
+
+
+def _normalize(value, kind, decimals):
+    #Python value of a min / max in the form both sides are compared in
+    if value is None:
+        return None
+    if kind == "number":
+        return round(float(value), decimals)
+    if kind == "temporal":
+        return pd.Timestamp(value)
+    if kind == "bool":
+        return bool(value)
+    return str(value)
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _sql_canonical_text(column, kind, decimals):
+    #Canonical text of a column value, must match _arrow_canonical_text
+    #numbers go through float8 like the Parquet side does, so the rounding is bit identical
+    name = _quote(column)
+    if kind == "number":
+        text = f"round({name}::float8 * 1e{decimals}::float8)::bigint::text"
+    elif kind == "temporal":
+        text = f"(extract(epoch from {name}) * 1000000)::bigint::text"
+    elif kind == "bool":
+        text = f"{name}::int::text"
+    else:
+        text = f"{name}::text"
+    return f"coalesce({text}, '{NULL_TEXT}')"
+
+
+def _arrow_canonical_text(array, kind, decimals):
+    if kind == "number":
+        scaled = pc.multiply(pc.cast(array, pa.float64()), float(10 ** decimals))
+        text = pc.cast(pc.cast(pc.round(scaled, 0, round_mode="half_to_even"), pa.int64()), pa.string())
+    elif kind == "temporal":
+        if pa.types.is_date(array.type):
+            array = pc.cast(array, pa.timestamp("us"))
+        options = pc.CastOptions(pa.timestamp("us", array.type.tz), allow_time_truncate=True)
+        text = pc.cast(pc.cast(pc.cast(array, options=options), pa.int64()), pa.string())
+    elif kind == "bool":
+        text = pc.cast(pc.cast(array, pa.int8()), pa.string())
+    else:
+        text = pc.cast(array, pa.string())
+    return pc.fill_null(text, NULL_TEXT)
+
+
+def sql_row_hash(column_names, kinds, decimals):
+    #SQL expression of the 60 bit md5 hash of the canonical row text, see arrow_row_hashes
+    texts = ", ".join(_sql_canonical_text(column, kinds[column], decimals) for column in column_names)
+    row_text = f"concat_ws(chr({ord(ROW_SEPARATOR)}), {texts})"
+    return f"('x' || substr(md5({row_text}), 1, {ROW_HASH_HEX_DIGITS}))::bit({ROW_HASH_HEX_DIGITS * 4})::bigint"
+
+
+def arrow_row_hashes(table, column_names, kinds, decimals):
+    #int64 Arrow array equal to sql_row_hash, one value per row of the Arrow table
+    #Arrow has no md5 kernel, only the digest is computed per row, everything around it stays columnar
+    texts = [_arrow_canonical_text(decode(table.column(column)), kinds[column], decimals) for column in column_names]
+    row_texts = pc.cast(pc.binary_join_element_wise(*texts, ROW_SEPARATOR), pa.binary())
+    shift = 64 - ROW_HASH_HEX_DIGITS * 4
+    hashes = np.fromiter((int.from_bytes(hashlib.md5(text).digest()[:8], "big") >> shift
+                          for text in row_texts.to_pylist()), dtype=np.int64, count=len(row_texts))
+    return pa.array(hashes)
+
+
+def split_row_hashes(row_hashes):
+    #(high, low) halves of the row hashes, their int64 sums can not overflow
+    return (pc.shift_right(row_hashes, ROW_HASH_LOW_BITS),
+            pc.bit_wise_and(row_hashes, (1 << ROW_HASH_LOW_BITS) - 1))
+
+
+def combine_hash_sums(high_sum, low_sum):
+    #Exact sum of the row hashes from the sums of their halves
+    return ((high_sum or 0) << ROW_HASH_LOW_BITS) + (low_sum or 0)
+
+
+def sum_row_hashes(row_hashes):
+    #Exact sum of an array of row hashes as a Python int, like SUM(bigint) returning numeric
+    high, low = split_row_hashes(row_hashes)
+    return combine_hash_sums(pc.sum(high).as_py(), pc.sum(low).as_py())
+
+
+def sql_kinds(columns):
+    #Canonical kind per column of a (name, type oid) query description
+    return {name: _kind_of_oid(oid) for name, oid in columns}
+
+
+def arrow_kinds(table, column_names):
+    #Canonical kind per column of an Arrow table
+    return {column: _kind_of_arrow_type(decode(table.column(column)).type) for column in column_names}
+
+
+def check_columns(column_names, available):
+    missing = [column for column in column_names if column not in available]
+    if missing:
+        raise ValueError(f"Column(s) {missing} not found in data set")
+
+
+def summary_query(sql, columns, spec):
+    """
+    Build the single row aggregate query of a SummarySpec over sql.
+
+    columns is the (name, type oid) description of sql, see copy_export.describe_query.
+    The output columns are read back positionally by summary_from_row.
+    """
+    kinds = sql_kinds(columns)
+    check_columns(spec.columns(), kinds)
+
+    aggregates = ["COUNT(*)"]
+    for column in spec.null_columns or []:
+        aggregates.append(f"COUNT(*) - COUNT({_quote(column)})")
+    for column in spec.range_columns or []:
+        name = _quote(column)
+        if kinds[column] == "bool":
+            aggregates += [f"bool_and({name})", f"bool_or({name})"]
+        elif kinds[column] == "text":
+            #byte order, like Arrow
+            aggregates += [f'MIN({name}::text COLLATE "C")', f'MAX({name}::text COLLATE "C")']
+        else:
+            aggregates += [f"MIN({name})", f"MAX({name})"]
+    if spec.key_columns:
+        keys = ", ".join(_quote(column) for column in spec.key_columns)
+        aggregates.append(f"(SELECT COUNT(*) FROM (SELECT DISTINCT {keys} FROM summary_source) AS summary_keys)")
+    if spec.checksum_columns:
+        aggregates.append(f"COALESCE(SUM({sql_row_hash(spec.checksum_columns, kinds, spec.decimals)}), 0)")
+
+    select_list = ",\n       ".join(aggregates)
+    return (f"WITH summary_source AS ({sql.strip().rstrip(';')})\n"
+            f"SELECT {select_list}\n"
+            f"FROM summary_source")
+
+
+def summary_from_row(row, columns, spec):
+    #Turn the row returned by summary_query into a DataSetSummary
+    kinds = sql_kinds(columns)
+    values = iter(row)
+    summary = DataSetSummary(row_count=int(next(values)))
+    for column in spec.null_columns or []:
+        summary.null_counts[column] = int(next(values))
+    for column in spec.range_columns or []:
+        min_value, max_value = next(values), next(values)
+        summary.ranges[column] = (_normalize(min_value, kinds[column], spec.decimals),
+                                  _normalize(max_value, kinds[column], spec.decimals))
+    if spec.key_columns:
+        summary.distinct_keys = int(next(values))
+    if spec.checksum_columns:
+        summary.checksum = int(next(values))
+    return summary
+
+
+def to_table(batch):
+    if isinstance(batch, pd.DataFrame):
+        return pa.Table.from_pandas(batch, preserve_index=False)
+    if isinstance(batch, pa.RecordBatch):
+        return pa.Table.from_batches([batch])
+    return batch
+
+
+def decode(array):
+    #Hive partition keys are read as dictionaries, compare their values
+    if pa.types.is_dictionary(array.type):
+        return pc.cast(array, array.type.value_type)
+    return array
+
+
+def summarize_batches(batches, spec):
+    """
+    Compute the DataSetSummary of a SummarySpec with Arrow.
+
+    batches is an iterable of Arrow record batches or tables (e.g. ParquetReader.iter_batches)
+    or pandas DataFrames. Aggregates are combined batch by batch, the distinct key count keeps
+    the distinct keys of every batch.
+    """
+    summary = DataSetSummary(row_count=0)
+    summary.null_counts = {column: 0 for column in spec.null_columns or []}
+    kinds = {}
+    key_tables = []
+    checksum = 0
+    checked = False
+
+    for batch in batches:
+        table = to_table(batch)
+        if not checked:
+            check_columns(spec.columns(), table.column_names)
+            kinds = arrow_kinds(table, spec.columns())
+            checked = True
+        summary.row_count += table.num_rows
+
+        for column in spec.null_columns or []:
+            summary.null_counts[column] += table.column(column).null_count
+
+        for column in spec.range_columns or []:
+            array = decode(table.column(column))
+            if kinds[column] == "text":
+                array = pc.cast(array, pa.string())
+            batch_range = pc.min_max(array)
+            batch_min = _normalize(batch_range["min"].as_py(), kinds[column], spec.decimals)
+            batch_max = _normalize(batch_range["max"].as_py(), kinds[column], spec.decimals)
+            current_min, current_max = summary.ranges.get(column, (None, None))
+            if batch_min is not None and (current_min is None or batch_min < current_min):
+                current_min = batch_min
+            if batch_max is not None and (current_max is None or batch_max > current_max):
+                current_max = batch_max
+            summary.ranges[column] = (current_min, current_max)
+
+        if spec.key_columns:
+            keys = pa.table({column: decode(table.column(column)) for column in spec.key_columns})
+            key_tables.append(keys.group_by(spec.key_columns).aggregate([]))
+
+        if spec.checksum_columns and table.num_rows:
+            checksum += sum_row_hashes(arrow_row_hashes(table, spec.checksum_columns, kinds, spec.decimals))
+
+    if not checked:
+        raise ValueError("No data was provided to the summary")
+    for column in spec.range_columns or []:
+        summary.ranges.setdefault(column, (None, None))
+    if spec.key_columns:
+        keys = pa.concat_tables(key_tables, promote_options="default")
+        summary.distinct_keys = keys.group_by(spec.key_columns).aggregate([]).num_rows
+    if spec.checksum_columns:
+        summary.checksum = checksum
+    return summary
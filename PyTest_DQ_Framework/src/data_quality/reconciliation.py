@@ -0,0 +1,186 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.data_quality.data_set_diff import DataSetDiff
+from src.data_quality.data_set_summary import (_quote, arrow_kinds, arrow_row_hashes, check_columns,
+                                               combine_hash_sums, decode, split_row_hashes, sql_kinds, sql_row_hash,
+                                               to_table)
+
+#Bucketed reconciliation: both sides split the key space into the same buckets and only return a
+#row count and an order independent checksum per bucket. Full rows are only fetched for the
+#buckets whose count or checksum disagree.
+
+BUCKET_METHODS = ("hash", "modulo", "month")
+
+
+@dataclass
+class BucketSpec:
+    """
+    Describes how rows are bucketed and checksummed on both sides.
+
+    key_columns: the columns rows are bucketed by.
+    checksum_columns: the columns compared, also used for the row level diff of mismatched buckets.
+    buckets: number of buckets for the 'hash' and 'modulo' methods.
+    method: 'hash' (md5 of the key columns, any types), 'modulo' (one integer key column)
+        or 'month' (one date / timestamp key column, one bucket per 'YYYY-MM').
+    decimals: numbers are compared after rounding to this many decimals.
+    """
+    key_columns: List[str]
+    checksum_columns: List[str]
+    buckets: int = 64
+    method: str = "hash"
+    decimals: int = 6
+
+    def __post_init__(self):
+        if self.method not in BUCKET_METHODS:
+            raise ValueError(f"method must be one of {BUCKET_METHODS}, got '{self.method}'")
+        if self.method != "hash" and len(self.key_columns) != 1:
+            raise ValueError(f"The '{self.method}' method needs exactly one key column, got {self.key_columns}")
+        if self.buckets < 1:
+            raise ValueError(f"buckets must be positive, got {self.buckets}")
+
+    def columns(self):
+        return list(dict.fromkeys(self.key_columns + self.checksum_columns))
+
+
+@dataclass
+class ReconciliationResult:
+    """Per bucket (row count, checksum) of both sides and the row level diff of the buckets that disagree"""
+    source_buckets: Dict[Any, Tuple[int, int]]
+    target_buckets: Dict[Any, Tuple[int, int]]
+    mismatched_buckets: List[Any]
+    diff: Optional[DataSetDiff] = None
+
+    @property
+    def is_equal(self):
+        #Checksums round numbers, the row level diff of the mismatched buckets has the last word
+        return not self.mismatched_buckets or (self.diff is not None and self.diff.is_equal)
+
+    def summary(self, sample_size=5):
+        #Short human readable description, used in assertion messages
+        message = f"{len(self.mismatched_buckets)} of {len(set(self.source_buckets) | set(self.target_buckets))} " \
+                  f"bucket(s) differ: {self.mismatched_buckets[:sample_size]}"
+        if self.diff is not None:
+            message += f"\n{self.diff.summary(sample_size)}"
+        return message
+
+
+def sql_bucket(spec, kinds):
+    #SQL expression of the bucket of a row, see arrow_buckets
+    if spec.method == "month":
+        return f"to_char({_quote(spec.key_columns[0])}, 'YYYY-MM')"
+    if spec.method == "modulo":
+        return f"mod({_quote(spec.key_columns[0])}::bigint, {spec.buckets})"
+    return f"mod({sql_row_hash(spec.key_columns, kinds, spec.decimals)}, {spec.buckets})"
+
+
+def _truncated_mod(array, buckets):
+    #integer division truncates toward zero, so the sign follows the key like Postgres mod()
+    return pc.subtract(array, pc.multiply(pc.divide(array, buckets), buckets))
+
+
+def arrow_buckets(table, spec, kinds):
+    #Bucket of every row of an Arrow table as an Arrow array, null for a null month / modulo key
+    if spec.method == "month":
+        array = decode(table.column(spec.key_columns[0]))
+        if pa.types.is_date(array.type):
+            array = pc.cast(array, pa.timestamp("us"))
+        return pc.strftime(array, format="%Y-%m")
+    if spec.method == "modulo":
+        return _truncated_mod(pc.cast(decode(table.column(spec.key_columns[0])), pa.int64()), spec.buckets)
+    return _truncated_mod(arrow_row_hashes(table, spec.key_columns, kinds, spec.decimals), spec.buckets)
+
+
+def bucket_summary_query(sql, columns, spec):
+    """
+    Build the query returning one (bucket, row count, checksum) row per non empty bucket of sql.
+
+    columns is the (name, type oid) description of sql, see copy_export.describe_query.
+    """
+    kinds = sql_kinds(columns)
+    check_columns(spec.columns(), kinds)
+    return (f"SELECT {sql_bucket(spec, kinds)} AS bucket,\n"
+            f"       COUNT(*),\n"
+            f"       COALESCE(SUM({sql_row_hash(spec.checksum_columns, kinds, spec.decimals)}), 0)\n"
+            f"FROM ({sql.strip().rstrip(';')}) AS bucket_source\n"
+            f"GROUP BY 1")
+
+
+def _sql_literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(int(value))
+
+
+def bucket_rows_query(sql, columns, spec, buckets):
+    #Rows of sql that fall into the given buckets, None is the bucket of null keys
+    kinds = sql_kinds(columns)
+    check_columns(spec.columns(), kinds)
+    bucket = sql_bucket(spec, kinds)
+    conditions = []
+    values = [value for value in buckets if value is not None]
+    if values:
+        conditions.append(f"{bucket} IN ({', '.join(_sql_literal(value) for value in values)})")
+    if len(values) < len(buckets):
+        conditions.append(f"{bucket} IS NULL")
+    where = " OR ".join(conditions) or "FALSE"
+    return f"SELECT * FROM ({sql.strip().rstrip(';')}) AS bucket_source\nWHERE {where}"
+
+
+def summarize_buckets(batches, spec):
+    """
+    Compute {bucket: (row count, checksum)} with Arrow, matching bucket_summary_query.
+
+    batches is an iterable of Arrow record batches or tables (e.g. ParquetReader.iter_batches)
+    or pandas DataFrames.
+    """
+    buckets = {}
+    kinds = None
+    for batch in batches:
+        table = to_table(batch)
+        if kinds is None:
+            check_columns(spec.columns(), table.column_names)
+            kinds = arrow_kinds(table, spec.columns())
+        if not table.num_rows:
+            continue
+        high, low = split_row_hashes(arrow_row_hashes(table, spec.checksum_columns, kinds, spec.decimals))
+        grouped = pa.table({"bucket": arrow_buckets(table, spec, kinds), "high": high, "low": low}) \
+            .group_by("bucket").aggregate([("high", "sum"), ("low", "sum"), ("low", "count")])
+        #one Python update per bucket and batch, null keys form their own group
+        for row in grouped.to_pylist():
+            count, checksum = buckets.get(row["bucket"], (0, 0))
+            buckets[row["bucket"]] = (count + row["low_count"],
+                                      checksum + combine_hash_sums(row["high_sum"], row["low_sum"]))
+    return buckets
+
+
+def filter_buckets(batches, spec, buckets):
+    #Arrow table of the rows that fall into the given buckets
+    wanted = list(set(buckets))
+    tables = []
+    schema = None
+    for batch in batches:
+        table = to_table(batch)
+        schema = schema or table.schema
+        if not table.num_rows:
+            continue
+        kinds = arrow_kinds(table, spec.columns())
+        row_buckets = arrow_buckets(table, spec, kinds)
+        #skip_nulls=False: a null bucket in wanted matches the rows of null keys
+        mask = pc.is_in(row_buckets, value_set=pa.array(wanted, type=row_buckets.type), skip_nulls=False)
+        tables.append(table.filter(mask))
+    if not tables:
+        if schema is None:
+            raise ValueError("No data was provided to the reconciliation")
+        return schema.empty_table()
+    return pa.concat_tables(tables, promote_options="default")
+
+
+def mismatched_buckets(source_buckets, target_buckets):
+    #Buckets whose row count or checksum differ, including buckets present on one side only
+    buckets = set(source_buckets) | set(target_buckets)
+    mismatched = [bucket for bucket in buckets if source_buckets.get(bucket) != target_buckets.get(bucket)]
+    return sorted(mismatched, key=lambda bucket: (bucket is None, bucket if bucket is not None else 0))
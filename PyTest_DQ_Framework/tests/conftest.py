@@ -3,6 +3,7 @@ import os
 from src.connectors.postgres.postgres_connector import PostgresConnectorContextManager
 from src.data_quality.data_quality_validation_library import DataQualityLibrary
 from src.connectors.file_system.parquet_reader import ParquetReader
+from src.cache.dataset_cache import DatasetCache
 
 
 def pytest_addoption(parser):
@@ -12,6 +13,12 @@ def pytest_addoption(parser):
     parser.addoption("--db_user", action="store", help="Database host")
     parser.addoption("--db_password", action="store", help="Database password")
     parser.addoption("--parquet_path", action="store", default=None, help="Path to parquet files")
+    parser.addoption("--parquet_workers", action="store", default=None, help="Threads used to read parquet files")
+    parser.addoption("--dataset_cache_mb", action="store", default="1024",
+                     help="Memory budget of the session dataset cache in MB, 0 disables it")
+    parser.addoption("--dataset_cache_dir", action="store", default=os.environ.get("DQ_DATASET_CACHE_DIR"),
+                     help="Directory the dataset cache persists Feather files to, shared by xdist workers and "
+                          "re-runs. Query results are checked against the source tables before being reused")
 
 
 def pytest_configure(config):
@@ -24,7 +31,23 @@ def pytest_configure(config):
 
 
 @pytest.fixture(scope='session')
-def db_connection(request):
+def dataset_cache(request, tmp_path_factory):
+    #Source query results and parquet reads shared by all the test modules of the session
+    cache_mb = int(request.config.getoption("--dataset_cache_mb"))
+    cache_dir = request.config.getoption("--dataset_cache_dir")
+    if cache_dir is None and os.environ.get("PYTEST_XDIST_WORKER"):
+        #xdist workers share the parent of their basetemp, one worker loads a dataset and the others map it
+        cache_dir = str(tmp_path_factory.getbasetemp().parent / "dq_dataset_cache")
+    if cache_mb <= 0 and not cache_dir:
+        yield None
+        return
+    cache = DatasetCache(max_bytes=max(cache_mb, 0) * 1024 * 1024, spill_dir=cache_dir)
+    yield cache
+    print(f"Dataset cache: {cache.stats()}")
+
+
+@pytest.fixture(scope='session')
+def db_connection(request, dataset_cache):
     db_host = request.config.getoption("--db_host")
     db_name = request.config.getoption("--db_name")
     db_port = request.config.getoption("--db_port")
@@ -37,7 +60,9 @@ def db_connection(request):
                 db_name=db_name,
                 db_port=int(db_port),
                 db_user=db_user,
-                db_password=db_password
+                db_password=db_password,
+                cache=dataset_cache,
+                lazy=True #only workers that run a query open a connection
         ) as db_connector:
             yield db_connector
     except Exception as e:
@@ -45,7 +70,7 @@ def db_connection(request):
 
 
 @pytest.fixture(scope='session')
-def parquet_reader(request):
+def parquet_reader(request, dataset_cache):
     try:
         parquet_path = request.config.getoption("--parquet_path")
 
@@ -60,7 +85,12 @@ def parquet_reader(request):
                     "..", "..", "data_dev", "parquet_data"
                 )
 
-        reader = ParquetReader(base_path=parquet_path)
+        parquet_workers = request.config.getoption("--parquet_workers")
+        reader = ParquetReader(
+            base_path=parquet_path,
+            max_workers=int(parquet_workers) if parquet_workers else None,
+            cache=dataset_cache
+        )
         yield reader
     except Exception as e:
         pytest.fail(f"Failed to initialize ParquetReader: {e}")
@@ -5,10 +5,11 @@ Author(s): Julia Mendoza
 """
 
 import pytest
+from src.data_quality.data_set_summary import SummarySpec
+from src.data_quality.reconciliation import BucketSpec
+from src.data_quality.check_suite import DuplicatesCheck, NotEmptyCheck, NotNullCheck
 
-@pytest.fixture(scope='module')
-def source_data(db_connection): #Get data from PostreSQL
-    source_query = """
+SOURCE_QUERY = """
     SELECT 
         f.facility_name,
         DATE(v.visit_timestamp) as visit_date,
@@ -18,10 +19,27 @@ def source_data(db_connection): #Get data from PostreSQL
     WHERE f.facility_name IS NOT NULL 
       AND v.visit_timestamp IS NOT NULL
     GROUP BY f.facility_name, DATE(v.visit_timestamp)
-    ORDER BY f.facility_name, DATE(v.visit_timestamp)
     """
-    source_data = db_connection.get_data_sql(source_query)
-    return source_data
+
+#Aggregates computed on both sides, only one summary row is pulled from PostgreSQL
+SUMMARY_SPEC = SummarySpec(
+    key_columns=['facility_name', 'visit_date'],
+    null_columns=['facility_name', 'visit_date', 'min_time_spent'],
+    range_columns=['visit_date', 'min_time_spent'],
+    checksum_columns=['facility_name', 'visit_date', 'min_time_spent']
+)
+
+#Rows are only transferred for the buckets whose count or checksum differ
+RECONCILIATION_COLUMNS = ['facility_name', 'visit_date', 'min_time_spent']
+BUCKET_SPEC = BucketSpec(['facility_name', 'visit_date'], RECONCILIATION_COLUMNS, buckets=64)
+
+@pytest.fixture(scope='module')
+def source_summary(db_connection): #Summarize data in PostreSQL
+    return db_connection.get_data_summary(SOURCE_QUERY, SUMMARY_SPEC)
+
+@pytest.fixture(scope='module')
+def target_summary(parquet_reader): #Summarize parquet files with Arrow
+    return parquet_reader.summarize('facility_name_min_time_spent_per_visit_date', SUMMARY_SPEC, include_subfolders=True)
 
 @pytest.fixture(scope='module')
 def target_data(parquet_reader): #Get data from parquet files
@@ -29,13 +47,23 @@ def target_data(parquet_reader): #Get data from parquet files
     target_data = parquet_reader.process(target_path, include_subfolders=True)
     return target_data
 
+@pytest.fixture(scope='module')
+def target_check_results(target_data, data_quality_library):
+    #All target checks are computed in one pass, each test asserts its own result
+    checks = [
+        NotEmptyCheck(),
+        DuplicatesCheck(['facility_name', 'visit_date']),
+        NotNullCheck(['facility_name', 'visit_date', 'min_time_spent']),
+    ]
+    return data_quality_library.run_check_suite(target_data, checks)
+
 #Smoke test
 @pytest.mark.parquet_data
 @pytest.mark.smoke
 @pytest.mark.facility_name_min_time_spent_per_visit_date
-def test_check_dataset_is_not_empty(target_data, data_quality_library):
+def test_check_dataset_is_not_empty(target_check_results):
     """Smoke test: Ensure target data is not empty"""
-    data_quality_library.check_dataset_is_not_empty(target_data)
+    target_check_results['not_empty'].assert_passed()
 
 #Data Completeness Tests
 # Validate that all required data points are present in the target dataset and match the source dataset.
@@ -44,9 +72,22 @@ def test_check_dataset_is_not_empty(target_data, data_quality_library):
 
 @pytest.mark.parquet_data
 @pytest.mark.facility_name_min_time_spent_per_visit_date
-def test_check_count(source_data, target_data, data_quality_library):
+def test_check_count(source_summary, target_summary, data_quality_library):
     """Compare record counts between source and target"""
-    data_quality_library.check_count(source_data, target_data)
+    data_quality_library.check_count(source_summary, target_summary)
+
+@pytest.mark.parquet_data
+@pytest.mark.facility_name_min_time_spent_per_visit_date
+def test_check_summary(source_summary, target_summary, data_quality_library):
+    """Compare null counts, ranges, distinct keys and checksum between source and target"""
+    data_quality_library.check_summary(source_summary, target_summary)
+
+@pytest.mark.parquet_data
+@pytest.mark.facility_name_min_time_spent_per_visit_date
+def test_check_reconciliation(db_connection, parquet_reader, data_quality_library):
+    """Compare source and target data bucket by bucket"""
+    data_quality_library.check_reconciliation(db_connection, SOURCE_QUERY, parquet_reader,
+                                              'facility_name_min_time_spent_per_visit_date', BUCKET_SPEC)
 
 # Data Quality Tests
 # Purpose: Validate the integrity, accuracy, and quality of the dataset.
@@ -54,13 +95,13 @@ def test_check_count(source_data, target_data, data_quality_library):
 
 @pytest.mark.parquet_data
 @pytest.mark.facility_name_min_time_spent_per_visit_date
-def test_check_duplicates(target_data, data_quality_library):
+def test_check_duplicates(target_check_results):
     """Check for duplicate records"""
-    data_quality_library.check_duplicates(target_data, ['facility_name','visit_date'])
+    target_check_results['duplicates'].assert_passed()
 
 @pytest.mark.parquet_data
 @pytest.mark.facility_name_min_time_spent_per_visit_date
-def test_check_not_null_values(target_data, data_quality_library):
+def test_check_not_null_values(target_check_results):
     """Check for null values """
-    data_quality_library.check_not_null_values(target_data, ['facility_name', 'visit_date', 'min_time_spent'])
+    target_check_results['not_null'].assert_passed()
 
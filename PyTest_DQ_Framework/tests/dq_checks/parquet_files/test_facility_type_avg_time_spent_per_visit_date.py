@@ -6,10 +6,12 @@ Author(s): Julia Mendoza
 
 import pytest
 import os
+from src.data_quality.data_set_summary import SummarySpec
+from src.data_quality.reconciliation import BucketSpec
+from src.data_quality.check_suite import (AllowedValuesCheck, DuplicatesCheck, NotEmptyCheck,
+                                             NotNullCheck, ValueRangeCheck)
 
-@pytest.fixture(scope='module')
-def source_data(db_connection): #Get data from PostreSQL
-    source_query = """
+SOURCE_QUERY = """
     SELECT 
         f.facility_type,
         DATE(v.visit_timestamp) as visit_date,
@@ -19,10 +21,27 @@ def source_data(db_connection): #Get data from PostreSQL
     WHERE f.facility_type IS NOT NULL 
       AND v.visit_timestamp IS NOT NULL
     GROUP BY f.facility_type, DATE(v.visit_timestamp)
-    ORDER BY f.facility_type, DATE(v.visit_timestamp)
     """
-    source_data = db_connection.get_data_sql(source_query)
-    return source_data
+
+#Aggregates computed on both sides, only one summary row is pulled from PostgreSQL
+SUMMARY_SPEC = SummarySpec(
+    key_columns=['facility_type', 'visit_date'],
+    null_columns=['facility_type', 'visit_date', 'avg_time_spent'],
+    range_columns=['visit_date', 'avg_time_spent'],
+    checksum_columns=['facility_type', 'visit_date', 'avg_time_spent']
+)
+
+#Rows are only transferred for the buckets whose count or checksum differ
+RECONCILIATION_COLUMNS = ['facility_type', 'visit_date', 'avg_time_spent']
+BUCKET_SPEC = BucketSpec(['visit_date'], RECONCILIATION_COLUMNS, method='month')
+
+@pytest.fixture(scope='module')
+def source_summary(db_connection): #Summarize data in PostreSQL
+    return db_connection.get_data_summary(SOURCE_QUERY, SUMMARY_SPEC)
+
+@pytest.fixture(scope='module')
+def target_summary(parquet_reader): #Summarize parquet files with Arrow
+    return parquet_reader.summarize('facility_type_avg_time_spent_per_visit_date', SUMMARY_SPEC, include_subfolders=True)
 
 @pytest.fixture(scope='module')
 def target_data(parquet_reader): #Get data from parquet files
@@ -30,13 +49,25 @@ def target_data(parquet_reader): #Get data from parquet files
     target_data = parquet_reader.process(target_path, include_subfolders=True)
     return target_data
 
+@pytest.fixture(scope='module')
+def target_check_results(target_data, data_quality_library):
+    #All target checks are computed in one pass, each test asserts its own result
+    checks = [
+        NotEmptyCheck(),
+        DuplicatesCheck(['facility_type', 'visit_date']),
+        NotNullCheck(['facility_type', 'visit_date']),
+        ValueRangeCheck('avg_time_spent', 0, 1440),
+        AllowedValuesCheck('facility_type', ['Hospital', 'Clinic', 'Urgent Care', 'Specialty Center']),
+    ]
+    return data_quality_library.run_check_suite(target_data, checks)
+
 #Smoke test
 @pytest.mark.parquet_data
 @pytest.mark.smoke
 @pytest.mark.facility_type_avg_time_spent_per_visit_date
-def test_check_dataset_is_not_empty(target_data, data_quality_library):
+def test_check_dataset_is_not_empty(target_check_results):
     """Smoke test: Ensure target data is not empty"""
-    data_quality_library.check_dataset_is_not_empty(target_data)
+    target_check_results['not_empty'].assert_passed()
 
 #Data Completeness Tests
 # Validate that all required data points are present in the target dataset and match the source dataset.
@@ -45,9 +76,22 @@ def test_check_dataset_is_not_empty(target_data, data_quality_library):
 
 @pytest.mark.parquet_data
 @pytest.mark.facility_type_avg_time_spent_per_visit_date
-def test_check_count(source_data, target_data, data_quality_library):
+def test_check_count(source_summary, target_summary, data_quality_library):
     """Compare record counts between source and target"""
-    data_quality_library.check_count(source_data, target_data)
+    data_quality_library.check_count(source_summary, target_summary)
+
+@pytest.mark.parquet_data
+@pytest.mark.facility_type_avg_time_spent_per_visit_date
+def test_check_summary(source_summary, target_summary, data_quality_library):
+    """Compare null counts, ranges, distinct keys and checksum between source and target"""
+    data_quality_library.check_summary(source_summary, target_summary)
+
+@pytest.mark.parquet_data
+@pytest.mark.facility_type_avg_time_spent_per_visit_date
+def test_check_reconciliation(db_connection, parquet_reader, data_quality_library):
+    """Compare source and target data bucket by bucket"""
+    data_quality_library.check_reconciliation(db_connection, SOURCE_QUERY, parquet_reader,
+                                              'facility_type_avg_time_spent_per_visit_date', BUCKET_SPEC)
 
 # Data Quality Tests
 # Purpose: Validate the integrity, accuracy, and quality of the dataset.
@@ -55,25 +99,24 @@ def test_check_count(source_data, target_data, data_quality_library):
 
 @pytest.mark.parquet_data
 @pytest.mark.facility_type_avg_time_spent_per_visit_date
-def test_check_duplicates(target_data, data_quality_library):
+def test_check_duplicates(target_check_results):
     """Check for duplicate records"""
-    data_quality_library.check_duplicates(target_data, ['facility_type','visit_date'])
+    target_check_results['duplicates'].assert_passed()
 
 @pytest.mark.parquet_data
 @pytest.mark.facility_type_avg_time_spent_per_visit_date
-def test_check_not_null_values(target_data, data_quality_library):
+def test_check_not_null_values(target_check_results):
     """Check for null values """
-    data_quality_library.check_not_null_values(target_data, ['facility_type', 'visit_date'])
+    target_check_results['not_null'].assert_passed()
 
 @pytest.mark.parquet_data
 @pytest.mark.facility_type_avg_time_spent_per_visit_date
-def test_check_avg_time_spent_range(target_data, data_quality_library):
+def test_check_avg_time_spent_range(target_check_results):
     """Validate that average time spent """
-    data_quality_library.check_value_range(target_data, 'avg_time_spent', 0, 1440)
+    target_check_results['value_range[avg_time_spent]'].assert_passed()
 
 @pytest.mark.parquet_data
 @pytest.mark.facility_type_avg_time_spent_per_visit_date
-def test_check_facility_type_values(target_data, data_quality_library):
+def test_check_facility_type_values(target_check_results):
     """Validate facility_type contains only expected values"""
-    expected_facility_types = ['Hospital', 'Clinic', 'Urgent Care', 'Specialty Center']
-    data_quality_library.check_allowed_values(target_data, 'facility_type', expected_facility_types)
\ No newline at end of file
+    target_check_results['allowed_values[facility_type]'].assert_passed()
\ No newline at end of file
@@ -6,10 +6,10 @@ Author(s): Julia Mendoza
 
 import pytest
 import os
+from src.data_quality.data_set_summary import SummarySpec
+from src.data_quality.check_suite import DuplicatesCheck, NotEmptyCheck, NotNullCheck, ValueRangeCheck
 
-@pytest.fixture(scope='module')
-def source_data(db_connection): #Get data from PostreSQL
-    source_query = """
+SOURCE_QUERY = """
   SELECT 
         v.patient_id,
         f.facility_type,
@@ -19,10 +19,18 @@ def source_data(db_connection): #Get data from PostreSQL
     WHERE f.facility_type IS NOT NULL 
       AND v.treatment_cost IS NOT NULL
     GROUP BY v.patient_id, f.facility_type
-    ORDER BY v.patient_id, f.facility_type
     """
-    source_data = db_connection.get_data_sql(source_query)
-    return source_data
+
+#Source and target are grouped by different keys (patient_id vs full_name), only counts are compared
+SUMMARY_SPEC = SummarySpec()
+
+@pytest.fixture(scope='module')
+def source_summary(db_connection): #Summarize data in PostreSQL
+    return db_connection.get_data_summary(SOURCE_QUERY, SUMMARY_SPEC)
+
+@pytest.fixture(scope='module')
+def target_summary(parquet_reader): #Summarize parquet files with Arrow
+    return parquet_reader.summarize('patient_sum_treatment_cost_per_facility_type', SUMMARY_SPEC, include_subfolders=True)
 
 @pytest.fixture(scope='module')
 def target_data(parquet_reader): #Get data from parquet files
@@ -30,13 +38,24 @@ def target_data(parquet_reader): #Get data from parquet files
     target_data = parquet_reader.process(target_path, include_subfolders=True)
     return target_data
 
+@pytest.fixture(scope='module')
+def target_check_results(target_data, data_quality_library):
+    #All target checks are computed in one pass, each test asserts its own result
+    checks = [
+        NotEmptyCheck(),
+        DuplicatesCheck(['full_name', 'facility_type']),
+        NotNullCheck(['full_name', 'facility_type', 'sum_treatment_cost']),
+        ValueRangeCheck('sum_treatment_cost', 0, float('inf')),
+    ]
+    return data_quality_library.run_check_suite(target_data, checks)
+
 #Smoke test
 @pytest.mark.parquet_data
 @pytest.mark.smoke
 @pytest.mark.patient_sum_treatment_cost_per_facility_type
-def test_check_dataset_is_not_empty(target_data, data_quality_library):
+def test_check_dataset_is_not_empty(target_check_results):
     """Smoke test: Ensure target data is not empty"""
-    data_quality_library.check_dataset_is_not_empty(target_data)
+    target_check_results['not_empty'].assert_passed()
 
 #Data Completeness Tests
 # Validate that all required data points are present in the target dataset and match the source dataset.
@@ -45,9 +64,9 @@ def test_check_dataset_is_not_empty(target_data, data_quality_library):
 
 @pytest.mark.parquet_data
 @pytest.mark.patient_sum_treatment_cost_per_facility_type
-def test_check_count(source_data, target_data, data_quality_library):
+def test_check_count(source_summary, target_summary, data_quality_library):
     """Compare record counts between source and target"""
-    data_quality_library.check_count(source_data, target_data)
+    data_quality_library.check_count(source_summary, target_summary)
 
 @pytest.mark.parquet_data
 @pytest.mark.patient_sum_treatment_cost_per_facility_type
@@ -61,18 +80,18 @@ def test_check_column_structure(target_data):
 
 @pytest.mark.parquet_data
 @pytest.mark.patient_sum_treatment_cost_per_facility_type
-def test_check_duplicates(target_data, data_quality_library):
+def test_check_duplicates(target_check_results):
     """Check for duplicate records by patient and facility type"""
-    data_quality_library.check_duplicates(target_data, ['full_name','facility_type'])
+    target_check_results['duplicates'].assert_passed()
 
 @pytest.mark.parquet_data
 @pytest.mark.patient_sum_treatment_cost_per_facility_type
-def test_check_not_null_values(target_data, data_quality_library):
+def test_check_not_null_values(target_check_results):
     """Check for null values """
-    data_quality_library.check_not_null_values(target_data, ['full_name', 'facility_type', 'sum_treatment_cost'])
+    target_check_results['not_null'].assert_passed()
 
 @pytest.mark.parquet_data
 @pytest.mark.patient_sum_treatment_cost_per_facility_type
-def test_check_sum_treatment_cost_positive(target_data, data_quality_library):
+def test_check_sum_treatment_cost_positive(target_check_results):
     """Validate that total treatment cost is positive"""
-    data_quality_library.check_value_range(target_data, 'sum_treatment_cost', 0, float('inf'))
\ No newline at end of file
+    target_check_results['value_range[sum_treatment_cost]'].assert_passed()
\ No newline at end of file
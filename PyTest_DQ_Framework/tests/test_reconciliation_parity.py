@@ -0,0 +1,35 @@
+import datetime
+
+import pyarrow as pa
+import pytest
+from src.data_quality.reconciliation import BucketSpec, summarize_buckets
+
+#Same rows on both sides: negative, null and month boundary keys
+PARITY_QUERY = """
+SELECT *
+FROM (VALUES (-7, DATE '2024-01-31', 1.5::float8, 'a'),
+             (7, DATE '2024-02-01', 2.25::float8, 'b'),
+             (NULL::int, NULL::date, NULL::float8, NULL::text),
+             (0, DATE '1999-12-31', 0.0::float8, ''),
+             (-4, DATE '2024-01-01', -3.125::float8, 'a')) AS parity(id, visit_date, cost, name)
+"""
+
+PARITY_TABLE = pa.table({
+    "id": pa.array([-7, 7, None, 0, -4], pa.int64()),
+    "visit_date": pa.array([datetime.date(2024, 1, 31), datetime.date(2024, 2, 1), None,
+                            datetime.date(1999, 12, 31), datetime.date(2024, 1, 1)]),
+    "cost": pa.array([1.5, 2.25, None, 0.0, -3.125]),
+    "name": pa.array(["a", "b", None, "", "a"]),
+})
+
+COLUMNS = ["id", "visit_date", "cost", "name"]
+
+
+@pytest.mark.parametrize("spec", [
+    BucketSpec(["id"], COLUMNS, buckets=4, method="modulo"),
+    BucketSpec(["visit_date"], COLUMNS, method="month"),
+    BucketSpec(["id", "name"], COLUMNS, buckets=8),
+], ids=["modulo", "month", "hash"])
+def test_bucket_summary_parity(db_connection, spec):
+    """sql_bucket / bucket_summary_query in Postgres and arrow_buckets / summarize_buckets agree"""
+    assert db_connection.get_bucket_summary(PARITY_QUERY, spec) == summarize_buckets([PARITY_TABLE], spec)
@@ -0,0 +1,117 @@
+"""
+Description: Contract between the Arrow sidecar written by data_dev LoadParquet and ParquetReader (no database needed)
+Requirement(s): TICKET-1234
+"""
+
+import importlib.util
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+from src.connectors.file_system import arrow_sidecar
+from src.connectors.file_system.parquet_reader import ParquetReader
+
+WRITER_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "..", "data_dev", "src", "data", "arrow_sidecar.py")
+
+
+@pytest.fixture(scope="module")
+def writer():
+    #data_dev is not importable from the DQ tests, its sidecar module only depends on pyarrow
+    if not os.path.exists(WRITER_PATH):
+        pytest.skip("data_dev is not checked out next to the DQ framework")
+    spec = importlib.util.spec_from_file_location("data_dev_arrow_sidecar", WRITER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def dataset(tmp_path, writer):
+    #hive partitioned dataset like LoadParquet writes, several files per partition
+    rows = 3000
+    table = pa.table({
+        "visit_id": pa.array(range(rows), pa.int64()),
+        "facility_type": pa.array([["Hospital", "Clinic", "Urgent Care"][i % 3] for i in range(rows)]),
+        "cost": pa.array([i * 0.5 if i % 7 else None for i in range(rows)]),
+        "partition_date": pa.array([f"2024-{i % 4 + 1:02d}" for i in range(rows)]),
+    })
+    path = tmp_path / "dataset"
+    ds.write_dataset(table, str(path), format="parquet", max_rows_per_file=400, max_rows_per_group=400,
+                     partitioning=ds.partitioning(pa.schema([("partition_date", pa.string())]), flavor="hive"))
+    writer.write_sidecar(str(path))
+    return tmp_path
+
+
+def read(base_path, prefer_sidecar, **kwargs):
+    return ParquetReader(str(base_path), max_workers=1, prefer_sidecar=prefer_sidecar).process(
+        "dataset", include_subfolders=True, **kwargs)
+
+
+def parquet_files(path):
+    return ParquetReader._find_parquet_files(str(path), True)
+
+
+@pytest.mark.unit
+def test_content_hash_is_identical_in_both_packages(dataset, writer):
+    path = str(dataset / "dataset")
+    files = writer.dataset_files(path)
+    #the writer lists the same files the reader globs
+    assert files == sorted(os.path.relpath(file, path).replace(os.sep, "/") for file in parquet_files(path))
+    assert writer.parquet_content_hash(path, files) == arrow_sidecar.parquet_content_hash(path, files)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("options", [
+    {},
+    {"filters": [("partition_date", "=", "2024-02")]},
+    {"columns": ["visit_id", "cost"], "filters": [("cost", ">", 100.0)]},
+], ids=["all", "partition_filter", "columns_and_row_filter"])
+def test_sidecar_read_equals_parquet_read(dataset, capsys, options):
+    from_parquet = read(dataset, False, **options)
+    capsys.readouterr()
+    from_sidecar = read(dataset, True, **options)
+    assert "Using Arrow sidecar" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(from_sidecar, from_parquet)
+
+
+@pytest.mark.unit
+def test_sidecar_batches_equal_parquet_batches(dataset):
+    path = dataset / "dataset"
+    with_sidecar = pa.Table.from_batches(list(ParquetReader(str(dataset)).iter_batches("dataset", True)))
+    without = pa.Table.from_batches(list(ParquetReader(str(dataset), prefer_sidecar=False)
+                                         .iter_batches("dataset", True)))
+    assert with_sidecar.equals(without)
+    assert with_sidecar.num_rows == 3000 and os.path.exists(path / arrow_sidecar.SIDECAR_FILE)
+
+
+@pytest.mark.unit
+def test_modified_file_falls_back_to_parquet(dataset, capsys):
+    path = dataset / "dataset"
+    files = parquet_files(path)
+    #same file list, other content: only the content hash can tell
+    shutil.copyfile(files[1], files[0])
+    expected = read(dataset, False)
+    capsys.readouterr()
+
+    df = read(dataset, True)
+    output = capsys.readouterr().out
+    assert "does not match the Parquet content hash" in output
+    assert "Using Arrow sidecar" not in output
+    pd.testing.assert_frame_equal(df, expected)
+
+
+@pytest.mark.unit
+def test_added_file_falls_back_to_parquet(dataset, capsys):
+    path = dataset / "dataset"
+    files = parquet_files(path)
+    shutil.copyfile(files[0], os.path.join(os.path.dirname(files[0]), "added.parquet"))
+    expected = read(dataset, False)
+    capsys.readouterr()
+
+    df = read(dataset, True)
+    assert "does not list the same Parquet files" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(df, expected)
+    assert len(df) > 3000
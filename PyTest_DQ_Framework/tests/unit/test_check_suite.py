@@ -0,0 +1,116 @@
+"""
+Description: CheckSuite counts compared with the pandas checks of DataQualityLibrary on a random frame (no database needed)
+Requirement(s): TICKET-1234
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_quality.check_suite import (AllowedValuesCheck, CheckSuite, DuplicatesCheck, NotEmptyCheck,
+                                          NotNullCheck, ValueRangeCheck)
+
+ROWS = 5000
+FACILITY_TYPES = ["Hospital", "Clinic", "Urgent Care"]
+
+
+@pytest.fixture(scope="module")
+def random_frame():
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "id": rng.integers(0, 4000, ROWS),  # ~1/4 of the ids repeat
+        "cost": rng.normal(500, 300, ROWS).round(0),  # some values below 0 and above 1000
+        "minutes": rng.integers(-10, 130, ROWS).astype("float64"),
+        "facility_type": rng.choice(FACILITY_TYPES + ["Lab", "Pharmacy"], ROWS, p=[0.3, 0.3, 0.3, 0.05, 0.05]),
+    })
+    df.loc[rng.random(ROWS) < 0.05, "cost"] = np.nan
+    df.loc[rng.random(ROWS) < 0.05, "minutes"] = np.nan
+    df.loc[rng.random(ROWS) < 0.02, "facility_type"] = None
+    df.loc[rng.random(ROWS) < 0.02, "cost"] = -0.0  # equal to 0.0 for df.duplicated
+    #exact copies of random rows, NaNs included
+    return pd.concat([df, df.sample(300, random_state=1)], ignore_index=True)
+
+
+CHECKS = [
+    NotEmptyCheck(),
+    NotNullCheck(),
+    NotNullCheck(["cost", "facility_type"], name="not_null_subset"),
+    ValueRangeCheck("cost", min_value=0, max_value=1000),
+    ValueRangeCheck("minutes", min_value=0),
+    ValueRangeCheck("minutes", max_value=120, name="minutes_max"),
+    AllowedValuesCheck("facility_type", FACILITY_TYPES),
+    DuplicatesCheck(),
+    DuplicatesCheck(["id", "cost"], name="duplicates_id_cost"),
+    DuplicatesCheck(["facility_type"], name="duplicates_facility_type"),
+]
+
+
+def pandas_counts(df):
+    #Failed counts computed like the one check per scan methods of DataQualityLibrary
+    return {
+        "not_empty": 0 if len(df) else 1,
+        "not_null": int(sum(df[column].isnull().sum() for column in df.columns)),
+        "not_null_subset": int(df["cost"].isnull().sum() + df["facility_type"].isnull().sum()),
+        "value_range[cost]": int((df["cost"] < 0).sum() + (df["cost"] > 1000).sum()),
+        "value_range[minutes]": int((df["minutes"] < 0).sum()),
+        "minutes_max": int((df["minutes"] > 120).sum()),
+        "allowed_values[facility_type]": int((~df["facility_type"].isin(FACILITY_TYPES)).sum()),
+        "duplicates": int(df.duplicated(keep=False).sum()),
+        "duplicates_id_cost": int(df.duplicated(subset=["id", "cost"], keep=False).sum()),
+        "duplicates_facility_type": int(df.duplicated(subset=["facility_type"], keep=False).sum()),
+    }
+
+
+@pytest.mark.unit
+def test_run_matches_pandas_checks(random_frame):
+    result = CheckSuite(CHECKS).run(random_frame)
+    expected = pandas_counts(random_frame)
+
+    assert result.row_count == len(random_frame)
+    assert {name: check.failed_count for name, check in result.results.items()} == expected
+    assert {name: check.passed for name, check in result.results.items()} == \
+        {name: count == 0 for name, count in expected.items()}
+    #every check except not_empty has failures in the random frame
+    assert [check.name for check in result.failures] == list(expected)[1:]
+
+
+@pytest.mark.unit
+def test_run_batches_matches_run(random_frame):
+    #uneven batches, duplicates span batch boundaries
+    batches = [random_frame.iloc[start:start + 777] for start in range(0, len(random_frame), 777)]
+    assert CheckSuite(CHECKS).run_batches(batches) == CheckSuite(CHECKS).run(random_frame)
+
+
+@pytest.mark.unit
+def test_messages_match_pandas_checks(random_frame):
+    result = CheckSuite(CHECKS).run(random_frame)
+    expected = pandas_counts(random_frame)
+
+    assert result["duplicates"].message == f"Found {expected['duplicates']} duplicate records"
+    below = int((random_frame["cost"] < 0).sum())
+    above = int((random_frame["cost"] > 1000).sum())
+    assert result["value_range[cost]"].message == (f"Column 'cost' has {below} values below minimum 0; "
+                                                   f"Column 'cost' has {above} values above maximum 1000")
+    assert result["allowed_values[facility_type]"].message.startswith(
+        f"Column 'facility_type' has {expected['allowed_values[facility_type]']} invalid values (sample: ")
+
+
+@pytest.mark.unit
+def test_duplicates_fold_negative_zero():
+    df = pd.DataFrame({"cost": [0.0, -0.0, np.nan, np.nan, 1.0]})
+    result = CheckSuite([DuplicatesCheck()]).run(df)
+    assert result["duplicates"].failed_count == int(df.duplicated(keep=False).sum()) == 4
+    #the checked frame is not modified
+    assert np.signbit(df["cost"].iloc[1])
+
+
+@pytest.mark.unit
+def test_run_batches_without_batches_fails_not_empty(random_frame):
+    result = CheckSuite(CHECKS).run_batches(iter([]))
+
+    assert result.row_count == 0
+    assert [check.name for check in result.failures] == ["not_empty"]
+    assert result["not_empty"].message == "Dataframe is empty"
+    #same outcome as an empty DataFrame with the columns
+    assert result == CheckSuite(CHECKS).run(random_frame.iloc[:0])
+    with pytest.raises(AssertionError, match="not_empty: Dataframe is empty"):
+        result.assert_passed()
@@ -0,0 +1,70 @@
+"""
+Description: Unit tests of the COPY CSV conventions of copy_query_to_df, with a stub cursor (no database needed)
+Requirement(s): TICKET-1234
+"""
+
+import datetime
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+from src.connectors.postgres.copy_export import copy_query_to_df
+
+#(name, type oid): bool, int8, int4, float8, numeric, date, timestamp, timestamptz, text
+COLUMNS = [("flag", 16), ("big", 20), ("small", 23), ("ratio", 701), ("amount", 1700), ("day", 1082),
+           ("at", 1114), ("at_tz", 1184), ("label", 25)]
+
+#What COPY (...) TO STDOUT WITH (FORMAT csv) writes: NULL is an unquoted empty field, "" an empty string
+COPY_CSV = (
+    b't,9007199254740993,-5,0.25,1234.56,2024-02-29,2024-02-29 23:59:59.123456,2024-02-29 23:59:59+02,'
+    b'"a, ""quoted""\nvalue"\n'
+    b'f,0,0,-1e-05,0.00,1999-12-31,2000-01-01 00:00:00,2000-01-01 00:00:00+00,""\n'
+    b',,,,,,,,\n'
+)
+
+
+class StubCursor:
+    def __init__(self, data, columns):
+        self.data = data
+        self.description = [(name, oid, None, None, None, None, None) for name, oid in columns]
+
+    def execute(self, sql):
+        pass
+
+    def copy_expert(self, statement, file):
+        file.write(self.data)
+
+
+@pytest.mark.unit
+def test_copy_csv_types():
+    df = copy_query_to_df(StubCursor(COPY_CSV, COLUMNS), "SELECT ...")
+    assert list(df.columns) == [name for name, _ in COLUMNS]
+    assert str(df["at_tz"].dtype) == "datetime64[us, UTC]"
+    assert str(df["at"].dtype) == "datetime64[us]"
+
+    first, second = df.iloc[0], df.iloc[1]
+    assert bool(first["flag"]) is True and bool(second["flag"]) is False
+    assert first["big"] == 9007199254740993
+    assert first["amount"] == Decimal("1234.56") and second["amount"] == Decimal("0.00")  # like psycopg2
+    assert first["day"] == datetime.date(2024, 2, 29)
+    assert first["at"] == pd.Timestamp("2024-02-29 23:59:59.123456")
+    assert first["at_tz"] == pd.Timestamp("2024-02-29 21:59:59", tz="UTC")
+    assert first["label"] == 'a, "quoted"\nvalue'
+    assert second["ratio"] == -1e-05
+
+
+@pytest.mark.unit
+def test_copy_csv_null_and_empty_string():
+    df = copy_query_to_df(StubCursor(COPY_CSV, COLUMNS), "SELECT ...")
+    assert df.iloc[1]["label"] == ""
+    assert df.iloc[2].isna().all()
+    assert df.iloc[2]["amount"] is None
+
+
+@pytest.mark.unit
+def test_copy_csv_multi_line_values_over_several_blocks():
+    #the default block size is 1 MB, multi-line values must not desynchronize the chunker
+    data = b"".join(f'{i},"{i} Main Street\nApt {i}"\n'.encode() for i in range(100000))
+    df = copy_query_to_df(StubCursor(data, [("id", 23), ("address", 25)]), "SELECT ...")
+    assert len(df) == 100000
+    assert df["address"].iloc[99999] == "99999 Main Street\nApt 99999"
@@ -0,0 +1,136 @@
+"""
+Description: Unit tests of the session dataset cache, no database needed
+Requirement(s): TICKET-1234
+"""
+
+import os
+
+import pandas as pd
+import pytest
+from src.cache.dataset_cache import DatasetCache
+
+
+def frame(rows, value=0):
+    return pd.DataFrame({"id": range(rows), "value": [float(value)] * rows})
+
+
+def frame_size(df):
+    return DatasetCache._size(df)
+
+
+@pytest.mark.unit
+def test_get_or_load_loads_once():
+    cache = DatasetCache(max_bytes=10 ** 6)
+    calls = []
+
+    def load():
+        calls.append(1)
+        return frame(10)
+
+    first = cache.get_or_load(("sql", "q", 1), load)
+    second = cache.get_or_load(("sql", "q", 1), load)
+    pd.testing.assert_frame_equal(first, second)
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+@pytest.mark.unit
+def test_returned_frames_are_copies():
+    cache = DatasetCache(max_bytes=10 ** 6)
+    cache.put(("sql", "q", 1), frame(3))
+    df = cache.get(("sql", "q", 1))
+    df["extra"] = 1
+    assert "extra" not in cache.get(("sql", "q", 1)).columns
+
+
+@pytest.mark.unit
+def test_evicts_least_recently_used():
+    size = frame_size(frame(100))
+    cache = DatasetCache(max_bytes=2 * size)
+    cache.put(("a", 1), frame(100))
+    cache.put(("b", 1), frame(100))
+    cache.get(("a", 1))  # a is now the most recently used
+    cache.put(("c", 1), frame(100))
+
+    assert cache.get(("b", 1)) is None
+    assert cache.get(("a", 1)) is not None
+    assert cache.get(("c", 1)) is not None
+
+
+@pytest.mark.unit
+def test_budget_accounting():
+    size = frame_size(frame(100))
+    cache = DatasetCache(max_bytes=3 * size)
+    for name in "abcde":
+        cache.put((name, 1), frame(100))
+        assert cache.size <= cache.max_bytes
+    assert cache.stats()["entries"] == 3
+    assert cache.size == 3 * size
+
+    #replacing an entry does not count it twice
+    cache.put(("e", 1), frame(100))
+    assert cache.size == 3 * size
+
+    cache.clear()
+    assert cache.size == 0 and cache.stats()["entries"] == 0
+
+
+@pytest.mark.unit
+def test_oversize_entry_is_not_kept_in_memory():
+    cache = DatasetCache(max_bytes=frame_size(frame(10)))
+    cache.put(("small", 1), frame(10))
+    cache.put(("big", 1), frame(1000))
+    assert cache.get(("big", 1)) is None
+    assert cache.get(("small", 1)) is not None
+    assert cache.size == frame_size(frame(10))
+
+
+@pytest.mark.unit
+def test_spill_round_trip(tmp_path):
+    key = ("parquet", "/data/x", 1)
+    df = frame(50, value=1.5)
+    DatasetCache(max_bytes=10 ** 6, spill_dir=str(tmp_path)).put(key, df)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    #a new cache (another xdist worker or a later run) reads the spill file
+    other = DatasetCache(max_bytes=10 ** 6, spill_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(other.get(key), df)
+    assert other.stats()["spill_hits"] == 1
+    #and keeps it in memory afterwards
+    other.get(key)
+    assert other.stats()["hits"] == 1
+
+
+@pytest.mark.unit
+def test_spill_without_memory_budget(tmp_path):
+    cache = DatasetCache(max_bytes=0, spill_dir=str(tmp_path))
+    cache.put(("sql", "q", 1), frame(5))
+    assert cache.stats()["entries"] == 0
+    pd.testing.assert_frame_equal(cache.get(("sql", "q", 1)), frame(5))
+
+
+@pytest.mark.unit
+def test_new_version_removes_old_spill_files(tmp_path):
+    cache = DatasetCache(max_bytes=10 ** 6, spill_dir=str(tmp_path))
+    cache.put(("sql", "q", "v1"), frame(5, value=1))
+    cache.put(("sql", "other", "v1"), frame(5))
+    cache.put(("sql", "q", "v2"), frame(5, value=2))
+
+    spill_files = [name for name in os.listdir(tmp_path) if name.endswith(".feather")]
+    assert len(spill_files) == 2
+    assert os.path.basename(cache._spill_path(("sql", "q", "v1"))) not in spill_files
+    assert os.path.basename(cache._spill_path(("sql", "q", "v2"))) in spill_files
+    assert os.path.basename(cache._spill_path(("sql", "other", "v1"))) in spill_files
+
+    fresh = DatasetCache(max_bytes=10 ** 6, spill_dir=str(tmp_path))
+    assert fresh.get(("sql", "q", "v1")) is None
+    assert fresh.get(("sql", "q", "v2"))["value"].iloc[0] == 2
+
+
+@pytest.mark.unit
+def test_unspillable_frame_is_cached_in_memory(tmp_path):
+    cache = DatasetCache(max_bytes=10 ** 6, spill_dir=str(tmp_path))
+    df = pd.DataFrame({"mixed": [1, "a", object()]})
+    cache.put(("sql", "q", 1), df)
+    assert cache.get(("sql", "q", 1)) is not None
+    assert not os.listdir(tmp_path) or all(not name.endswith(".tmp") for name in os.listdir(tmp_path))
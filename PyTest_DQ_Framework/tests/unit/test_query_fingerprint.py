@@ -0,0 +1,103 @@
+"""
+Description: Relations read by a query and their fingerprint, on canned EXPLAIN plans and catalog rows (no database needed)
+Requirement(s): TICKET-1234
+"""
+
+import pytest
+from src.cache.query_fingerprint import TABLE_FINGERPRINT_QUERY, TABLE_VERSIONS_QUERY, _plan_relations, \
+    referenced_relations, table_fingerprint
+
+#EXPLAIN (VERBOSE, FORMAT JSON) of a query with a CTE, a correlated subplan and a scan of a partitioned table:
+#WITH recent AS (SELECT * FROM public.visits WHERE visit_timestamp >= '2024-01-01')
+#SELECT r.*, (SELECT f.facility_name FROM public.facilities f WHERE f.id = r.facility_id)
+#FROM recent r JOIN reporting.patients p ON p.id = r.patient_id
+PLAN = [{"Plan": {
+    "Node Type": "Hash Join",
+    "Plans": [
+        {"Node Type": "Append", "Parent Relationship": "InitPlan", "Subplan Name": "CTE recent",
+         "Plans": [
+             {"Node Type": "Seq Scan", "Parent Relationship": "Member", "Relation Name": "visits_p202401",
+              "Schema": "public", "Alias": "visits_1"},
+             {"Node Type": "Seq Scan", "Parent Relationship": "Member", "Relation Name": "visits_p202402",
+              "Schema": "public", "Alias": "visits_2"},
+         ]},
+        {"Node Type": "CTE Scan", "Parent Relationship": "Outer", "CTE Name": "recent", "Alias": "r"},
+        {"Node Type": "Hash", "Parent Relationship": "Inner",
+         "Plans": [
+             {"Node Type": "Seq Scan", "Parent Relationship": "Outer", "Relation Name": "patients",
+              "Schema": "reporting", "Alias": "p"},
+         ]},
+        {"Node Type": "Index Scan", "Parent Relationship": "SubPlan", "Subplan Name": "SubPlan 2",
+         "Relation Name": "facilities", "Schema": "public", "Alias": "f"},
+    ],
+}}]
+
+EXPECTED_RELATIONS = [("public", "facilities"), ("public", "visits_p202401"), ("public", "visits_p202402"),
+                      ("reporting", "patients")]
+
+
+class FakeCursor:
+    #Records the executed statements and answers them from canned results, in order
+    def __init__(self, results):
+        self.results = list(results)
+        self.executed = []
+        self.result = None
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self.result = self.results.pop(0)
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+@pytest.mark.unit
+def test_plan_relations_walks_ctes_subplans_and_partitions():
+    relations = set()
+    _plan_relations(PLAN[0]["Plan"], relations)
+    assert sorted(relations) == EXPECTED_RELATIONS
+
+
+@pytest.mark.unit
+def test_referenced_relations_explains_the_query():
+    cursor = FakeCursor([[(PLAN,)]])
+    assert referenced_relations(cursor, "SELECT 1;\n") == EXPECTED_RELATIONS
+    assert cursor.executed == [("EXPLAIN (VERBOSE, FORMAT JSON) SELECT 1", None)]
+
+
+@pytest.mark.unit
+def test_table_fingerprint_folds_partitions_into_their_qualified_root():
+    tables = [("public.facilities", 16401, 10, 0, 0, "public.facilities"),
+              ("public.visits_p202401", 16420, 500, 2, 0, "public.visits"),
+              ("public.visits_p202402", 16425, 480, 0, 1, "public.visits"),
+              ("reporting.patients", 16500, 30, 0, 0, "reporting.patients")]
+    versions = [("public.facilities", 3), ("public.visits", 7)]
+    cursor = FakeCursor([tables, [(True,)], versions])
+
+    fingerprint = table_fingerprint(cursor, EXPECTED_RELATIONS)
+
+    assert fingerprint == (tuple(tables), tuple(versions))
+    assert cursor.executed[0] == (TABLE_FINGERPRINT_QUERY, {
+        "schemas": ["public", "public", "public", "reporting"],
+        "relations": ["facilities", "visits_p202401", "visits_p202402", "patients"]})
+    #one version row per root table, a same-named table of another schema keeps its own row
+    assert cursor.executed[2] == (TABLE_VERSIONS_QUERY, {
+        "table_names": ["public.facilities", "public.visits", "reporting.patients"]})
+
+
+@pytest.mark.unit
+def test_table_fingerprint_without_version_table():
+    tables = [("public.facilities", 16401, 10, 0, 0, "public.facilities")]
+    cursor = FakeCursor([tables, [(False,)]])
+    assert table_fingerprint(cursor, [("public", "facilities")]) == (tuple(tables), ())
+    assert len(cursor.executed) == 2
+
+
+@pytest.mark.unit
+def test_table_fingerprint_without_relations():
+    cursor = FakeCursor([])
+    assert table_fingerprint(cursor, []) == ()
+    assert cursor.executed == []
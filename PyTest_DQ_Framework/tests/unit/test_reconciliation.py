@@ -0,0 +1,91 @@
+"""
+Description: Unit tests of the Arrow side of the bucketed reconciliation, no database needed
+Requirement(s): TICKET-1234
+"""
+
+import datetime
+
+import pyarrow as pa
+import pytest
+from src.data_quality.data_set_summary import arrow_kinds, arrow_row_hashes
+from src.data_quality.reconciliation import (BucketSpec, arrow_buckets, filter_buckets, sql_bucket,
+                                             summarize_buckets)
+
+KEYS = pa.table({
+    "id": pa.array([-7, 7, None, 0, -4, 13], pa.int64()),
+    "visit_date": pa.array([datetime.date(2024, 1, 31), datetime.date(2024, 2, 1), None,
+                            datetime.date(1999, 12, 31), datetime.date(2024, 1, 1), datetime.date(2024, 2, 29)]),
+    "cost": pa.array([1.5, 2.25, None, 0.0, -3.125, 10.0]),
+})
+
+
+def buckets_of(table, spec):
+    return arrow_buckets(table, spec, arrow_kinds(table, spec.columns())).to_pylist()
+
+
+@pytest.mark.unit
+def test_modulo_bucket_sign_follows_key():
+    #Postgres mod() truncates toward zero: mod(-7, 4) = -3, Python's -7 % 4 would be 1
+    spec = BucketSpec(["id"], ["cost"], buckets=4, method="modulo")
+    assert buckets_of(KEYS, spec) == [-3, 3, None, 0, 0, 1]
+    assert sql_bucket(spec, {"id": "number"}) == 'mod("id"::bigint, 4)'
+
+
+@pytest.mark.unit
+def test_month_bucket_format():
+    spec = BucketSpec(["visit_date"], ["cost"], method="month")
+    assert buckets_of(KEYS, spec) == ["2024-01", "2024-02", None, "1999-12", "2024-01", "2024-02"]
+    assert sql_bucket(spec, {"visit_date": "temporal"}) == "to_char(\"visit_date\", 'YYYY-MM')"
+
+
+@pytest.mark.unit
+def test_month_bucket_of_timestamps():
+    table = pa.table({"ts": pa.array([datetime.datetime(2024, 3, 31, 23, 59, 59), None], pa.timestamp("us"))})
+    assert buckets_of(table, BucketSpec(["ts"], ["ts"], method="month")) == ["2024-03", None]
+
+
+@pytest.mark.unit
+def test_hash_bucket_of_null_keys():
+    #null keys are hashed as their canonical text, like coalesce(..., '\N') in SQL, so they get a bucket
+    spec = BucketSpec(["id"], ["cost"], buckets=8)
+    buckets = buckets_of(KEYS, spec)
+    assert all(bucket is not None and 0 <= bucket < 8 for bucket in buckets)
+    null_key = pa.table({"id": pa.array([None], pa.int64()), "cost": pa.array([None], pa.float64())})
+    assert buckets[2] == buckets_of(null_key, spec)[0]
+
+
+@pytest.mark.unit
+def test_summarize_buckets_matches_row_by_row_sums():
+    spec = BucketSpec(["id"], ["id", "visit_date", "cost"], buckets=4, method="modulo")
+    kinds = arrow_kinds(KEYS, spec.columns())
+    expected = {}
+    for bucket, row_hash in zip(arrow_buckets(KEYS, spec, kinds).to_pylist(),
+                                arrow_row_hashes(KEYS, spec.checksum_columns, kinds, spec.decimals).to_pylist()):
+        count, checksum = expected.get(bucket, (0, 0))
+        expected[bucket] = (count + 1, checksum + row_hash)
+
+    #split into batches, the per batch aggregates are combined
+    assert summarize_buckets(KEYS.to_batches(max_chunksize=2), spec) == expected
+    assert expected[None][0] == 1
+
+
+@pytest.mark.unit
+def test_summarize_buckets_checksum_does_not_overflow():
+    #60 bit row hashes, the sum of many rows exceeds int64
+    table = pa.table({"id": pa.array([1] * 1000, pa.int64()), "cost": pa.array([1.0] * 1000)})
+    spec = BucketSpec(["id"], ["id", "cost"], buckets=4, method="modulo")
+    row_hash = arrow_row_hashes(table.slice(0, 1), ["id", "cost"], arrow_kinds(table, ["id", "cost"]), 6)[0].as_py()
+    assert summarize_buckets([table], spec) == {1: (1000, 1000 * row_hash)}
+
+
+@pytest.mark.unit
+def test_filter_buckets_keeps_null_bucket():
+    spec = BucketSpec(["id"], ["cost"], buckets=4, method="modulo")
+    filtered = filter_buckets(KEYS.to_batches(max_chunksize=4), spec, [0, None])
+    assert filtered.column("id").to_pylist() == [None, 0, -4]
+
+
+@pytest.mark.unit
+def test_filter_buckets_empty_selection():
+    spec = BucketSpec(["visit_date"], ["cost"], method="month")
+    assert filter_buckets([KEYS], spec, ["2030-01"]).num_rows == 0
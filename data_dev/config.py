@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 
@@ -22,6 +22,31 @@ class PostgresConfig:
     host: str
 
 
+@dataclass
+class PostgresPoolConfig:
+    """
+    A dataclass to store the settings of the pool of PostgreSQL connections shared by the pipeline stages.
+
+    Attributes:
+        min_connections (int): The number of connections opened with the pool and kept open.
+        max_connections (int): The maximum number of connections checked out at once; further checkouts wait.
+        health_check (bool): Run health_check_query on a connection before handing it out,
+                             and replace it with a new connection if it fails.
+        health_check_query (str): The statement used to check that a connection is still usable.
+        reconnect_attempts (int): The number of times a failed connection attempt, or a read on a
+                                  connection lost to the server, is retried on a new connection.
+        reconnect_delay (float): The seconds waited before the first retry, doubled on every retry.
+        checkout_timeout (Optional[float]): The seconds a checkout waits for a free connection. None waits forever.
+    """
+    min_connections: int
+    max_connections: int
+    health_check: bool
+    health_check_query: str
+    reconnect_attempts: int
+    reconnect_delay: float
+    checkout_timeout: Optional[float]
+
+
 @dataclass
 class DataGeneratorConfig:
     """
@@ -34,6 +59,18 @@ class DataGeneratorConfig:
         date_format (str): The format of the date strings (e.g., '%Y-%m-%d').
         facility_types (List[str]): A list of facility types (e.g., "Hospital", "Clinic").
         visits_per_day (Tuple[int, int]): A tuple specifying the range (min, max) of visits per day.
+        vectorized (bool): Generate visits with NumPy as a DataFrame in one pass instead of a list of dicts.
+        seed (Optional[int]): The root seed of every random generator. None draws a fresh seed on each run.
+        shard_days (int): The number of days per shard of the vectorized visits generation.
+        workers (int): The number of processes generating visit shards in parallel (1 = in process).
+        locale (str): The Faker locale used for names, addresses and companies.
+        pooled (bool): Sample patients and facilities from pre-generated pools of Faker values
+                       instead of calling Faker once per row.
+        pool_size (int): The maximum number of values per pool, i.e. the maximum number of distinct
+                         first names, last names, addresses and companies. Pools are capped at the
+                         number of patients (or facilities) they are drawn for.
+        pool_cache_dir (Optional[str]): The directory where pools are cached, keyed by locale, seed and
+                                        pool size. None disables the cache; pools are never cached without a seed.
     """
     num_patients: int
     start_date: str
@@ -41,6 +78,55 @@ class DataGeneratorConfig:
     date_format: str
     facility_types: List[str]
     visits_per_day: Tuple[int, int]
+    vectorized: bool
+    seed: Optional[int]
+    shard_days: int
+    workers: int
+    locale: str
+    pooled: bool
+    pool_size: int
+    pool_cache_dir: Optional[str]
+
+
+@dataclass
+class SrcLoadConfig:
+    """
+    A dataclass to store settings for loading generated data into the src layer.
+
+    Attributes:
+        method (str): The bulk load method, 'copy' streams rows with COPY FROM STDIN,
+                      'execute_values' sends batched multi-row INSERT statements.
+        batch_size (int): The number of rows sent to Postgres per batch.
+    """
+    method: str
+    batch_size: int
+
+
+@dataclass
+class ParquetWriteProfile:
+    """
+    A dataclass to store the Parquet writer settings used by LoadParquet.
+
+    Attributes:
+        compression (str): The compression codec, e.g. 'zstd' (smaller files) or 'snappy' (faster to decode).
+        compression_level (Optional[int]): The codec level, None for the codec default.
+        row_group_size (int): The maximum number of rows per row group.
+        max_rows_per_file (int): The maximum number of rows per file, larger partitions are split.
+        sort_columns (List[str]): Rows are sorted by these columns within every partition during compaction,
+                                  columns missing from a dataset are skipped.
+        dictionary_columns (Optional[List[str]]): The columns written with dictionary encoding,
+                                                  None for every column (the pyarrow default).
+        compact (bool): Rewrite written partitions as sorted files of max_rows_per_file rows,
+                        merging the small files left by streamed and incremental writes. Exports are then
+                        ordered by sort_columns, partitions written with that layout are not rewritten.
+    """
+    compression: str
+    compression_level: Optional[int]
+    row_group_size: int
+    max_rows_per_file: int
+    sort_columns: List[str]
+    dictionary_columns: Optional[List[str]]
+    compact: bool
 
 
 @dataclass
@@ -55,10 +141,32 @@ class ParquetStorageConfig:
         The file system path where Parquet files for patient_sum_treatment_cost_per_facility_type will be stored.
         storage_path_facility_name_min_time_spent_per_visit_date (str):
         The file system path where Parquet files for facility_name_min_time_spent_per_visit_date will be stored.
+        incremental_export (bool):
+        Rewrite only the partition_date months that received new visits since the last export.
+        The first export of a dataset is always a full one.
+        transform_workers (int):
+        The number of LoadParquet transforms run concurrently, each on its own database connection.
+        1 runs them one after another on the shared connection.
+        arrow_native (bool):
+        Stream query results as Arrow record batches straight into pyarrow.dataset.write_dataset,
+        deriving partition columns with Arrow compute kernels, instead of going through pandas.
+        arrow_block_size (int):
+        The number of CSV bytes from COPY parsed per Arrow batch, bounding the memory of arrow_native exports.
+        write_profile (ParquetWriteProfile):
+        The Parquet writer settings (codec, row group and file size, sorting, dictionary columns, compaction).
+        arrow_sidecar (bool):
+        Also write every dataset as an uncompressed Arrow IPC file (_sidecar.arrow) with a manifest holding
+        the Parquet content hash, so readers on the same host can memory map it instead of decoding Parquet.
     """
     storage_path_facility_type_avg_time_spent_per_visit_date: str
     storage_path_patient_sum_treatment_cost_per_facility_type: str
     storage_path_facility_name_min_time_spent_per_visit_date: str
+    incremental_export: bool
+    transform_workers: int
+    arrow_native: bool
+    arrow_block_size: int
+    write_profile: ParquetWriteProfile
+    arrow_sidecar: bool
 
 
 @dataclass
@@ -70,8 +178,14 @@ class LoadConfig:
         last_date (str): The last date for which data should be successfully loaded.
                          This is typically used to track the progress of incremental data loads.
                          The date should be in the format 'YYYY-MM-DD'.
+        full_reload (bool): Ignore the persisted high-water marks and merge the whole source history
+                            up to date_scope again. The watermarks are then reset from what was loaded.
+        partitioned_visits (bool): Create the 3NF visits table range partitioned by month on visit_timestamp.
+                                   Only applies when the table does not exist yet.
     """
     date_scope: str
+    full_reload: bool
+    partitioned_visits: bool
 
 
 @dataclass
@@ -90,7 +204,9 @@ class ReportGeneratorConfig:
 
 # Instance of LoadConfig
 load_config = LoadConfig(
-    date_scope=datetime.now().date().strftime('%Y-%m-%d')  # Example: '2025-01-01'
+    date_scope=datetime.now().date().strftime('%Y-%m-%d'),  # Example: '2025-01-01'
+    full_reload=False,
+    partitioned_visits=False
 )
 
 # Instance of PostgresConfig
@@ -102,6 +218,17 @@ postgres_config = PostgresConfig(
     host='postgres'  # localhost:localhost, podman_network:postgres
 )
 
+# Instance of PostgresPoolConfig
+postgres_pool_config = PostgresPoolConfig(
+    min_connections=1,
+    max_connections=5,  # main stage connection + parquet_storage_config.transform_workers, with headroom
+    health_check=True,
+    health_check_query='SELECT 1',
+    reconnect_attempts=3,
+    reconnect_delay=1.0,
+    checkout_timeout=300.0
+)
+
 # Instance of GeneratorConfig
 data_generator_config = DataGeneratorConfig(
     num_patients=30,
@@ -109,7 +236,32 @@ data_generator_config = DataGeneratorConfig(
     end_date='2030-01-01',
     date_format='%Y-%m-%d',
     facility_types=['Hospital', 'Clinic', 'Urgent Care', 'Specialty Center'],
-    visits_per_day=(7, 10)
+    visits_per_day=(7, 10),
+    vectorized=True,
+    seed=None,  # set an int for reproducible datasets
+    shard_days=366,
+    workers=1,
+    locale='en_US',
+    pooled=True,
+    pool_size=10000,
+    pool_cache_dir='/tmp/data_dev_value_pools'
+)
+
+# Instance of SrcLoadConfig
+src_load_config = SrcLoadConfig(
+    method='copy',  # 'copy' or 'execute_values'
+    batch_size=50000
+)
+
+# Instance of ParquetWriteProfile
+parquet_write_profile = ParquetWriteProfile(
+    compression='zstd',  # 'zstd' or 'snappy'
+    compression_level=3,
+    row_group_size=128 * 1024,
+    max_rows_per_file=1024 * 1024,
+    sort_columns=['visit_date', 'facility_type'],
+    dictionary_columns=['facility_type', 'facility_name'],
+    compact=True
 )
 
 # Instance of ParquetStorageConfig
@@ -119,7 +271,13 @@ parquet_storage_config = ParquetStorageConfig(
     storage_path_patient_sum_treatment_cost_per_facility_type='/parquet_data/'
                                                               'patient_sum_treatment_cost_per_facility_type',
     storage_path_facility_name_min_time_spent_per_visit_date='/parquet_data/'
-                                                             'facility_name_min_time_spent_per_visit_date'
+                                                             'facility_name_min_time_spent_per_visit_date',
+    incremental_export=True,
+    transform_workers=3,
+    arrow_native=True,
+    arrow_block_size=8 * 1024 * 1024,
+    write_profile=parquet_write_profile,
+    arrow_sidecar=False
 )
 
 # Instance of ReportGeneratorConfig
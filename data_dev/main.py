@@ -1,4 +1,4 @@
-from src.connectors.postgre_connector import PostgresConnectorContextManager
+from src.connectors.postgre_connector import PostgresConnectionPool
 from src.data.inject_generated_data_to_src import GeneratedDataLoader
 from src.data.nf3_loader import NF3Loader
 from src.data.parquet_loader import LoadParquet
@@ -12,28 +12,32 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 
 def main():
-    with PostgresConnectorContextManager() as connection_object:
+    # Every stage checks out its own connection, a connection lost in one stage does not affect the next ones
+    with PostgresConnectionPool() as pool:
         # generate and load generated data into src layer
         try:
             logging.info(f"Starting data generation and injection into Postgres...")
-            gdi = GeneratedDataLoader(connection_object.get_connection())
-            gdi.inject_data()
+            with pool.connector() as connection_object:
+                gdi = GeneratedDataLoader(connection_object.get_connection())
+                gdi.inject_data()
             logging.info(f"Data generation and injection into Postgres Completed!")
         except Exception as e:
             logging.exception(f"Data generation and injection into Postgres FAILED: {e}")
         # load to nf3 layer
         try:
             logging.info(f"Starting transformation of injected data...")
-            l3nf = NF3Loader(connection_object.get_connection())
-            l3nf.load_data()
+            with pool.connector() as connection_object:
+                l3nf = NF3Loader(connection_object.get_connection())
+                l3nf.load_data()
             logging.info(f"Transformation of injected data completed!")
         except Exception as e:
             logging.exception(f"Transformation of injected data FAILED: {e}")
-        # load parquet files
+        # load parquet files, concurrent transforms check out their own pooled connections
         try:
             logging.info(f"Starting transformation of parquet files...")
-            ld = LoadParquet(connection_object)
-            ld.load_parquet()
+            with pool.connector() as connection_object:
+                ld = LoadParquet(connection_object, connection_factory=pool.connector)
+                ld.load_parquet()
             logging.info(f"Transformation of parquet files completed!")
         except Exception as e:
             logging.exception(f"Transformation of parquet files FAILED: {e}")
@@ -45,6 +49,5 @@ def main():
         except Exception as e:
             logging.exception(f"Report generation FAILED: {e}")
 
-
 if __name__ == '__main__':
     main()
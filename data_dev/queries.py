@@ -32,19 +32,42 @@ CREATE TABLE IF NOT EXISTS src_generated_visits (
 );
 """
 
-INSERT_SRC_GENERATED_FACILITIES_QUERY = """
+# Bulk load: column order used for COPY FROM STDIN and execute_values batches
+
+SRC_GENERATED_FACILITIES_COLUMNS = ('facility_id', 'facility_name', 'facility_type', 'address', 'city', 'state')
+
+SRC_GENERATED_PATIENTS_COLUMNS = ('patient_id', 'first_name', 'last_name', 'date_of_birth', 'address')
+
+SRC_GENERATED_VISITS_COLUMNS = ('patient_id', 'facility_id', 'visit_timestamp', 'treatment_cost', 'duration_minutes')
+
+COPY_SRC_GENERATED_FACILITIES_QUERY = """
+COPY src_generated_facilities (facility_id, facility_name, facility_type, address, city, state)
+FROM STDIN WITH (FORMAT csv)
+"""
+
+COPY_SRC_GENERATED_PATIENTS_QUERY = """
+COPY src_generated_patients (patient_id, first_name, last_name, date_of_birth, address)
+FROM STDIN WITH (FORMAT csv)
+"""
+
+COPY_SRC_GENERATED_VISITS_QUERY = """
+COPY src_generated_visits (patient_id, facility_id, visit_timestamp, treatment_cost, duration_minutes)
+FROM STDIN WITH (FORMAT csv)
+"""
+
+BULK_INSERT_SRC_GENERATED_FACILITIES_QUERY = """
 INSERT INTO src_generated_facilities (facility_id, facility_name, facility_type, address, city, state)
-VALUES (%(facility_id)s, %(facility_name)s, %(facility_type)s, %(address)s, %(city)s, %(state)s)
+VALUES %s
 """
 
-INSERT_SRC_GENERATED_PATIENTS_QUERY = """
+BULK_INSERT_SRC_GENERATED_PATIENTS_QUERY = """
 INSERT INTO src_generated_patients (patient_id, first_name, last_name, date_of_birth, address)
-VALUES (%(patient_id)s, %(first_name)s, %(last_name)s, %(date_of_birth)s, %(address)s)
+VALUES %s
 """
 
-INSERT_SRC_GENERATED_VISITS_QUERY = """
+BULK_INSERT_SRC_GENERATED_VISITS_QUERY = """
 INSERT INTO src_generated_visits (patient_id, facility_id, visit_timestamp, treatment_cost, duration_minutes)
-VALUES (%(patient_id)s, %(facility_id)s, %(visit_timestamp)s, %(treatment_cost)s, %(duration_minutes)s)
+VALUES %s
 """
 
 # 3NF LAYER
@@ -86,6 +109,46 @@ CREATE TABLE IF NOT EXISTS visits (
 );
 """
 
+# Same columns as CREATE_VISITS_TABLE_QUERY, range partitioned by month on visit_timestamp.
+# The primary key of a partitioned table has to include the partition key.
+CREATE_PARTITIONED_VISITS_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS visits (
+    id SERIAL, -- Auto-incrementing id
+    patient_id INT NOT NULL, -- Foreign key referencing the patients table
+    facility_id INT NOT NULL, -- Foreign key referencing the facilities table
+    visit_timestamp TIMESTAMP NOT NULL, -- Timestamp of the visit, partition key
+    treatment_cost NUMERIC(10, 2) NOT NULL, -- Cost of the treatment
+    duration_minutes INT NOT NULL, -- Duration of the visit in minutes
+    PRIMARY KEY (id, visit_timestamp),
+    FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
+    FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
+) PARTITION BY RANGE (visit_timestamp);
+"""
+
+# {partition_name} and {table_name} are formatted in by the caller, the bounds are query parameters
+CREATE_MONTHLY_PARTITION_QUERY = """
+CREATE TABLE IF NOT EXISTS {partition_name}
+PARTITION OF {table_name}
+FOR VALUES FROM (%(month_start)s) TO (%(month_end)s);
+"""
+
+IS_TABLE_PARTITIONED_QUERY = """
+SELECT c.relkind = 'p'
+FROM pg_class c
+WHERE c.oid = to_regclass(%(table_name)s);
+"""
+
+# First day of every month between the first and the last source visit of the slice to merge
+GET_VISITS_SLICE_MONTHS_QUERY = """
+SELECT generate_series(date_trunc('month', first_visit), date_trunc('month', last_visit), interval '1 month')::date
+FROM (
+    SELECT MIN(visit_timestamp) AS first_visit, MAX(visit_timestamp) AS last_visit
+    FROM src_generated_visits
+    WHERE visit_timestamp > %(watermark)s
+      AND visit_timestamp < %(date_scope)s::date + 1
+) AS slice;
+"""
+
 MERGE_FACILITIES_QUERY = """
 MERGE INTO facilities AS target
 USING public.src_generated_facilities AS source
@@ -110,7 +173,7 @@ WHEN NOT MATCHED THEN
 
 MERGE_VISITS_QUERY = """
 WITH src_visits AS (
-    SELECT 
+    SELECT DISTINCT ON (f.id, p.id, sgv.visit_timestamp)
         f.id AS facility_id,
         p.id AS patient_id,
         sgv.visit_timestamp,
@@ -121,7 +184,10 @@ WITH src_visits AS (
         ON sgv.facility_id = f.external_id 
     JOIN patients p
         ON sgv.patient_id = p.external_id 
-    WHERE visit_timestamp::date <= %(date_scope)s
+    WHERE sgv.visit_timestamp > %(watermark)s
+      AND sgv.visit_timestamp < %(date_scope)s::date + 1
+    -- Deterministic pick among source duplicates of a natural key (src_generated_visits has no id)
+    ORDER BY f.id, p.id, sgv.visit_timestamp, sgv.treatment_cost, sgv.duration_minutes
 )
 MERGE INTO visits AS target
 USING src_visits AS source
@@ -135,6 +201,207 @@ WHEN NOT MATCHED THEN
     VALUES (source.facility_id, source.patient_id, source.visit_timestamp, source.treatment_cost, source.duration_minutes);
 """
 
+# INDEXES
+# Every layer maps table name -> {index name: CREATE INDEX statement}, see SchemaManager
+
+
+CREATE_SRC_GENERATED_FACILITIES_ID_INDEX_QUERY = """
+CREATE UNIQUE INDEX IF NOT EXISTS src_generated_facilities_facility_id_key
+ON src_generated_facilities (facility_id);
+"""
+
+CREATE_SRC_GENERATED_PATIENTS_ID_INDEX_QUERY = """
+CREATE UNIQUE INDEX IF NOT EXISTS src_generated_patients_patient_id_key
+ON src_generated_patients (patient_id);
+"""
+
+CREATE_SRC_GENERATED_VISITS_TIMESTAMP_INDEX_QUERY = """
+CREATE INDEX IF NOT EXISTS src_generated_visits_visit_timestamp_idx
+ON src_generated_visits (visit_timestamp);
+"""
+
+CREATE_FACILITIES_EXTERNAL_ID_INDEX_QUERY = """
+CREATE UNIQUE INDEX IF NOT EXISTS facilities_external_id_key
+ON facilities (external_id);
+"""
+
+CREATE_PATIENTS_EXTERNAL_ID_INDEX_QUERY = """
+CREATE UNIQUE INDEX IF NOT EXISTS patients_external_id_key
+ON patients (external_id);
+"""
+
+CREATE_VISITS_NATURAL_KEY_INDEX_QUERY = """
+CREATE UNIQUE INDEX IF NOT EXISTS visits_natural_key
+ON visits (facility_id, patient_id, visit_timestamp);
+"""
+
+CREATE_VISITS_TIMESTAMP_INDEX_QUERY = """
+CREATE INDEX IF NOT EXISTS visits_visit_timestamp_idx
+ON visits (visit_timestamp);
+"""
+
+# Used by the month filters of the incremental parquet export, which apply to visit_timestamp::date
+CREATE_VISITS_VISIT_DATE_INDEX_QUERY = """
+CREATE INDEX IF NOT EXISTS visits_visit_date_idx
+ON visits ((visit_timestamp::date));
+"""
+
+SRC_GENERATED_INDEXES = {
+    'src_generated_facilities': {
+        'src_generated_facilities_facility_id_key': CREATE_SRC_GENERATED_FACILITIES_ID_INDEX_QUERY
+    },
+    'src_generated_patients': {
+        'src_generated_patients_patient_id_key': CREATE_SRC_GENERATED_PATIENTS_ID_INDEX_QUERY
+    },
+    'src_generated_visits': {
+        'src_generated_visits_visit_timestamp_idx': CREATE_SRC_GENERATED_VISITS_TIMESTAMP_INDEX_QUERY
+    }
+}
+
+NF3_INDEXES = {
+    'facilities': {
+        'facilities_external_id_key': CREATE_FACILITIES_EXTERNAL_ID_INDEX_QUERY
+    },
+    'patients': {
+        'patients_external_id_key': CREATE_PATIENTS_EXTERNAL_ID_INDEX_QUERY
+    },
+    'visits': {
+        'visits_natural_key': CREATE_VISITS_NATURAL_KEY_INDEX_QUERY,
+        'visits_visit_timestamp_idx': CREATE_VISITS_TIMESTAMP_INDEX_QUERY,
+        'visits_visit_date_idx': CREATE_VISITS_VISIT_DATE_INDEX_QUERY
+    }
+}
+
+GET_INDEXES_QUERY = """
+SELECT tablename, indexname, indexdef
+FROM pg_indexes
+WHERE schemaname = current_schema()
+  AND tablename = ANY(%(table_names)s);
+"""
+
+# Keeps the first loaded row of every natural key, so that visits_natural_key can be created
+# on tables loaded before it existed
+DELETE_DUPLICATE_VISITS_QUERY = """
+DELETE FROM visits v
+USING visits d
+WHERE v.facility_id = d.facility_id
+  AND v.patient_id = d.patient_id
+  AND v.visit_timestamp = d.visit_timestamp
+  AND v.id > d.id;
+"""
+
+# ETL CONTROL
+
+
+CREATE_ETL_WATERMARKS_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS etl_watermarks (
+    table_name VARCHAR(100) PRIMARY KEY, -- Name of the incrementally loaded table
+    high_water_mark TIMESTAMP NOT NULL, -- Last source timestamp loaded into the table
+    updated_at TIMESTAMP NOT NULL DEFAULT now() -- Time of the last watermark change
+);
+"""
+
+GET_WATERMARK_QUERY = """
+SELECT high_water_mark
+FROM etl_watermarks
+WHERE table_name = %(table_name)s;
+"""
+
+UPDATE_VISITS_WATERMARK_QUERY = """
+INSERT INTO etl_watermarks (table_name, high_water_mark, updated_at)
+SELECT %(table_name)s, MAX(visit_timestamp), now()
+FROM src_generated_visits
+WHERE visit_timestamp > %(watermark)s
+  AND visit_timestamp < %(date_scope)s::date + 1
+HAVING MAX(visit_timestamp) IS NOT NULL
+ON CONFLICT (table_name) DO UPDATE
+SET high_water_mark = EXCLUDED.high_water_mark,
+    updated_at = EXCLUDED.updated_at;
+"""
+
+CREATE_ETL_TABLE_VERSIONS_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS etl_table_versions (
+    table_name VARCHAR(100) PRIMARY KEY, -- Schema qualified name of a table written by a loader
+    version BIGINT NOT NULL, -- Incremented by every load that writes the table
+    updated_at TIMESTAMP NOT NULL DEFAULT now() -- Time of the last load
+);
+"""
+
+# Committed together with the loaded data, so readers that cache query results
+# (e.g. the DQ framework) can tell that their cached results are stale.
+# Unqualified names are qualified with the current schema, so same-named tables of other schemas get their own row
+BUMP_TABLE_VERSIONS_QUERY = """
+INSERT INTO etl_table_versions (table_name, version, updated_at)
+SELECT CASE WHEN strpos(name, '.') > 0 THEN name ELSE current_schema() || '.' || name END, 1, now()
+FROM unnest(%(table_names)s::varchar[]) AS name
+ON CONFLICT (table_name) DO UPDATE
+SET version = etl_table_versions.version + 1,
+    updated_at = EXCLUDED.updated_at;
+"""
+
+SRC_GENERATED_TABLES = ['src_generated_facilities', 'src_generated_patients', 'src_generated_visits']
+
+NF3_TABLES = ['facilities', 'patients', 'visits']
+
+CREATE_PARQUET_EXPORT_WATERMARKS_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS parquet_export_watermarks (
+    export_name VARCHAR(200) PRIMARY KEY, -- Storage path of the exported dataset
+    last_visit_id BIGINT NOT NULL, -- Highest visits.id included in the export
+    updated_at TIMESTAMP NOT NULL DEFAULT now() -- Time of the last export
+);
+"""
+
+GET_PARQUET_EXPORT_WATERMARK_QUERY = """
+SELECT last_visit_id
+FROM parquet_export_watermarks
+WHERE export_name = %(export_name)s;
+"""
+
+UPDATE_PARQUET_EXPORT_WATERMARK_QUERY = """
+INSERT INTO parquet_export_watermarks (export_name, last_visit_id, updated_at)
+VALUES (%(export_name)s, %(last_visit_id)s, now())
+ON CONFLICT (export_name) DO UPDATE
+SET last_visit_id = EXCLUDED.last_visit_id,
+    updated_at = EXCLUDED.updated_at;
+"""
+
+GET_MAX_VISIT_ID_QUERY = """
+SELECT COALESCE(MAX(id), 0) AS max_visit_id
+FROM visits;
+"""
+
+# partition_date months that received visits between two export watermarks
+GET_CHANGED_VISIT_MONTHS_QUERY = """
+SELECT DISTINCT date_trunc('month', visit_timestamp)::date AS month_start
+FROM visits
+WHERE id > %(last_visit_id)s
+  AND id <= %(max_visit_id)s
+ORDER BY month_start;
+"""
+
+# {query} is a TRANSFORM_*_SQL query with a visit_date column, formatted in by the caller.
+# The filter only references a grouping column, so Postgres pushes it below the aggregation.
+MONTH_SLICE_QUERY = """
+SELECT *
+FROM ({query}) AS month_slice
+WHERE month_slice.visit_date >= %(month_start)s
+  AND month_slice.visit_date < %(month_end)s
+"""
+
+# Column names of a query, {query} is formatted in by the caller. LIMIT 0 returns before the query is executed.
+QUERY_COLUMNS_QUERY = """
+SELECT *
+FROM ({query}) AS query_columns
+LIMIT 0
+"""
+
+# {query} ordered by {order_by}, a list of quoted columns, so that a Parquet export is streamed already sorted
+SORTED_EXPORT_QUERY = """
+SELECT *
+FROM ({query}) AS sorted_export
+ORDER BY {order_by}
+"""
+
 # PARQUET PREPARATION
 
 TRANSFORM_FACILITY_TYPE_AVG_TIME_SPENT_PER_VISIT_DATE_SQL = """
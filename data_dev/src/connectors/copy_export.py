@@ -0,0 +1,242 @@
+import io
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import psycopg2.extensions
+
+# Postgres type OID -> Arrow type used to parse the CSV column produced by COPY.
+# numeric is parsed as float64, which is what pd.read_sql (coerce_float=True) returns.
+COPY_ARROW_TYPES: Dict[int, pa.DataType] = {
+    16: pa.bool_(),              # bool
+    20: pa.int64(),              # int8
+    21: pa.int64(),              # int2
+    23: pa.int64(),              # int4
+    700: pa.float64(),           # float4
+    701: pa.float64(),           # float8
+    1700: pa.float64(),          # numeric
+    1082: pa.date32(),           # date
+    1114: pa.timestamp('us'),    # timestamp
+    1184: pa.timestamp('us', 'UTC'),  # timestamptz, COPY writes it with the session UTC offset
+    25: pa.string(),             # text
+    1042: pa.string(),           # bpchar
+    1043: pa.string(),           # varchar
+    19: pa.string(),             # name
+}
+
+
+def strip_query(query: str) -> str:
+    """
+    Prepare a query to be embedded as a subquery or in a COPY statement.
+
+    Args:
+        query (str): The SQL query, optionally terminated by a semicolon.
+
+    Returns:
+        str: The query without surrounding whitespace and trailing semicolons.
+    """
+    return query.strip().rstrip(';').strip()
+
+
+def describe_query(cursor, query: str, params=None) -> List[Tuple[str, int]]:
+    """
+    Get the column names and type OIDs of a query without fetching any row.
+
+    Args:
+        cursor: A psycopg2 cursor.
+        query (str): The SQL query to describe.
+        params (dict, optional): Query parameters.
+
+    Returns:
+        List[Tuple[str, int]]: A (column name, type OID) pair per result column.
+    """
+    cursor.execute(f"SELECT * FROM ({strip_query(query)}) AS copy_query LIMIT 0", params)
+    return [(desc[0], desc[1]) for desc in cursor.description]
+
+
+def copy_statement(cursor, query: str, params=None) -> str:
+    """
+    Build the COPY ... TO STDOUT statement for a query.
+
+    COPY does not accept bind parameters, so they are interpolated client side by psycopg2.
+
+    Args:
+        cursor: A psycopg2 cursor.
+        query (str): The SQL query to export.
+        params (dict, optional): Query parameters.
+
+    Returns:
+        str: The COPY statement.
+    """
+    query = strip_query(query)
+    if params:
+        encoding = psycopg2.extensions.encodings[cursor.connection.encoding]
+        query = cursor.mogrify(query, params).decode(encoding)
+    return f"COPY ({query}) TO STDOUT WITH (FORMAT csv)"
+
+
+def arrow_schema(columns: List[Tuple[str, int]]) -> pa.Schema:
+    """
+    Build the Arrow schema of a query from its column description.
+
+    Args:
+        columns (List[Tuple[str, int]]): The (column name, type OID) description of the query.
+
+    Returns:
+        pa.Schema: The schema of the tables and batches parsed from the COPY output of the query.
+    """
+    return pa.schema([(name, COPY_ARROW_TYPES.get(oid, pa.string())) for name, oid in columns])
+
+
+def csv_options(columns: List[Tuple[str, int]], block_size: Optional[int] = None
+                ) -> Tuple[pa_csv.ReadOptions, pa_csv.ParseOptions, pa_csv.ConvertOptions]:
+    """
+    Build the Arrow CSV reader options matching the COPY CSV output of a query.
+
+    Columns are read under positional names because a query may return duplicated names.
+    Types missing from COPY_ARROW_TYPES are read as text. Quoted values may span lines (e.g. addresses),
+    and an empty line is a row whose single column is NULL.
+
+    Args:
+        columns (List[Tuple[str, int]]): The (column name, type OID) description of the query.
+        block_size (int, optional): The number of CSV bytes parsed per batch, pyarrow's default if None.
+
+    Returns:
+        Tuple[ReadOptions, ParseOptions, ConvertOptions]: The options for pyarrow.csv.
+    """
+    positional = [f'c{i}' for i in range(len(columns))]
+    column_types = {name: COPY_ARROW_TYPES.get(oid, pa.string()) for name, (_, oid) in zip(positional, columns)}
+    read_options = pa_csv.ReadOptions(column_names=positional)
+    if block_size:
+        read_options.block_size = block_size
+    parse_options = pa_csv.ParseOptions(newlines_in_values=True, ignore_empty_lines=False)
+    convert_options = pa_csv.ConvertOptions(
+        column_types=column_types,
+        null_values=[''],  # COPY writes NULL as an unquoted empty field
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,  # "" is an empty string, not NULL
+        true_values=['t'],
+        false_values=['f']
+    )
+    return read_options, parse_options, convert_options
+
+
+def copy_query_to_table(cursor, query: str, params=None) -> Tuple[pa.Table, List[Tuple[str, int]]]:
+    """
+    Export a query with COPY (query) TO STDOUT and parse it column-wise with the Arrow CSV reader.
+
+    Args:
+        cursor: A psycopg2 cursor.
+        query (str): The SQL query to export.
+        params (dict, optional): Query parameters.
+
+    Returns:
+        Tuple[pa.Table, List[Tuple[str, int]]]: The result table (with the query column names)
+        and the (column name, type OID) description of its columns.
+    """
+    columns = describe_query(cursor, query, params)
+    read_options, parse_options, convert_options = csv_options(columns)
+
+    buffer = io.BytesIO()
+    cursor.copy_expert(copy_statement(cursor, query, params), buffer)
+    buffer.seek(0)
+
+    table = pa_csv.read_csv(buffer, read_options=read_options, parse_options=parse_options,
+                            convert_options=convert_options)
+    return table.rename_columns([name for name, _ in columns]), columns
+
+
+@contextmanager
+def copy_query_to_batches(cursor, query: str, params=None, block_size: Optional[int] = None):
+    """
+    Stream a query with COPY (query) TO STDOUT as Arrow record batches, with bounded memory.
+
+    COPY writes into a pipe from a background thread while the streaming Arrow CSV reader parses
+    it block by block, so the result is never held in memory as a whole. Types missing from
+    COPY_ARROW_TYPES are returned as text.
+
+    Used as a context manager: leaving the block stops the COPY if the batches were not all
+    consumed and waits for the background thread. The cursor must stay open until then.
+
+    Args:
+        cursor: A psycopg2 cursor.
+        query (str): The SQL query to export.
+        params (dict, optional): Query parameters.
+        block_size (int, optional): The number of CSV bytes parsed per batch, pyarrow's default if None.
+
+    Yields:
+        pa.RecordBatchReader: The result batches, with the query column names.
+
+    Raises:
+        Exception: The error raised by COPY, once the batches read so far have been consumed.
+    """
+    columns = describe_query(cursor, query, params)
+    schema = arrow_schema(columns)
+    read_options, parse_options, convert_options = csv_options(columns, block_size)
+    statement = copy_statement(cursor, query, params)
+
+    def batches():
+        read_fd, write_fd = os.pipe()
+        reader = os.fdopen(read_fd, 'rb')
+        writer = os.fdopen(write_fd, 'wb')
+        errors = []
+
+        def produce():
+            try:
+                cursor.copy_expert(statement, writer)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                try:
+                    writer.close()
+                except OSError:
+                    pass  # the consumer closed the read end
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            # The Arrow CSV reader refuses an empty stream, a query without rows has no batch
+            if reader.peek(1):
+                stream = pa_csv.open_csv(reader, read_options=read_options, parse_options=parse_options,
+                                         convert_options=convert_options)
+                for batch in stream:
+                    yield pa.RecordBatch.from_arrays(batch.columns, schema=schema)
+        except Exception:
+            # A failed COPY ends the stream early, report the COPY error rather than the parse error
+            if not errors:
+                raise
+        finally:
+            # Closing the read end first unblocks COPY if the consumer stopped early
+            reader.close()
+            producer.join()
+        if errors:
+            raise errors[0]
+
+    generator = batches()
+    try:
+        yield pa.RecordBatchReader.from_batches(schema, generator)
+    finally:
+        generator.close()
+
+
+def cast_unmapped_columns(df, table: pa.Table, columns: List[Tuple[str, int]], cursor):
+    """
+    Cast the columns read as text (types missing from COPY_ARROW_TYPES) with psycopg2 typecasters.
+
+    This keeps results type-identical to the DB-API path for less common types (interval, json, ...).
+
+    Args:
+        df (DataFrame): The DataFrame converted from the COPY table, modified in place.
+        table (pa.Table): The COPY table df was converted from.
+        columns (List[Tuple[str, int]]): The (column name, type OID) description of the query.
+        cursor: The psycopg2 cursor used for the export.
+    """
+    for position, (_, oid) in enumerate(columns):
+        caster = psycopg2.extensions.string_types.get(oid)
+        if oid in COPY_ARROW_TYPES or caster is None:
+            continue
+        values = [caster(value, cursor) for value in table.column(position).to_pylist()]
+        df.isetitem(position, values)
@@ -1,11 +1,191 @@
-from typing import Optional
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
 import psycopg2
 from psycopg2.extensions import connection
+from psycopg2.pool import ThreadedConnectionPool
 
 import pandas as pd
+import pyarrow as pa
 from pandas import DataFrame
 
-from data_dev.config import postgres_config
+from data_dev.config import postgres_config, postgres_pool_config
+from data_dev.src.connectors.copy_export import copy_query_to_table, copy_query_to_batches, cast_unmapped_columns
+
+T = TypeVar('T')
+
+# Errors raised by psycopg2 when the server can not be reached or the connection was lost
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+def retry_on_connection_error(action: Callable[[], T], description: str) -> T:
+    """
+    Call action, retrying it with an exponential backoff while it fails with a connection error.
+
+    Args:
+        action (Callable[[], T]): The function to call, e.g. opening a connection.
+        description (str): What action does, used in the log messages.
+
+    Returns:
+        T: The result of action.
+
+    Raises:
+        psycopg2.Error: The last connection error, once postgres_pool_config.reconnect_attempts retries failed.
+    """
+    for attempt in range(postgres_pool_config.reconnect_attempts + 1):
+        try:
+            return action()
+        except CONNECTION_ERRORS as e:
+            if attempt == postgres_pool_config.reconnect_attempts:
+                raise
+            delay = postgres_pool_config.reconnect_delay * 2 ** attempt
+            logging.warning(f"{description} failed ({str(e).strip()}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+class PostgresConnectionPool:
+    """
+    Thread safe pool of PostgreSQL connections.
+
+    Wraps psycopg2's ThreadedConnectionPool, so pipeline stages and concurrent transforms each check out
+    their own connection. Unlike ThreadedConnectionPool, a checkout waits for a free connection instead of
+    failing once max_connections are in use. Connections are health checked before being handed out and
+    replaced when they were lost, and opening them is retried on connection errors.
+
+    Used as a context manager, every connection of the pool is closed on exit.
+
+    Attributes:
+        min_connections (int): The number of connections opened with the pool and kept open.
+        max_connections (int): The maximum number of connections checked out at once.
+        health_check (bool): Whether connections are checked with health_check_query before being handed out.
+        health_check_query (str): The statement used to check a connection.
+        checkout_timeout (Optional[float]): The seconds a checkout waits for a free connection, None waits forever.
+    """
+
+    def __init__(self, min_connections: Optional[int] = None, max_connections: Optional[int] = None):
+        """
+        Initialize the pool, its connections are opened on the first checkout.
+
+        Args:
+            min_connections (Optional[int]): Overrides postgres_pool_config.min_connections.
+            max_connections (Optional[int]): Overrides postgres_pool_config.max_connections.
+        """
+        self.min_connections = (min_connections if min_connections is not None
+                                else postgres_pool_config.min_connections)
+        self.max_connections = (max_connections if max_connections is not None
+                                else postgres_pool_config.max_connections)
+        self.health_check = postgres_pool_config.health_check
+        self.health_check_query = postgres_pool_config.health_check_query
+        self.checkout_timeout = postgres_pool_config.checkout_timeout
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                self._pool = retry_on_connection_error(
+                    lambda: ThreadedConnectionPool(
+                        self.min_connections,
+                        self.max_connections,
+                        host=postgres_config.host,
+                        port=postgres_config.port,
+                        database=postgres_config.db,
+                        user=postgres_config.user,
+                        password=postgres_config.password
+                    ),
+                    'Opening the connection pool'
+                )
+            return self._pool
+
+    def _is_healthy(self, conn: connection) -> bool:
+        if conn.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(self.health_check_query)
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self) -> connection:
+        pool = self._get_pool()
+        conn = pool.getconn()
+        if not self._is_healthy(conn):
+            # The server closed it (restart, idle timeout, network failure), open a new one instead
+            logging.warning('Discarding a broken pooled connection')
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+            if not self._is_healthy(conn):
+                pool.putconn(conn, close=True)
+                raise psycopg2.OperationalError('Pooled connection failed its health check')
+        return conn
+
+    def getconn(self) -> connection:
+        """
+        Check out a healthy connection, waiting for one to be released if max_connections are in use.
+
+        Returns:
+            connection: The connection, to be given back with putconn.
+
+        Raises:
+            TimeoutError: If no connection was released within checkout_timeout.
+            psycopg2.Error: If no connection could be opened, after the configured retries.
+        """
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise TimeoutError(f'No pooled connection was released within {self.checkout_timeout}s')
+        try:
+            return retry_on_connection_error(self._checkout, 'Checking out a pooled connection')
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn: connection, close: bool = False):
+        """
+        Give a connection back to the pool, an open transaction is rolled back.
+
+        Args:
+            conn (connection): A connection returned by getconn.
+            close (bool): Close the connection instead of keeping it, e.g. after a connection error.
+        """
+        try:
+            self._get_pool().putconn(conn, close=close or bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def connector(self, autocommit: bool = False) -> 'PostgresConnectorContextManager':
+        """
+        Create a connector that checks out a connection of this pool for the duration of its with block.
+
+        Passed as the connection_factory of LoadParquet, every concurrent transform gets its own connection.
+
+        Args:
+            autocommit (bool): Enable or disable autocommit mode for the connection.
+
+        Returns:
+            PostgresConnectorContextManager: The connector, not connected until it is entered.
+        """
+        return PostgresConnectorContextManager(autocommit=autocommit, pool=self)
+
+    def close(self):
+        """
+        Close every connection of the pool, a later checkout opens a new pool.
+        """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
 
 
 class PostgresConnectorContextManager:
@@ -16,6 +196,10 @@ class PostgresConnectorContextManager:
     using a context manager. It handles connection setup and teardown, and provides
     utility methods for interacting with the database.
 
+    With a pool, the connection is checked out from it on enter and given back on exit
+    instead of being opened and closed. Reads (get_data_*) that fail because the connection
+    was lost are retried on a new connection.
+
     Attributes:
         host (str): Hostname of the PostgreSQL server.
         port (int): Port number of the PostgreSQL server.
@@ -24,15 +208,18 @@ class PostgresConnectorContextManager:
         password (str): Password for authentication.
         autocommit (bool): Whether to enable autocommit mode for the connection.
         connection (Optional[connection]): The active database connection object.
+        pool (Optional[PostgresConnectionPool]): The pool connections are checked out from, None to connect directly.
     """
 
-    def __init__(self, autocommit: bool = False):
+    def __init__(self, autocommit: bool = False, pool: Optional[PostgresConnectionPool] = None):
         """
         Initialize the database context manager.
 
         Args:
             autocommit (bool): Enable or disable autocommit mode for the connection.
                                Defaults to False.
+            pool (Optional[PostgresConnectionPool]): Check the connection out from this pool.
+                                                     Defaults to None, a connection of its own.
         """
         self.host = postgres_config.host
         self.port = postgres_config.port
@@ -41,6 +228,33 @@ class PostgresConnectorContextManager:
         self.password = postgres_config.password
         self.autocommit = autocommit
         self.connection: Optional[connection] = None
+        self.pool = pool
+
+    def _connect(self) -> connection:
+        if self.pool is not None:
+            conn = self.pool.getconn()
+        else:
+            conn = retry_on_connection_error(
+                lambda: psycopg2.connect(
+                    host=self.host,
+                    port=self.port,
+                    database=self.db,
+                    user=self.user,
+                    password=self.password
+                ),
+                'Connecting to Postgres'
+            )
+        conn.autocommit = self.autocommit
+        return conn
+
+    def _release(self, broken: bool = False):
+        if self.connection is None:
+            return
+        if self.pool is not None:
+            self.pool.putconn(self.connection, close=broken)
+        else:
+            self.connection.close()
+        self.connection = None
 
     def __enter__(self):
         """
@@ -49,14 +263,7 @@ class PostgresConnectorContextManager:
         Returns:
             PostgresConnectorContextManager: The context manager instance with an active connection.
         """
-        self.connection = psycopg2.connect(
-            host=self.host,
-            port=self.port,
-            database=self.db,
-            user=self.user,
-            password=self.password
-        )
-        self.connection.autocommit = self.autocommit
+        self.connection = self._connect()
         return self
 
     def __exit__(self, exc_type, exc_value, exc_tb):
@@ -68,8 +275,7 @@ class PostgresConnectorContextManager:
             exc_value (Exception): The exception instance raised, if any.
             exc_tb (traceback): The traceback object associated with the exception, if any.
         """
-        if self.connection:
-            self.connection.close()
+        self._release()
 
     def get_connection(self) -> Optional[connection]:
         """
@@ -80,12 +286,66 @@ class PostgresConnectorContextManager:
         """
         return self.connection
 
-    def get_data_sql(self, query: str) -> DataFrame:
+    def reconnect(self):
+        """
+        Replace the connection with a new one, e.g. after it was lost. Uncommitted work is lost.
+
+        Connection objects previously returned by get_connection are not updated.
+        """
+        self._release(broken=True)
+        self.connection = self._connect()
+
+    def _ensure_connection(self):
+        # A connection released after a disconnect is replaced on the next read, a failure to connect is retried
+        if self.connection is None:
+            self.connection = self._connect()
+
+    def _rollback(self):
+        # Called while an error propagates, so it must not raise and hide that error
+        if self.connection is None or self.connection.closed:
+            return
+        try:
+            self.connection.rollback()
+        except psycopg2.Error as e:
+            # e.g. the consumer of get_data_arrow failed while the COPY was still running, the connection
+            # is left in the COPY OUT state and can not be reused, so it is replaced
+            logging.warning(f"Rollback failed ({str(e).strip()}), replacing the connection")
+            self._release(broken=True)
+            try:
+                self.connection = self._connect()
+            except CONNECTION_ERRORS as connect_error:
+                # the next read connects again, see _ensure_connection
+                logging.warning(f"Could not replace the connection: {str(connect_error).strip()}")
+
+    def _is_disconnect(self, error: Exception, attempt: int) -> bool:
+        # Only errors that closed the connection are retried, query errors are raised as is.
+        # pandas wraps driver errors in its own DatabaseError, the psycopg2 error is its cause.
+        while error is not None and not isinstance(error, CONNECTION_ERRORS):
+            error = error.__cause__
+        # After a failed reconnect there is no connection left, which is a disconnect as well
+        return (error is not None and (self.connection is None or bool(self.connection.closed))
+                and attempt < postgres_pool_config.reconnect_attempts)
+
+    def _with_reconnect(self, read: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            try:
+                self._ensure_connection()
+                return read()
+            except Exception as e:
+                if not self._is_disconnect(e, attempt):
+                    raise
+                attempt += 1
+                logging.warning(f"Connection lost ({str(e).strip()}), reconnecting (attempt {attempt})")
+                self._release(broken=True)
+
+    def get_data_sql(self, query: str, params: Optional[dict] = None) -> DataFrame:
         """
         Execute a SQL query and return the results as a pandas DataFrame.
 
         Args:
             query (str): The SQL query to execute.
+            params (Optional[dict]): Query parameters, referenced as %(name)s in the query.
 
         Returns:
             DataFrame: A pandas DataFrame containing the query results.
@@ -94,8 +354,81 @@ class PostgresConnectorContextManager:
             Exception: If the query execution fails, an exception is raised with the error message.
         """
         try:
-            data_df = pd.read_sql(query, self.connection)
+            data_df = self._with_reconnect(lambda: pd.read_sql(query, self.connection, params=params))
             return data_df
         except Exception as e:
             print(f'Failed to receive data from DB\nError: {e}\n')
             raise
+
+    def get_data_copy(self, query: str) -> DataFrame:
+        """
+        Execute a SQL query through COPY ... TO STDOUT and return the results as a pandas DataFrame.
+
+        The CSV stream produced by Postgres is parsed column-wise by pyarrow instead of building
+        a Python object per row. Column types match the ones returned by get_data_sql.
+
+        Args:
+            query (str): The SQL query to execute.
+
+        Returns:
+            DataFrame: A pandas DataFrame containing the query results.
+
+        Raises:
+            Exception: If the query execution fails, an exception is raised with the error message.
+        """
+        def read():
+            with self.connection.cursor() as cursor:
+                table, columns = copy_query_to_table(cursor, query)
+                data_df = table.to_pandas()
+                cast_unmapped_columns(data_df, table, columns, cursor)
+            return data_df
+
+        try:
+            return self._with_reconnect(read)
+        except Exception as e:
+            self._rollback()
+            print(f'Failed to receive data from DB\nError: {e}\n')
+            raise
+
+    @contextmanager
+    def get_data_arrow(self, query: str, params: Optional[dict] = None,
+                       block_size: Optional[int] = None) -> Iterator[pa.RecordBatchReader]:
+        """
+        Stream the results of a SQL query as Arrow record batches, through COPY ... TO STDOUT.
+
+        Used as a context manager, the batches are parsed while they are consumed, so results larger
+        than memory can be processed. Types missing from COPY_ARROW_TYPES are returned as text.
+        A connection lost before the stream starts is replaced, batches already consumed are never replayed.
+
+        Args:
+            query (str): The SQL query to execute.
+            params (Optional[dict]): Query parameters, referenced as %(name)s in the query.
+            block_size (Optional[int]): The number of CSV bytes parsed per batch, pyarrow's default if None.
+
+        Yields:
+            pa.RecordBatchReader: The query results.
+
+        Raises:
+            Exception: If the query execution fails, an exception is raised with the error message.
+        """
+        attempt = 0
+        while True:
+            streaming = False
+            try:
+                self._ensure_connection()
+                with self.connection.cursor() as cursor:
+                    with copy_query_to_batches(cursor, query, params, block_size) as reader:
+                        streaming = True
+                        yield reader
+                return
+            except Exception as e:
+                if not streaming and self._is_disconnect(e, attempt):
+                    attempt += 1
+                    logging.warning(f"Connection lost ({str(e).strip()}), reconnecting (attempt {attempt})")
+                    self._release(broken=True)
+                    continue
+                self._rollback()
+                # Errors of the consumer of the batches (e.g. the Parquet write) are not DB errors
+                if not streaming or isinstance(e, psycopg2.Error):
+                    print(f'Failed to stream data from DB\nError: {e}\n')
+                raise
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# Arrow IPC (Feather v2) copy of a whole Parquet dataset and its manifest, stored at the dataset root.
+# Names starting with '_' are skipped by pyarrow datasets, and glob only matches '*.parquet',
+# so readers of the Parquet files never see them.
+SIDECAR_FILE = '_sidecar.arrow'
+SIDECAR_MANIFEST = '_sidecar.json'
+SIDECAR_FORMAT_VERSION = 1
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def dataset_files(storage_path):
+    """
+    Lists the Parquet files of a dataset the way glob('**/*.parquet', recursive=True) does.
+
+    Hidden files and directories (name starting with '.', e.g. the staging directory) are skipped.
+
+    Args:
+        storage_path (str): The path of the dataset.
+
+    Returns:
+        List[str]: The file paths relative to storage_path, with '/' separators, sorted.
+    """
+    files = []
+    for root, dirs, names in os.walk(storage_path):
+        dirs[:] = [name for name in dirs if not name.startswith('.')]
+        for name in names:
+            if name.endswith('.parquet') and not name.startswith('.'):
+                files.append(os.path.relpath(os.path.join(root, name), storage_path).replace(os.sep, '/'))
+    return sorted(files)
+
+
+def parquet_content_hash(storage_path, files):
+    """
+    Computes the content hash of the Parquet files of a dataset.
+
+    The hash is a sha256 over, for every file in order, its relative path, a NUL byte and its bytes.
+    The DQ framework computes the same hash to verify a sidecar before using it.
+
+    Args:
+        storage_path (str): The path of the dataset.
+        files (List[str]): The relative file paths, see dataset_files.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(file.encode('utf-8') + b'\0')
+        with open(os.path.join(storage_path, file), 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_sidecar(storage_path):
+    """
+    Writes the Arrow IPC sidecar of a Parquet dataset and its manifest.
+
+    The sidecar holds the rows of the dataset files in file order, with the hive partition columns
+    restored, uncompressed so readers can memory map it without decoding. Partition columns are stored
+    as plain strings (an IPC file can not replace dictionaries between batches) and listed in the manifest,
+    so readers can dictionary encode them again. Batches are streamed, the dataset is never held in memory.
+    Both files are written aside and renamed, the manifest last.
+
+    Args:
+        storage_path (str): The path of the dataset.
+
+    Returns:
+        Optional[dict]: The manifest, or None if the dataset has no Parquet file.
+    """
+    files = dataset_files(storage_path)
+    if not files:
+        return None
+
+    dataset = ds.dataset(
+        [os.path.join(storage_path, file) for file in files],
+        format='parquet',
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+        partition_base_dir=storage_path
+    )
+    dictionary_columns = [field.name for field in dataset.schema if pa.types.is_dictionary(field.type)]
+    schema = pa.schema([
+        field.with_type(field.type.value_type) if field.name in dictionary_columns else field
+        for field in dataset.schema
+    ])
+
+    sidecar_path = os.path.join(storage_path, SIDECAR_FILE)
+    tmp_path = f"{sidecar_path}.{os.getpid()}.tmp"
+    num_rows = 0
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in dataset.to_batches():
+            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+            num_rows += batch.num_rows
+    os.replace(tmp_path, sidecar_path)
+
+    manifest = {
+        'format_version': SIDECAR_FORMAT_VERSION,
+        'parquet_sha256': parquet_content_hash(storage_path, files),
+        'files': files,
+        'num_rows': num_rows,
+        'sidecar_bytes': os.path.getsize(sidecar_path),
+        'dictionary_columns': dictionary_columns
+    }
+    manifest_path = os.path.join(storage_path, SIDECAR_MANIFEST)
+    with open(f"{manifest_path}.{os.getpid()}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.{os.getpid()}.tmp", manifest_path)
+    logging.info(f"{storage_path}: wrote Arrow sidecar of {num_rows} rows from {len(files)} file(s)")
+    return manifest
@@ -1,8 +1,52 @@
 import random
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from faker import Faker
 from datetime import datetime, timedelta
 
 from data_dev.config import data_generator_config
+from data_dev.src.data.value_pool import load_value_pools
+
+# Spawn keys of the seed sequences derived from the root seed, one per consumer
+FAKER_SEED_KEY = 0
+RANDOM_SEED_KEY = 1
+VISITS_SEED_KEY = 2
+POOLS_SEED_KEY = 3
+PATIENTS_SEED_KEY = 4
+FACILITIES_SEED_KEY = 5
+
+
+def generate_visits_shard(days, seed_sequence, visits_per_day, num_patients, num_facilities):
+    """
+    Generates the visits of a contiguous range of days with its own random generator.
+
+    Defined at module level so that shards can be generated in worker processes.
+
+    Args:
+        days (numpy.ndarray): The days (datetime64[D]) of the shard, in generation order.
+        seed_sequence (numpy.random.SeedSequence): The seed sequence of the shard.
+        visits_per_day (Tuple[int, int]): The range (min, max) of visits per day.
+        num_patients (int): The number of patients, patient ids are drawn from 1..num_patients.
+        num_facilities (int): The number of facilities, facility ids are drawn from 1..num_facilities.
+
+    Returns:
+        DataFrame: The visits of the shard, see DataGenerator.generate_visits_frame.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    counts = rng.integers(visits_per_day[0], visits_per_day[1], size=len(days), endpoint=True)
+    num_visits = int(counts.sum())
+    seconds_of_day = rng.integers(0, 24 * 60 * 60, size=num_visits)
+    visit_timestamp = (np.repeat(days, counts).astype('datetime64[s]')
+                       + seconds_of_day.astype('timedelta64[s]'))
+
+    return pd.DataFrame({
+        "patient_id": rng.integers(1, num_patients, size=num_visits, endpoint=True),
+        "facility_id": rng.integers(1, num_facilities, size=num_visits, endpoint=True),
+        "visit_timestamp": visit_timestamp.astype('datetime64[ns]'),
+        "treatment_cost": np.round(rng.uniform(50, 5000, size=num_visits), 2),
+        "duration_minutes": rng.integers(15, 60, size=num_visits, endpoint=True)
+    })
 
 
 class DataGenerator:
@@ -17,27 +61,115 @@ class DataGenerator:
         date_format (str): The format of the date strings, sourced from generator_config.date_format.
         visits_per_day (Tuple[int, int]): The range (min, max) of visits per day, sourced from generator_config.visits_per_day.
         facility_types (List[str]): A list of facility types, sourced from generator_config.facility_types.
-        patients (List[dict] or None): A list of generated patient data, initialized as None.
-        facilities (List[dict] or None): A list of generated facility data, initialized as None.
-        visits (List[dict] or None): A list of generated visit data, initialized as None.
+        vectorized (bool): Whether visits are generated with NumPy, sourced from generator_config.vectorized.
+        shard_days (int): The number of days per visits shard, sourced from generator_config.shard_days.
+        workers (int): The number of processes generating visit shards, sourced from generator_config.workers.
+        locale (str): The Faker locale, sourced from generator_config.locale.
+        pooled (bool): Whether patients and facilities are sampled from value pools, sourced from generator_config.pooled.
+        pool_size (int): The number of values per pool, sourced from generator_config.pool_size.
+        pool_cache_dir (str or None): The value pools cache directory, sourced from generator_config.pool_cache_dir.
+        seed_sequence (numpy.random.SeedSequence): The root seed sequence, built from generator_config.seed.
+            Faker, the random module fallback and every visits shard get their own derived seed.
+        random (random.Random): The random generator used by the non vectorized visits generation.
+        value_pools (DataFrame or None): The Faker value pools, loaded on first use by get_value_pools.
+        patients (List[dict], DataFrame or None): The generated patient data, initialized as None.
+        facilities (List[dict], DataFrame or None): The generated facility data, initialized as None.
+        visits (List[dict], DataFrame or None): The generated visit data, initialized as None.
     """
 
     def __init__(self):
         """
-        Initializes the DataGenerator class with configuration values and sets up Faker.
+        Initializes the DataGenerator class with configuration values and sets up seeded generators.
         """
-        self.fake = Faker()
+        self.seed = data_generator_config.seed
+        self.seed_sequence = np.random.SeedSequence(self.seed)
+        self.locale = data_generator_config.locale
+        self.fake = Faker(self.locale)
+        self.fake.seed_instance(int(self.derive_seed_sequence(FAKER_SEED_KEY).generate_state(1)[0]))
+        self.random = random.Random(int(self.derive_seed_sequence(RANDOM_SEED_KEY).generate_state(1)[0]))
         self.num_patients = data_generator_config.num_patients
         self.start_date = data_generator_config.start_date
         self.end_date = data_generator_config.end_date
         self.date_format = data_generator_config.date_format
         self.visits_per_day = data_generator_config.visits_per_day
         self.facility_types = data_generator_config.facility_types
+        self.vectorized = data_generator_config.vectorized
+        self.shard_days = data_generator_config.shard_days
+        self.workers = data_generator_config.workers
+        self.pooled = data_generator_config.pooled
+        self.pool_size = data_generator_config.pool_size
+        self.pool_cache_dir = data_generator_config.pool_cache_dir
 
+        self.value_pools = None
         self.patients = None
         self.facilities = None
         self.visits = None
 
+    def derive_seed_sequence(self, *spawn_key):
+        """
+        Derives an independent seed sequence from the root seed.
+
+        The derived sequence only depends on the root seed and spawn_key, never on the order
+        in which generators are created or on the number of worker processes.
+
+        Args:
+            *spawn_key (int): The path of the derived sequence, e.g. (VISITS_SEED_KEY, shard_index).
+
+        Returns:
+            numpy.random.SeedSequence: The derived seed sequence.
+        """
+        return np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=spawn_key)
+
+    def get_value_pools(self):
+        """
+        Retrieves the Faker value pools, loading them from the cache or generating them on first use.
+
+        Pools are filled by a dedicated Faker instance seeded from POOLS_SEED_KEY, so their content only
+        depends on the locale, the root seed and the pool size. Pools never hold more values than there are
+        rows to draw them for, so small datasets (and unseeded runs, which are not cached) stay cheap.
+
+        Returns:
+            DataFrame: A DataFrame with min(pool_size, patients or facilities) rows and one column per pool
+                       (see value_pool.POOL_PROVIDERS).
+        """
+        if self.value_pools is None:
+            pool_size = min(self.pool_size, max(self.num_patients, len(self.facility_types)))
+            pool_fake = Faker(self.locale)
+            pool_fake.seed_instance(int(self.derive_seed_sequence(POOLS_SEED_KEY).generate_state(1)[0]))
+            self.value_pools = load_value_pools(pool_fake, self.locale, self.seed, pool_size,
+                                                cache_dir=self.pool_cache_dir)
+        return self.value_pools
+
+    @staticmethod
+    def sample_pool(rng, pool, size):
+        """
+        Draws size values from a pool with a single vectorized index draw.
+
+        Args:
+            rng (numpy.random.Generator): The random generator used for the draw.
+            pool (Series): The pool of values.
+            size (int): The number of values to draw.
+
+        Returns:
+            numpy.ndarray: The drawn values.
+        """
+        return pool.to_numpy()[rng.integers(0, len(pool), size=size)]
+
+    def date_of_birth_range(self):
+        """
+        Returns the range dates of birth are drawn from: patients aged 18 to 100 on end_date.
+
+        The range is anchored to the configured end_date rather than today, so a seeded run generates
+        the same patients whatever day it runs on.
+
+        Returns:
+            Tuple[pd.Timestamp, pd.Timestamp]: The earliest and latest date of birth, both included.
+        """
+        anchor = pd.Timestamp(datetime.strptime(self.end_date, self.date_format).date())
+        earliest = anchor - pd.DateOffset(years=101) + pd.Timedelta(days=1)
+        latest = anchor - pd.DateOffset(years=18)
+        return earliest, latest
+
     def generate_patients(self):
         """
         Generates a list of synthetic patient data.
@@ -49,17 +181,42 @@ class DataGenerator:
                 - date_of_birth (str): The date of birth of the patient in the configured date format.
                 - address (str): The address of the patient.
         """
+        earliest, latest = self.date_of_birth_range()
         patients = []
         for i in range(0, self.num_patients):
             patients.append({
                 "patient_id": i + 1,
                 "first_name": self.fake.first_name(),
                 "last_name": self.fake.last_name(),
-                "date_of_birth": self.fake.date_of_birth(minimum_age=18, maximum_age=100).strftime(self.date_format),
+                "date_of_birth": self.fake.date_between_dates(earliest.date(), latest.date()).strftime(self.date_format),
                 "address": self.fake.address()
             })
         return patients
 
+    def generate_patients_frame(self):
+        """
+        Generates synthetic patient data by sampling the value pools, without calling Faker per row.
+
+        Dates of birth are drawn uniformly in date_of_birth_range, like generate_patients.
+
+        Returns:
+            DataFrame: A DataFrame with one row per patient and the columns of generate_patients.
+        """
+        pools = self.get_value_pools()
+        rng = np.random.default_rng(self.derive_seed_sequence(PATIENTS_SEED_KEY))
+
+        earliest, latest = self.date_of_birth_range()
+        days = rng.integers(0, (latest - earliest).days, size=self.num_patients, endpoint=True)
+        date_of_birth = pd.Series(earliest + pd.to_timedelta(days, unit='D'))
+
+        return pd.DataFrame({
+            "patient_id": np.arange(1, self.num_patients + 1),
+            "first_name": self.sample_pool(rng, pools['first_name'], self.num_patients),
+            "last_name": self.sample_pool(rng, pools['last_name'], self.num_patients),
+            "date_of_birth": date_of_birth.dt.strftime(self.date_format),
+            "address": self.sample_pool(rng, pools['address'], self.num_patients)
+        })
+
     def generate_facilities(self):
         """
         Generates a list of synthetic facility data.
@@ -86,6 +243,26 @@ class DataGenerator:
             })
         return facilities
 
+    def generate_facilities_frame(self):
+        """
+        Generates synthetic facility data by sampling the value pools, without calling Faker per row.
+
+        Returns:
+            DataFrame: A DataFrame with one row per facility type and the columns of generate_facilities.
+        """
+        pools = self.get_value_pools()
+        rng = np.random.default_rng(self.derive_seed_sequence(FACILITIES_SEED_KEY))
+        num_facilities = len(self.facility_types)
+
+        return pd.DataFrame({
+            "facility_id": np.arange(1, num_facilities + 1),
+            "facility_name": self.sample_pool(rng, pools['company'], num_facilities),
+            "facility_type": self.facility_types,
+            "address": self.sample_pool(rng, pools['address'], num_facilities),
+            "city": self.fake.city(),
+            "state": self.fake.state()
+        })
+
     def generate_visits(self):
         """
         Generates a list of synthetic visit data.
@@ -104,11 +281,11 @@ class DataGenerator:
                      range((datetime.strptime(self.end_date, self.date_format)
                             - datetime.strptime(self.start_date, self.date_format)).days + 1)]
         for date in date_list:
-            num_visits_per_day = random.randint(self.visits_per_day[0], self.visits_per_day[1])
+            num_visits_per_day = self.random.randint(self.visits_per_day[0], self.visits_per_day[1])
             for _ in range(num_visits_per_day):
-                random_hour = random.randint(0, 23)
-                random_minute = random.randint(0, 59)
-                random_second = random.randint(0, 59)
+                random_hour = self.random.randint(0, 23)
+                random_minute = self.random.randint(0, 59)
+                random_second = self.random.randint(0, 59)
                 visit_timestamp = datetime(
                     year=date.year,
                     month=date.month,
@@ -118,28 +295,67 @@ class DataGenerator:
                     second=random_second
                 )
                 visits.append({
-                    "patient_id": random.randint(1, self.num_patients),
-                    "facility_id": random.randint(1, len(self.facility_types)),
+                    "patient_id": self.random.randint(1, self.num_patients),
+                    "facility_id": self.random.randint(1, len(self.facility_types)),
                     "visit_timestamp": visit_timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                    "treatment_cost": round(random.uniform(50, 5000), 2),
-                    "duration_minutes": random.randint(15, 60)
+                    "treatment_cost": round(self.random.uniform(50, 5000), 2),
+                    "duration_minutes": self.random.randint(15, 60)
                 })
         return visits
 
+    def generate_visits_frame(self):
+        """
+        Generates synthetic visit data with NumPy, sharded by date range.
+
+        The date range (from end_date back to start_date, the order of generate_visits) is split into
+        shards of shard_days days. Each shard is generated by generate_visits_shard with a seed derived
+        from the root seed and the shard index, in a process pool when workers > 1. Shards are
+        concatenated in order, so the output is bit-identical for any number of workers.
+
+        Returns:
+            DataFrame: A DataFrame with one row per visit and columns:
+                - patient_id (int64): The ID of the patient (randomly assigned).
+                - facility_id (int64): The ID of the facility (randomly assigned).
+                - visit_timestamp (datetime64[ns]): The timestamp of the visit.
+                - treatment_cost (float64): The cost of the treatment, rounded to cents.
+                - duration_minutes (int64): The duration of the visit in minutes.
+        """
+        start = np.datetime64(datetime.strptime(self.start_date, self.date_format).date(), 'D')
+        end = np.datetime64(datetime.strptime(self.end_date, self.date_format).date(), 'D')
+        days = end - np.arange((end - start).astype(int) + 1)
+
+        shards = [days[i:i + self.shard_days] for i in range(0, len(days), self.shard_days)]
+        shard_args = (
+            shards,
+            [self.derive_seed_sequence(VISITS_SEED_KEY, index) for index in range(len(shards))],
+            [self.visits_per_day] * len(shards),
+            [self.num_patients] * len(shards),
+            [len(self.facility_types)] * len(shards)
+        )
+        if self.workers > 1 and len(shards) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                frames = list(executor.map(generate_visits_shard, *shard_args))
+        else:
+            frames = list(map(generate_visits_shard, *shard_args))
+        return pd.concat(frames, ignore_index=True)
+
     def generate_data(self):
         """
         Generates synthetic data for patients, facilities, and visits, and stores them in the class attributes.
+
+        Visits are generated as a DataFrame by generate_visits_frame when vectorized is enabled,
+        patients and facilities are sampled from the value pools as DataFrames when pooled is enabled.
         """
-        self.patients = self.generate_patients()
-        self.facilities = self.generate_facilities()
-        self.visits = self.generate_visits()
+        self.patients = self.generate_patients_frame() if self.pooled else self.generate_patients()
+        self.facilities = self.generate_facilities_frame() if self.pooled else self.generate_facilities()
+        self.visits = self.generate_visits_frame() if self.vectorized else self.generate_visits()
 
     def get_visits(self):
         """
         Retrieves the generated visit data.
 
         Returns:
-            List[dict]: A list of visit data dictionaries.
+            List[dict] or DataFrame: A list of visit data dictionaries, or a DataFrame when vectorized.
         """
         return self.visits
 
@@ -148,7 +364,7 @@ class DataGenerator:
         Retrieves the generated facility data.
 
         Returns:
-            List[dict]: A list of facility data dictionaries.
+            List[dict] or DataFrame: A list of facility data dictionaries, or a DataFrame when pooled.
         """
         return self.facilities
 
@@ -157,6 +373,6 @@ class DataGenerator:
         Retrieves the generated patient data.
 
         Returns:
-            List[dict]: A list of patient data dictionaries.
+            List[dict] or DataFrame: A list of patient data dictionaries, or a DataFrame when pooled.
         """
         return self.patients
@@ -1,11 +1,30 @@
+import csv
+import io
+import logging
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
 from data_dev.src.data.data_generator import DataGenerator
+from data_dev.src.data.schema_manager import SchemaManager
+from data_dev.config import src_load_config
 from data_dev.queries import (
     CREATE_SRC_GENERATED_FACILITIES_TABLE_QUERY,
     CREATE_SRC_GENERATED_PATIENTS_TABLE_QUERY,
     CREATE_SRC_GENERATED_VISITS_TABLE_QUERY,
-    INSERT_SRC_GENERATED_FACILITIES_QUERY,
-    INSERT_SRC_GENERATED_PATIENTS_QUERY,
-    INSERT_SRC_GENERATED_VISITS_QUERY
+    SRC_GENERATED_FACILITIES_COLUMNS,
+    SRC_GENERATED_PATIENTS_COLUMNS,
+    SRC_GENERATED_VISITS_COLUMNS,
+    COPY_SRC_GENERATED_FACILITIES_QUERY,
+    COPY_SRC_GENERATED_PATIENTS_QUERY,
+    COPY_SRC_GENERATED_VISITS_QUERY,
+    BULK_INSERT_SRC_GENERATED_FACILITIES_QUERY,
+    BULK_INSERT_SRC_GENERATED_PATIENTS_QUERY,
+    BULK_INSERT_SRC_GENERATED_VISITS_QUERY,
+    SRC_GENERATED_INDEXES,
+    SRC_GENERATED_TABLES,
+    CREATE_ETL_TABLE_VERSIONS_TABLE_QUERY,
+    BUMP_TABLE_VERSIONS_QUERY
 )
 
 
@@ -16,10 +35,13 @@ class GeneratedDataLoader:
     Attributes:
         conn (object): A database connection object.
         dg (DataGenerator): An instance of the DataGenerator class for generating synthetic data.
+        method (str): The bulk load method ('copy' or 'execute_values'), sourced from src_load_config.method.
+        batch_size (int): The number of rows per bulk load batch, sourced from src_load_config.batch_size.
+        schema (SchemaManager): Provisions and verifies the indexes of the src tables.
 
     Methods:
-        - is_table_empty(cursor, table_name): Checks if a given table is empty.
-        - inject_data_into_table(cursor, data, query): Inserts data into a table using a specified query.
+        - bulk_inject_data_into_table(cursor, data, table_name, columns, copy_query, insert_query):
+          Loads data into a table in batches with COPY FROM STDIN or execute_values.
         - inject_data(): Creates tables (if not exist) and injects generated data into the database.
     """
 
@@ -32,35 +54,95 @@ class GeneratedDataLoader:
         """
         self.conn = conn
         self.dg = DataGenerator()
+        self.method = src_load_config.method
+        self.batch_size = src_load_config.batch_size
+        self.schema = SchemaManager(SRC_GENERATED_INDEXES)
 
     @staticmethod
-    def is_table_empty(cursor, table_name):
+    def iter_batches(data, batch_size):
         """
-        Checks if a given table is empty.
+        Splits data into batches of at most batch_size rows.
 
         Args:
-            cursor (object): A database cursor object.
-            table_name (str): The name of the table to check.
+            data (list or DataFrame): A list of dictionaries or a DataFrame to be inserted.
+            batch_size (int): The maximum number of rows per batch.
 
-        Returns:
-            bool: True if the table is empty, False otherwise.
+        Yields:
+            list or DataFrame: The rows of one batch.
         """
-        query = f"SELECT COUNT(*) FROM {table_name}"
-        cursor.execute(query)
-        return cursor.fetchone()[0] == 0
+        for start in range(0, len(data), batch_size):
+            if isinstance(data, pd.DataFrame):
+                yield data.iloc[start:start + batch_size]
+            else:
+                yield data[start:start + batch_size]
 
     @staticmethod
-    def inject_data_into_table(cursor, data, query):
+    def batch_rows(batch, columns):
+        """
+        Converts a batch into row tuples ordered like columns, with Python scalar values.
+
+        Args:
+            batch (list or DataFrame): A batch produced by iter_batches.
+            columns (tuple): The column names, in table load order.
+
+        Returns:
+            List[tuple]: The rows of the batch.
+        """
+        if isinstance(batch, pd.DataFrame):
+            return list(zip(*(batch[column].tolist() for column in columns)))
+        return [tuple(row[column] for column in columns) for row in batch]
+
+    def copy_batch(self, cursor, batch, columns, copy_query):
+        """
+        Streams a batch of rows into a table with COPY FROM STDIN from an in-memory CSV buffer.
+
+        Args:
+            cursor (object): A database cursor object.
+            batch (list or DataFrame): A batch produced by iter_batches.
+            columns (tuple): The column names, in the order used by copy_query.
+            copy_query (str): The COPY ... FROM STDIN WITH (FORMAT csv) statement.
         """
-        Inserts data into a table using a specified query.
+        buffer = io.StringIO()
+        if isinstance(batch, pd.DataFrame):
+            # Columnar batches are serialized by the pandas CSV writer, without per-row Python objects
+            batch.to_csv(buffer, columns=list(columns), header=False, index=False, lineterminator='\n')
+        else:
+            # None is written as an unquoted empty field, which COPY (FORMAT csv) reads as NULL.
+            # Like the DataFrame path, an empty string would load as NULL too; generated values are never empty.
+            csv.writer(buffer, quoting=csv.QUOTE_MINIMAL, lineterminator='\n').writerows(
+                self.batch_rows(batch, columns)
+            )
+        buffer.seek(0)
+        cursor.copy_expert(copy_query, buffer)
+
+    def bulk_inject_data_into_table(self, cursor, data, table_name, columns, copy_query, insert_query):
+        """
+        Loads data into a table in batches, reporting progress after every batch.
+
+        Rows are streamed with COPY FROM STDIN when method is 'copy', otherwise they are sent
+        as multi-row INSERT statements with execute_values. Nothing is committed here, so the
+        caller keeps control of the transaction.
 
         Args:
             cursor (object): A database cursor object.
-            data (list): A list of data to be inserted.
-            query (str): The SQL query for inserting data.
+            data (list or DataFrame): A list of dictionaries or a DataFrame to be inserted.
+            table_name (str): The name of the target table, used for progress reporting.
+            columns (tuple): The column names, in the order used by copy_query and insert_query.
+            copy_query (str): The COPY ... FROM STDIN statement.
+            insert_query (str): The INSERT ... VALUES %s statement used by execute_values.
         """
-        for params in data:
-            cursor.execute(query, params)
+        if self.method not in ('copy', 'execute_values'):
+            raise ValueError(f"Unsupported load method: {self.method}")
+
+        total_rows = len(data)
+        loaded_rows = 0
+        for batch in self.iter_batches(data, self.batch_size):
+            if self.method == 'copy':
+                self.copy_batch(cursor, batch, columns, copy_query)
+            else:
+                execute_values(cursor, insert_query, self.batch_rows(batch, columns), page_size=self.batch_size)
+            loaded_rows += len(batch)
+            logging.info(f"{table_name}: loaded {loaded_rows}/{total_rows} rows ({self.method})")
 
     def inject_data(self):
         """
@@ -70,9 +152,12 @@ class GeneratedDataLoader:
         1. Creates the `src_generated_facilities`, `src_generated_patients`, and 
            `src_generated_visits` tables if they do not already exist.
         2. Checks if the `src_generated_visits` table is empty.
-        3. If the table is empty, generates synthetic data for facilities, patients, and visits.
-        4. Inserts the generated data into the respective tables.
-        5. Commits the transaction if successful, or rolls back in case of an error.
+        3. If the table is empty, drops the indexes of the empty tables and generates synthetic data
+           for facilities, patients, and visits.
+        4. Bulk loads the generated data into the respective tables (COPY or execute_values batches)
+           and increments their version in etl_table_versions.
+        5. Creates the missing src indexes, once over the loaded data, and verifies them.
+        6. Commits the transaction if successful, or rolls back in case of an error.
         """
         cursor = self.conn.cursor()
         try:
@@ -82,24 +167,40 @@ class GeneratedDataLoader:
             cursor.execute(CREATE_SRC_GENERATED_VISITS_TABLE_QUERY)
 
             # Generate and insert data if the visits table is empty
-            if self.is_table_empty(cursor=cursor, table_name='src_generated_visits'):
+            if self.schema.is_table_empty(cursor, 'src_generated_visits'):
+                self.schema.defer_indexes(cursor)
                 self.dg.generate_data()
-                self.inject_data_into_table(
+                self.bulk_inject_data_into_table(
                     cursor=cursor,
                     data=self.dg.get_facilities(),
-                    query=INSERT_SRC_GENERATED_FACILITIES_QUERY
+                    table_name='src_generated_facilities',
+                    columns=SRC_GENERATED_FACILITIES_COLUMNS,
+                    copy_query=COPY_SRC_GENERATED_FACILITIES_QUERY,
+                    insert_query=BULK_INSERT_SRC_GENERATED_FACILITIES_QUERY
                 )
-                self.inject_data_into_table(
+                self.bulk_inject_data_into_table(
                     cursor=cursor,
                     data=self.dg.get_patients(),
-                    query=INSERT_SRC_GENERATED_PATIENTS_QUERY
+                    table_name='src_generated_patients',
+                    columns=SRC_GENERATED_PATIENTS_COLUMNS,
+                    copy_query=COPY_SRC_GENERATED_PATIENTS_QUERY,
+                    insert_query=BULK_INSERT_SRC_GENERATED_PATIENTS_QUERY
                 )
-                self.inject_data_into_table(
+                self.bulk_inject_data_into_table(
                     cursor=cursor,
                     data=self.dg.get_visits(),
-                    query=INSERT_SRC_GENERATED_VISITS_QUERY
+                    table_name='src_generated_visits',
+                    columns=SRC_GENERATED_VISITS_COLUMNS,
+                    copy_query=COPY_SRC_GENERATED_VISITS_QUERY,
+                    insert_query=BULK_INSERT_SRC_GENERATED_VISITS_QUERY
                 )
-                self.conn.commit()
+                cursor.execute(CREATE_ETL_TABLE_VERSIONS_TABLE_QUERY)
+                cursor.execute(BUMP_TABLE_VERSIONS_QUERY, {'table_names': SRC_GENERATED_TABLES})
+
+            # Build the indexes after the bulk load and check they are in place
+            self.schema.create_indexes(cursor)
+            self.schema.verify_indexes(cursor)
+            self.conn.commit()
         except Exception as e:
             # Rollback the transaction in case of an error
             self.conn.rollback()
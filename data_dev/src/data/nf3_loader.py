@@ -1,10 +1,25 @@
+import logging
+
 from data_dev.queries import (CREATE_FACILITIES_TABLE_QUERY,
                               CREATE_PATIENTS_TABLE_QUERY,
-                              CREATE_VISITS_TABLE_QUERY)
+                              CREATE_VISITS_TABLE_QUERY,
+                              CREATE_PARTITIONED_VISITS_TABLE_QUERY,
+                              GET_VISITS_SLICE_MONTHS_QUERY)
 from data_dev.queries import (MERGE_PATIENTS_QUERY,
                               MERGE_VISITS_QUERY,
                               MERGE_FACILITIES_QUERY)
+from data_dev.queries import (CREATE_ETL_WATERMARKS_TABLE_QUERY,
+                              GET_WATERMARK_QUERY,
+                              UPDATE_VISITS_WATERMARK_QUERY)
+from data_dev.queries import (CREATE_ETL_TABLE_VERSIONS_TABLE_QUERY,
+                              BUMP_TABLE_VERSIONS_QUERY,
+                              NF3_TABLES)
+from data_dev.queries import NF3_INDEXES, DELETE_DUPLICATE_VISITS_QUERY
 from data_dev.config import load_config
+from data_dev.src.data.schema_manager import SchemaManager
+
+# Lower bound of the visits slice when there is no watermark yet or on a full reload
+NO_WATERMARK = '-infinity'
 
 
 class NF3Loader:
@@ -15,8 +30,17 @@ class NF3Loader:
     1. Creating the necessary database tables if they do not already exist.
     2. Merging data into the 3NF tables using predefined SQL queries.
 
+    Visits are loaded incrementally: the last loaded visit_timestamp is kept in the etl_watermarks
+    control table and each run only merges the source visits after it (up to date_scope).
+
+    With partitioned_visits, visits is created range partitioned by month and the partitions of
+    the months covered by each incoming slice are created before the merge.
+
     Attributes:
         conn: A psycopg2 database connection object used to interact with the database.
+        full_reload (bool): Ignore the watermarks and merge the whole history, sourced from load_config.full_reload.
+        partitioned_visits (bool): Create visits partitioned by month, sourced from load_config.partitioned_visits.
+        schema (SchemaManager): Provisions and verifies the indexes and partitions of the 3NF tables.
     """
 
     def __init__(self, conn):
@@ -27,32 +51,106 @@ class NF3Loader:
             conn: A psycopg2 database connection object.
         """
         self.conn = conn
+        self.full_reload = load_config.full_reload
+        self.partitioned_visits = load_config.partitioned_visits
+        self.schema = SchemaManager(NF3_INDEXES)
 
-    def load_data(self):
+    @staticmethod
+    def get_watermark(cursor, table_name):
+        """
+        Get the persisted high-water mark of an incrementally loaded table.
+
+        Args:
+            cursor: A psycopg2 cursor.
+            table_name (str): The name of the loaded table.
+
+        Returns:
+            datetime or None: The last loaded source timestamp, or None if the table was never loaded.
+        """
+        cursor.execute(GET_WATERMARK_QUERY, {'table_name': table_name})
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def create_visits_table(self, cursor):
+        """
+        Create the visits table if it does not exist, partitioned by month when partitioned_visits is set.
+
+        Args:
+            cursor: A psycopg2 cursor.
+
+        Returns:
+            bool: True if visits is a partitioned table.
+        """
+        cursor.execute(CREATE_PARTITIONED_VISITS_TABLE_QUERY if self.partitioned_visits else CREATE_VISITS_TABLE_QUERY)
+        partitioned = self.schema.is_partitioned(cursor, 'visits')
+        if self.partitioned_visits and not partitioned:
+            logging.warning("visits already exists as a regular table, drop it to recreate it partitioned")
+        return partitioned
+
+    def load_data(self, full_reload=None):
         """
         Load and transform data into the 3NF database schema.
 
         This method performs the following steps:
-        1. Creates the necessary tables (facilities, patients, visits) if they do not already exist.
-        2. Merges data into the 3NF tables using predefined SQL queries.
-        3. Commits the transaction if all operations succeed.
-        4. Rolls back the transaction and prints the error if any operation fails.
+        1. Creates the necessary tables (facilities, patients, visits, etl_watermarks, etl_table_versions)
+           if they do not already exist, and drops the indexes of the tables that are still empty,
+           so they are built after the first load.
+        2. Merges data into the 3NF tables using predefined SQL queries. Visits are limited to the slice
+           between the visits watermark and date_scope, or to everything up to date_scope on a full reload.
+           When visits is partitioned, the monthly partitions covering the slice are created first.
+        3. Moves the visits watermark to the last source visit_timestamp of the merged slice and
+           increments the version of the 3NF tables in etl_table_versions.
+        4. Creates the missing indexes (unique external_id keys, the unique visits natural key and the
+           visit_timestamp index) and verifies them.
+        5. Commits the transaction if all operations succeed, so data and watermark always move together.
+        6. Rolls back the transaction and prints the error if any operation fails.
+
+        Args:
+            full_reload (bool, optional): Overrides load_config.full_reload for this run.
 
         Raises:
             Exception: If any SQL execution fails, the exception is caught, the transaction is rolled back,
                        and the error is printed.
         """
+        full_reload = self.full_reload if full_reload is None else full_reload
         cursor = self.conn.cursor()
         try:
             # Create tables if they do not exist
             cursor.execute(CREATE_FACILITIES_TABLE_QUERY)
             cursor.execute(CREATE_PATIENTS_TABLE_QUERY)
-            cursor.execute(CREATE_VISITS_TABLE_QUERY)
+            partitioned = self.create_visits_table(cursor)
+            cursor.execute(CREATE_ETL_WATERMARKS_TABLE_QUERY)
+            cursor.execute(CREATE_ETL_TABLE_VERSIONS_TABLE_QUERY)
+            self.schema.defer_indexes(cursor)
+
+            watermark = None if full_reload else self.get_watermark(cursor, 'visits')
+            params = {
+                'table_name': 'visits',
+                'watermark': NO_WATERMARK if watermark is None else watermark,
+                'date_scope': load_config.date_scope
+            }
+            logging.info(f"Loading visits after {params['watermark']} up to {load_config.date_scope}"
+                         f"{' (full reload)' if full_reload else ''}")
+
+            if partitioned:
+                cursor.execute(GET_VISITS_SLICE_MONTHS_QUERY, params)
+                self.schema.create_monthly_partitions(cursor, 'visits', [row[0] for row in cursor.fetchall()])
 
             # Merge data into 3NF tables
             cursor.execute(MERGE_FACILITIES_QUERY)
             cursor.execute(MERGE_PATIENTS_QUERY)
-            cursor.execute(MERGE_VISITS_QUERY, {'date_scope': load_config.date_scope})
+            cursor.execute(MERGE_VISITS_QUERY, params)
+            cursor.execute(UPDATE_VISITS_WATERMARK_QUERY, params)
+            cursor.execute(BUMP_TABLE_VERSIONS_QUERY, {'table_names': NF3_TABLES})
+
+            # Visits loaded before the natural key index existed may hold duplicates
+            if 'visits_natural_key' in self.schema.missing_indexes(cursor):
+                cursor.execute(DELETE_DUPLICATE_VISITS_QUERY)
+                if cursor.rowcount:
+                    logging.warning(f"Deleted {cursor.rowcount} duplicate visit(s) sharing a natural key "
+                                    f"(facility_id, patient_id, visit_timestamp) before creating visits_natural_key")
+            self.schema.create_indexes(cursor)
+            self.schema.verify_indexes(cursor)
 
             # Commit the transaction
             self.conn.commit()
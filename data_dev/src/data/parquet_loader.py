@@ -1,12 +1,47 @@
+import logging
 import os
+import shutil
+import time
+import uuid
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
 
 from data_dev.queries import (
     TRANSFORM_PATIENT_SUM_TREATMENT_COST_PER_FACILITY_TYPE_SQL,
     TRANSFORM_FACILITY_NAME_MIN_TIME_SPENT_PER_VISIT_DATE_SQL,
-    TRANSFORM_FACILITY_TYPE_AVG_TIME_SPENT_PER_VISIT_DATE_SQL
+    TRANSFORM_FACILITY_TYPE_AVG_TIME_SPENT_PER_VISIT_DATE_SQL,
+    CREATE_PARQUET_EXPORT_WATERMARKS_TABLE_QUERY,
+    GET_PARQUET_EXPORT_WATERMARK_QUERY,
+    UPDATE_PARQUET_EXPORT_WATERMARK_QUERY,
+    GET_MAX_VISIT_ID_QUERY,
+    GET_CHANGED_VISIT_MONTHS_QUERY,
+    MONTH_SLICE_QUERY,
+    QUERY_COLUMNS_QUERY,
+    SORTED_EXPORT_QUERY
 )
 from data_dev.config import parquet_storage_config
+from data_dev.src.connectors.copy_export import strip_query
+from data_dev.src.data.arrow_sidecar import SIDECAR_FILE, SIDECAR_MANIFEST, write_sidecar
+from data_dev.src.connectors.postgre_connector import PostgresConnectorContextManager
+
+# Hidden directory inside a dataset where partitions are staged before being swapped in.
+# Names starting with '.' are skipped by pyarrow datasets and by glob.
+STAGING_DIR = '.staging'
+
+# Parquet schema metadata key marking files written by compaction, the value is the write profile used
+COMPACTION_METADATA_KEY = b'data_dev_compaction'
+
+# Transforms run by load_parquet, in sequential order
+TRANSFORMS = (
+    'transform_facility_type_avg_time_spent_per_visit_date',
+    'transform_patient_sum_treatment_cost_per_facility_type',
+    'transform_facility_name_min_time_spent_per_visit_date'
+)
 
 
 class LoadParquet:
@@ -23,24 +58,56 @@ class LoadParquet:
         Path to store the Parquet file for patient sum treatment cost per facility type.
     storage_path_facility_name_min_time_spent_per_visit_date : str
         Path to store the Parquet file for facility name minimum time spent per visit date.
+    incremental_export : bool
+        Whether the visit_date datasets only rewrite the partition_date months with new visits.
+    transform_workers : int
+        Number of transforms run concurrently by load_parquet.
+    connection_factory : callable
+        Returns a new connection context manager, used by concurrent transforms.
+    arrow_native : bool
+        Whether query results are streamed as Arrow batches to write_dataset instead of going through pandas.
+    arrow_block_size : int
+        Number of CSV bytes parsed per Arrow batch in arrow_native mode.
+    write_profile : ParquetWriteProfile
+        Parquet writer settings: codec, row group and file size, sorting, dictionary columns and compaction.
+    arrow_sidecar : bool
+        Whether every written dataset also gets a memory mappable Arrow IPC sidecar, see arrow_sidecar.
 
     Methods:
     --------
-    read_data(query):
+    read_data(query, params=None):
         Executes the given SQL query and returns the result as a DataFrame.
+    ensure_control_tables():
+        Creates the parquet_export_watermarks table if it does not exist yet.
+    read_batches(query, params=None):
+        Executes the given SQL query and streams the result as Arrow record batches.
+    write_batches(reader, storage_path, partition_columns):
+        Streams Arrow record batches to a Parquet dataset, partitioned by the given columns.
     to_parquet(df, storage_path, partition_columns):
         Writes the given DataFrame to a Parquet file at the specified storage path, partitioned by the given columns.
+    replace_partition(data, storage_path, partition_column, partition_value):
+        Replaces one partition directory of a dataset through a staging directory.
+    export_order(query, columns_query=None):
+        Orders a query by the write profile sort columns it returns, so that it is written already sorted.
+    compact_dataset(storage_path, partition_dirs=None):
+        Rewrites partitions as sorted files sized by the write profile, merging small files.
+    refresh_sidecar(storage_path):
+        Rewrites the Arrow IPC sidecar of a dataset when arrow_sidecar is enabled.
+    export_by_month(query, storage_path):
+        Exports a visit_date query partitioned by month, fully or only for the months with new visits.
     transform_facility_type_avg_time_spent_per_visit_date():
         Transforms data for facility type average time spent per visit date and writes it to a Parquet file.
     transform_patient_sum_treatment_cost_per_facility_type():
         Transforms data for patient sum treatment cost per facility type and writes it to a Parquet file.
     transform_facility_name_min_time_spent_per_visit_date():
         Transforms data for facility name minimum time spent per visit date and writes it to a Parquet file.
+    run_transform(name):
+        Runs one transformation on a dedicated connection when concurrent, and reports its outcome and timing.
     load_parquet():
         Executes all transformations and loads the results into Parquet files.
     """
 
-    def __init__(self, connection_object):
+    def __init__(self, connection_object, connection_factory=PostgresConnectorContextManager):
         """
         Initializes the LoadParquet class with a database connection object and storage paths.
 
@@ -48,8 +115,12 @@ class LoadParquet:
         -----------
         connection_object : object
             Database connection object used to execute SQL queries.
+        connection_factory : callable, optional
+            Returns a new connection context manager, used to give every concurrent transform its own connection,
+            e.g. PostgresConnectionPool.connector to check the connections out from a pool.
         """
         self.connection_object = connection_object
+        self.connection_factory = connection_factory
         self.storage_path_facility_type_avg_time_spent_per_visit_date = (
             parquet_storage_config.storage_path_facility_type_avg_time_spent_per_visit_date
         )
@@ -59,8 +130,14 @@ class LoadParquet:
         self.storage_path_facility_name_min_time_spent_per_visit_date = (
             parquet_storage_config.storage_path_facility_name_min_time_spent_per_visit_date
         )
+        self.incremental_export = parquet_storage_config.incremental_export
+        self.transform_workers = parquet_storage_config.transform_workers
+        self.arrow_native = parquet_storage_config.arrow_native
+        self.arrow_block_size = parquet_storage_config.arrow_block_size
+        self.write_profile = parquet_storage_config.write_profile
+        self.arrow_sidecar = parquet_storage_config.arrow_sidecar
 
-    def read_data(self, query):
+    def read_data(self, query, params=None):
         """
         Executes the given SQL query and returns the result as a DataFrame.
 
@@ -68,17 +145,116 @@ class LoadParquet:
         -----------
         query : str
             SQL query to execute.
+        params : dict, optional
+            Query parameters, referenced as %(name)s in the query.
 
         Returns:
         --------
         DataFrame
             Resulting data from the SQL query.
         """
-        df = self.connection_object.get_data_sql(query=query)
+        df = self.connection_object.get_data_sql(query=query, params=params)
         return df
 
-    @staticmethod
-    def to_parquet(df, storage_path, partition_columns):
+    def read_batches(self, query, params=None):
+        """
+        Executes the given SQL query and streams the result as Arrow record batches.
+
+        Parameters:
+        -----------
+        query : str
+            SQL query to execute.
+        params : dict, optional
+            Query parameters, referenced as %(name)s in the query.
+
+        Returns:
+        --------
+        context manager
+            Yields a pyarrow.RecordBatchReader, the query runs until the block is left.
+        """
+        return self.connection_object.get_data_arrow(query=query, params=params, block_size=self.arrow_block_size)
+
+    def execute(self, query, params=None):
+        """
+        Executes a statement that returns no rows and commits it.
+
+        Parameters:
+        -----------
+        query : str
+            SQL statement to execute.
+        params : dict, optional
+            Statement parameters, referenced as %(name)s in the statement.
+        """
+        connection = self.connection_object.get_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(query, params)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    def ensure_control_tables(self):
+        """
+        Creates the parquet_export_watermarks table if it does not exist yet.
+
+        Idempotent, it is called by load_parquet before the transforms run concurrently and by export_by_month,
+        so that every transform can also be run on its own.
+        """
+        self.execute(CREATE_PARQUET_EXPORT_WATERMARKS_TABLE_QUERY)
+
+    def get_export_watermark(self, export_name):
+        """
+        Returns the highest visits.id included in the last export of a dataset.
+
+        Parameters:
+        -----------
+        export_name : str
+            Name of the export, the storage path of the dataset.
+
+        Returns:
+        --------
+        int or None
+            The watermark, or None if the dataset was never exported.
+        """
+        df = self.read_data(GET_PARQUET_EXPORT_WATERMARK_QUERY, {'export_name': export_name})
+        return None if df.empty else int(df['last_visit_id'].iloc[0])
+
+    def file_write_options(self):
+        """
+        Returns the pyarrow.parquet.write_table options of the write profile.
+
+        Returns:
+        --------
+        dict
+            compression, compression_level, use_dictionary and row_group_size.
+        """
+        profile = self.write_profile
+        return {
+            'compression': profile.compression,
+            'compression_level': profile.compression_level,
+            'use_dictionary': True if profile.dictionary_columns is None else profile.dictionary_columns,
+            'row_group_size': profile.row_group_size
+        }
+
+    def dataset_write_options(self):
+        """
+        Returns the pyarrow.dataset.write_dataset options of the write profile.
+
+        Returns:
+        --------
+        dict
+            file_options, max_rows_per_group and max_rows_per_file.
+        """
+        options = self.file_write_options()
+        row_group_size = options.pop('row_group_size')
+        return {
+            'file_options': ds.ParquetFileFormat().make_write_options(**options),
+            'max_rows_per_group': row_group_size,
+            'max_rows_per_file': self.write_profile.max_rows_per_file
+        }
+
+    def to_parquet(self, df, storage_path, partition_columns):
         """
         Writes the given DataFrame to a Parquet file at the specified storage path, partitioned by the given columns.
 
@@ -97,20 +273,438 @@ class LoadParquet:
             engine='pyarrow',
             partition_cols=partition_columns,
             index=False,
-            existing_data_behavior='delete_matching'
+            existing_data_behavior='delete_matching',
+            max_rows_per_file=self.write_profile.max_rows_per_file,
+            preserve_order=True,
+            **self.file_write_options()
         )
 
-    def transform_facility_type_avg_time_spent_per_visit_date(self):
+    def write_batches(self, reader, storage_path, partition_columns):
         """
-        Transforms data for facility type average time spent per visit date and writes it to a Parquet file.
+        Streams Arrow record batches to a Parquet dataset, partitioned by the given columns.
+
+        Batches are written as they arrive, so memory stays bounded by a few batches whatever the export size.
+        Files and partition directories follow the layout of to_parquet, rows keep the order of the batches.
+
+        Parameters:
+        -----------
+        reader : pyarrow.RecordBatchReader
+            Data to write.
+        storage_path : str
+            Path to store the Parquet files.
+        partition_columns : list
+            Columns to partition the Parquet files by (hive style, the columns are not stored in the files).
+        """
+        os.makedirs(storage_path, exist_ok=True)
+        ds.write_dataset(
+            reader,
+            storage_path,
+            format='parquet',
+            partitioning=partition_columns,
+            partitioning_flavor='hive',
+            basename_template=f"{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior='delete_matching',
+            preserve_order=True,
+            **self.dataset_write_options()
+        )
+
+    @staticmethod
+    def map_batches(reader, function):
+        """
+        Applies a record batch function to every batch of a reader, lazily.
+
+        Parameters:
+        -----------
+        reader : pyarrow.RecordBatchReader
+            Input batches.
+        function : callable
+            Maps a pyarrow.RecordBatch to a pyarrow.RecordBatch, the output schema must not depend on the data.
+
+        Returns:
+        --------
+        pyarrow.RecordBatchReader
+            The mapped batches.
+        """
+        schema = function(pa.RecordBatch.from_pylist([], schema=reader.schema)).schema
+        return pa.RecordBatchReader.from_batches(schema, (function(batch) for batch in reader))
+
+    @staticmethod
+    def swap_partition(storage_path, partition_dir, write):
+        """
+        Replaces one partition directory of a dataset with a newly written one.
+
+        The new partition is written to a staging directory inside the dataset, then swapped in with two
+        consecutive renames (old partition out, new partition in), so readers never see a partially written
+        partition. The swap is not atomic: between the two renames the partition does not exist, and a reader
+        listing the dataset at that moment misses it. Datasets should not be read while they are exported.
+        If nothing is written the partition is removed.
+
+        Parameters:
+        -----------
+        storage_path : str
+            Path of the dataset.
+        partition_dir : str
+            Name of the partition directory, e.g. 'partition_date=2024-01'.
+        write : callable
+            Called with the staging directory path and a unique token for file names, writes the partition files.
+        """
+        target_path = os.path.join(storage_path, partition_dir)
+        staging_path = os.path.join(storage_path, STAGING_DIR)
+        token = uuid.uuid4().hex
+        new_path = os.path.join(staging_path, f"{partition_dir}-{token}")
+        old_path = os.path.join(staging_path, f"{partition_dir}-{token}.old")
+
+        os.makedirs(staging_path, exist_ok=True)
+        write(new_path, token)
+        has_rows = os.path.isdir(new_path) and bool(os.listdir(new_path))
+        if os.path.exists(target_path):
+            os.rename(target_path, old_path)
+        if has_rows:
+            os.rename(new_path, target_path)
+        else:
+            shutil.rmtree(new_path, ignore_errors=True)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def replace_partition(self, data, storage_path, partition_column, partition_value):
+        """
+        Replaces one partition directory of a dataset with new data, see swap_partition.
+
+        Data without rows removes the partition.
+
+        Parameters:
+        -----------
+        data : DataFrame or pyarrow.RecordBatchReader
+            Rows of the partition, including the partition column.
+        storage_path : str
+            Path of the dataset.
+        partition_column : str
+            Name of the partition column, which is not stored in the files.
+        partition_value : str
+            Value of the partition column, e.g. '2024-01'.
+        """
+        def write(new_path, token):
+            if isinstance(data, pd.DataFrame):
+                if not data.empty:
+                    os.makedirs(new_path)
+                    data.drop(columns=[partition_column]).to_parquet(
+                        os.path.join(new_path, f"{token}-0.parquet"),
+                        engine='pyarrow',
+                        index=False,
+                        **self.file_write_options()
+                    )
+            else:
+                ds.write_dataset(
+                    self.map_batches(data, lambda batch: batch.drop_columns([partition_column])),
+                    new_path,
+                    format='parquet',
+                    basename_template=f"{token}-{{i}}.parquet",
+                    preserve_order=True,
+                    **self.dataset_write_options()
+                )
+
+        self.swap_partition(storage_path, f"{partition_column}={partition_value}", write)
+
+    @staticmethod
+    def partition_files(partition_path):
+        """
+        Lists the visible Parquet files of a partition directory.
+
+        Parameters:
+        -----------
+        partition_path : str
+            Path of the partition directory.
+
+        Returns:
+        --------
+        list
+            Sorted file paths, hidden files ('.' or '_' prefix) are skipped like pyarrow datasets do.
+        """
+        return sorted(os.path.join(partition_path, name) for name in os.listdir(partition_path)
+                      if name.endswith('.parquet') and not name.startswith(('.', '_')))
+
+    def compaction_signature(self):
+        """
+        Returns the value stored under COMPACTION_METADATA_KEY, a change of write profile makes partitions recompacted.
+
+        Returns:
+        --------
+        bytes
+            The write profile representation.
+        """
+        return repr(self.write_profile).encode()
+
+    def partition_in_profile(self, files):
+        """
+        Tells whether the files of a partition already have the layout a compaction would write.
+
+        That is no more files than max_rows_per_file requires, and rows sorted by the profile sort columns
+        across the files in name order, which is how an export ordered by export_order is written. Only the
+        sort columns are read. Row groups left smaller than row_group_size by a streamed write are accepted.
+
+        Parameters:
+        -----------
+        files : list
+            Paths of the Parquet files of the partition, see partition_files.
+
+        Returns:
+        --------
+        bool
+            True if compacting the partition would not change its layout.
+        """
+        parquet_files = [pq.ParquetFile(file) for file in files]
+        num_rows = sum(parquet_file.metadata.num_rows for parquet_file in parquet_files)
+        if len(files) > max(1, -(-num_rows // self.write_profile.max_rows_per_file)):
+            return False
+
+        columns = parquet_files[0].schema_arrow.names
+        sort_columns = [column for column in self.write_profile.sort_columns if column in columns]
+        if not sort_columns:
+            return True
+        keys = pa.concat_tables([parquet_file.read(columns=sort_columns) for parquet_file in parquet_files],
+                                promote_options='default')
+        # A stable sort of sorted rows keeps them in place, compaction sorts with the same null placement
+        indices = pc.sort_indices(keys, sort_keys=[(column, 'ascending') for column in sort_columns])
+        return bool((indices.to_numpy() == np.arange(keys.num_rows)).all())
+
+    def compact_partition(self, storage_path, partition_dir):
+        """
+        Rewrites one partition as files of at most max_rows_per_file rows, sorted by the profile sort columns.
+
+        Partitions whose files were all written by a compaction with the current profile are skipped, as are
+        partitions freshly written by an export that already have the compacted layout (see partition_in_profile).
+        Files stamped by a compaction with another profile are always rewritten, to apply the new profile.
+        The partition is read into memory, which is bounded by the size of a single partition.
+
+        Parameters:
+        -----------
+        storage_path : str
+            Path of the dataset.
+        partition_dir : str
+            Name of the partition directory, e.g. 'partition_date=2024-01'.
+
+        Returns:
+        --------
+        bool
+            True if the partition was rewritten.
+        """
+        files = self.partition_files(os.path.join(storage_path, partition_dir))
+        signature = self.compaction_signature()
+        stamps = [(pq.read_schema(file).metadata or {}).get(COMPACTION_METADATA_KEY) for file in files]
+        if all(stamp == signature for stamp in stamps):
+            return False
+        if all(stamp is None for stamp in stamps) and self.partition_in_profile(files):
+            return False
+
+        table = pa.concat_tables([pq.ParquetFile(file).read() for file in files], promote_options='default')
+        sorting = [(column, 'ascending') for column in self.write_profile.sort_columns if column in table.column_names]
+        if sorting:
+            table = table.sort_by(sorting)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), COMPACTION_METADATA_KEY: signature})
+        sorting_columns = pq.SortingColumn.from_ordering(table.schema, sorting) if sorting else None
+        max_rows = self.write_profile.max_rows_per_file
+
+        def write(new_path, token):
+            os.makedirs(new_path)
+            for index, offset in enumerate(range(0, table.num_rows, max_rows)):
+                pq.write_table(table.slice(offset, max_rows), os.path.join(new_path, f"{token}-{index}.parquet"),
+                               sorting_columns=sorting_columns, **self.file_write_options())
+
+        self.swap_partition(storage_path, partition_dir, write)
+        return True
+
+    def refresh_sidecar(self, storage_path):
+        """
+        Rewrites the Arrow IPC sidecar of a dataset from its Parquet files when arrow_sidecar is enabled.
+
+        Without arrow_sidecar, a sidecar left by an earlier run is removed, as it no longer matches the dataset.
+
+        Parameters:
+        -----------
+        storage_path : str
+            Path of the dataset.
+        """
+        if self.arrow_sidecar:
+            write_sidecar(storage_path)
+            return
+        for name in (SIDECAR_MANIFEST, SIDECAR_FILE):
+            path = os.path.join(storage_path, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def compact_dataset(self, storage_path, partition_dirs=None):
+        """
+        Compacts the partitions of a dataset when the write profile enables compaction.
+
+        Parameters:
+        -----------
+        storage_path : str
+            Path of the dataset.
+        partition_dirs : list, optional
+            Names of the partition directories to compact, every visible partition when None.
+        """
+        if not self.write_profile.compact or not os.path.isdir(storage_path):
+            return
+        if partition_dirs is None:
+            partition_dirs = [name for name in os.listdir(storage_path)
+                              if not name.startswith(('.', '_')) and os.path.isdir(os.path.join(storage_path, name))]
+        partition_dirs = [name for name in partition_dirs if os.path.isdir(os.path.join(storage_path, name))]
+        compacted = sum(self.compact_partition(storage_path, name) for name in sorted(partition_dirs))
+        logging.info(f"{storage_path}: compacted {compacted}/{len(partition_dirs)} partition(s)")
+
+    def export_order(self, query, columns_query=None):
+        """
+        Orders a query by the write profile sort columns it returns, when the profile compacts.
+
+        Exported in that order, partitions are written already sorted and compaction skips them instead of
+        rewriting every partition of a full export a second time. Text is ordered with the database collation,
+        which can differ from the byte order used by Arrow, such partitions are found unsorted and compacted.
+
+        Parameters:
+        -----------
+        query : str
+            SQL query to export.
+        columns_query : str, optional
+            Query without parameters returning the columns of query, query itself when None.
+
+        Returns:
+        --------
+        str
+            The ordered query, or the query itself when there is nothing to order by.
+        """
+        if not self.write_profile.compact or not self.write_profile.sort_columns:
+            return query
+        columns_query = query if columns_query is None else columns_query
+        columns = self.read_data(QUERY_COLUMNS_QUERY.format(query=strip_query(columns_query))).columns
+        order_by = [column for column in self.write_profile.sort_columns if column in columns]
+        if not order_by:
+            return query
+        return SORTED_EXPORT_QUERY.format(query=strip_query(query),
+                                          order_by=', '.join(f'"{column}"' for column in order_by))
+
+    @staticmethod
+    def add_partition_date(df):
+        """
+        Adds the monthly partition_date column (e.g. '2024-01') derived from visit_date.
+
+        Parameters:
+        -----------
+        df : DataFrame
+            Data with a visit_date column, modified in place.
+
+        Returns:
+        --------
+        DataFrame
+            The same DataFrame, with visit_date converted to datetime.
         """
-        df = self.read_data(TRANSFORM_FACILITY_TYPE_AVG_TIME_SPENT_PER_VISIT_DATE_SQL)
         df['visit_date'] = pd.to_datetime(df['visit_date'])
         df['partition_date'] = df['visit_date'].dt.to_period('M').astype(str)
-        self.to_parquet(
-            df=df,
-            storage_path=self.storage_path_facility_type_avg_time_spent_per_visit_date,
-            partition_columns=['partition_date']
+        return df
+
+    @staticmethod
+    def add_partition_date_batch(batch):
+        """
+        Arrow counterpart of add_partition_date, computed with Arrow compute kernels.
+
+        Parameters:
+        -----------
+        batch : pyarrow.RecordBatch
+            Data with a visit_date column.
+
+        Returns:
+        --------
+        pyarrow.RecordBatch
+            The batch with visit_date cast to timestamp[ns] (as pandas writes it) and a partition_date column.
+        """
+        visit_date = pc.cast(batch.column('visit_date'), pa.timestamp('ns'))
+        batch = batch.set_column(batch.schema.get_field_index('visit_date'), 'visit_date', visit_date)
+        return batch.append_column('partition_date', pc.strftime(visit_date, format='%Y-%m'))
+
+    @staticmethod
+    def add_facility_type_partition_batch(batch):
+        """
+        Adds the facility_type_partition column, facility_type with spaces replaced by underscores.
+
+        Parameters:
+        -----------
+        batch : pyarrow.RecordBatch
+            Data with a facility_type column.
+
+        Returns:
+        --------
+        pyarrow.RecordBatch
+            The batch with a facility_type_partition column.
+        """
+        return batch.append_column('facility_type_partition',
+                                   pc.replace_substring(batch.column('facility_type'), ' ', '_'))
+
+    def export_by_month(self, query, storage_path):
+        """
+        Exports a visit_date query to a dataset partitioned by partition_date.
+
+        The export is tracked by a watermark on visits.id in parquet_export_watermarks, see ensure_control_tables.
+        Without a watermark, without the dataset or without incremental_export, the full query result is written.
+        Otherwise only the months that received visits since the watermark are recomputed, by filtering the query
+        on their visit_date range, and their partitions are replaced. The written partitions are then compacted
+        when the write profile enables it, and the Arrow sidecar is refreshed. Queries are ordered by export_order,
+        so only partitions left out of the profile layout are rewritten. The watermark is moved after the
+        files are written, so a failed run is simply redone by the next one.
+
+        Parameters:
+        -----------
+        query : str
+            TRANSFORM_*_SQL query returning a visit_date column.
+        storage_path : str
+            Path of the dataset, also used as the export name.
+        """
+        self.ensure_control_tables()
+        max_visit_id = int(self.read_data(GET_MAX_VISIT_ID_QUERY)['max_visit_id'].iloc[0])
+        last_visit_id = self.get_export_watermark(storage_path) if self.incremental_export else None
+
+        if last_visit_id is None or not os.path.isdir(storage_path):
+            full_query = self.export_order(query)
+            if self.arrow_native:
+                with self.read_batches(full_query) as reader:
+                    self.write_batches(self.map_batches(reader, self.add_partition_date_batch),
+                                       storage_path, ['partition_date'])
+            else:
+                self.to_parquet(
+                    df=self.add_partition_date(self.read_data(full_query)),
+                    storage_path=storage_path,
+                    partition_columns=['partition_date']
+                )
+            self.compact_dataset(storage_path)
+        else:
+            months = self.read_data(GET_CHANGED_VISIT_MONTHS_QUERY,
+                                    {'last_visit_id': last_visit_id, 'max_visit_id': max_visit_id})
+            month_query = self.export_order(MONTH_SLICE_QUERY.format(query=strip_query(query)), columns_query=query)
+            partition_dirs = []
+            for month_start in pd.to_datetime(months['month_start']):
+                params = {
+                    'month_start': month_start.date(),
+                    'month_end': (month_start + pd.offsets.MonthBegin(1)).date()
+                }
+                if self.arrow_native:
+                    with self.read_batches(month_query, params) as reader:
+                        self.replace_partition(self.map_batches(reader, self.add_partition_date_batch),
+                                               storage_path, 'partition_date', month_start.strftime('%Y-%m'))
+                else:
+                    self.replace_partition(self.add_partition_date(self.read_data(month_query, params)),
+                                           storage_path, 'partition_date', month_start.strftime('%Y-%m'))
+                partition_dirs.append(f"partition_date={month_start:%Y-%m}")
+            logging.info(f"{storage_path}: rewrote {len(months)} changed partition(s)")
+            self.compact_dataset(storage_path, partition_dirs)
+        self.refresh_sidecar(storage_path)
+
+        self.execute(UPDATE_PARQUET_EXPORT_WATERMARK_QUERY,
+                     {'export_name': storage_path, 'last_visit_id': max_visit_id})
+
+    def transform_facility_type_avg_time_spent_per_visit_date(self):
+        """
+        Transforms data for facility type average time spent per visit date and writes it to a Parquet file.
+        """
+        self.export_by_month(
+            query=TRANSFORM_FACILITY_TYPE_AVG_TIME_SPENT_PER_VISIT_DATE_SQL,
+            storage_path=self.storage_path_facility_type_avg_time_spent_per_visit_date
         )
 
     # TODO: do better approach for: df['facility_type_partition'] = df['facility_type'] - workaround,
@@ -118,31 +712,90 @@ class LoadParquet:
         """
         Transforms data for patient sum treatment cost per facility type and writes it to a Parquet file.
         """
-        df = self.read_data(TRANSFORM_PATIENT_SUM_TREATMENT_COST_PER_FACILITY_TYPE_SQL)
-        df['facility_type_partition'] = df['facility_type'].str.replace(" ", "_")
-        self.to_parquet(
-            df=df,
-            storage_path=self.storage_path_patient_sum_treatment_cost_per_facility_type,
-            partition_columns=['facility_type_partition']
-        )
+        query = self.export_order(TRANSFORM_PATIENT_SUM_TREATMENT_COST_PER_FACILITY_TYPE_SQL)
+        if self.arrow_native:
+            with self.read_batches(query) as reader:
+                self.write_batches(self.map_batches(reader, self.add_facility_type_partition_batch),
+                                   self.storage_path_patient_sum_treatment_cost_per_facility_type,
+                                   ['facility_type_partition'])
+        else:
+            df = self.read_data(query)
+            df['facility_type_partition'] = df['facility_type'].str.replace(" ", "_")
+            self.to_parquet(
+                df=df,
+                storage_path=self.storage_path_patient_sum_treatment_cost_per_facility_type,
+                partition_columns=['facility_type_partition']
+            )
+        self.compact_dataset(self.storage_path_patient_sum_treatment_cost_per_facility_type)
+        self.refresh_sidecar(self.storage_path_patient_sum_treatment_cost_per_facility_type)
 
     def transform_facility_name_min_time_spent_per_visit_date(self):
         """
         Transforms data for facility name minimum time spent per visit date and writes it to a Parquet file.
         """
-        df = self.read_data(TRANSFORM_FACILITY_NAME_MIN_TIME_SPENT_PER_VISIT_DATE_SQL)
-        df['visit_date'] = pd.to_datetime(df['visit_date'])
-        df['partition_date'] = df['visit_date'].dt.to_period('M').astype(str)
-        self.to_parquet(
-            df=df,
-            storage_path=self.storage_path_facility_name_min_time_spent_per_visit_date,
-            partition_columns=['partition_date']
+        self.export_by_month(
+            query=TRANSFORM_FACILITY_NAME_MIN_TIME_SPENT_PER_VISIT_DATE_SQL,
+            storage_path=self.storage_path_facility_name_min_time_spent_per_visit_date
         )
 
+    def run_transform(self, name, concurrent=False):
+        """
+        Runs one transformation and reports its outcome and timing, without raising.
+
+        Parameters:
+        -----------
+        name : str
+            Name of the transform method, one of TRANSFORMS.
+        concurrent : bool, optional
+            Run the transform on a new connection from connection_factory instead of the shared one.
+
+        Returns:
+        --------
+        tuple
+            (name, elapsed seconds, exception or None).
+        """
+        start = time.perf_counter()
+        try:
+            if concurrent:
+                with self.connection_factory() as connection_object:
+                    getattr(LoadParquet(connection_object, self.connection_factory), name)()
+            else:
+                getattr(self, name)()
+            error = None
+        except Exception as e:
+            logging.exception(f"{name} FAILED: {e}")
+            error = e
+        elapsed = time.perf_counter() - start
+        logging.info(f"{name} {'failed' if error else 'completed'} in {elapsed:.2f}s")
+        return name, elapsed, error
+
     def load_parquet(self):
         """
         Executes all transformations and loads the results into Parquet files.
+
+        With transform_workers > 1 the transforms run in a thread pool, each on its own connection,
+        so the wall time is close to the slowest transform. A failing transform does not stop the others.
+
+        Returns:
+        --------
+        dict
+            Elapsed seconds per transform name.
+
+        Raises:
+        -------
+        RuntimeError
+            If any transform failed, once all of them have run.
         """
-        self.transform_facility_type_avg_time_spent_per_visit_date()
-        self.transform_patient_sum_treatment_cost_per_facility_type()
-        self.transform_facility_name_min_time_spent_per_visit_date()
+        # Created once up front, concurrent CREATE TABLE IF NOT EXISTS statements can conflict
+        self.ensure_control_tables()
+
+        if self.transform_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.transform_workers) as executor:
+                results = list(executor.map(lambda name: self.run_transform(name, concurrent=True), TRANSFORMS))
+        else:
+            results = [self.run_transform(name) for name in TRANSFORMS]
+
+        failed = [f"{name}: {error}" for name, _, error in results if error is not None]
+        if failed:
+            raise RuntimeError(f"{len(failed)} transform(s) failed: {'; '.join(failed)}")
+        return {name: elapsed for name, elapsed, _ in results}
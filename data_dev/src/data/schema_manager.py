@@ -0,0 +1,160 @@
+import logging
+
+from data_dev.queries import GET_INDEXES_QUERY, IS_TABLE_PARTITIONED_QUERY, CREATE_MONTHLY_PARTITION_QUERY
+
+
+class SchemaManager:
+    """
+    A class to provision and verify the indexes and partitions of one layer of tables.
+
+    Loaders call defer_indexes before populating tables, load the data, then call create_indexes
+    and verify_indexes. Indexes of tables that are loaded from scratch are dropped first, so the bulk
+    load does not maintain them row by row and they are built once over the loaded data.
+
+    Nothing is committed here, so the caller keeps control of the transaction.
+
+    Attributes:
+        indexes (Dict[str, Dict[str, str]]): Table name -> {index name: CREATE INDEX statement},
+                                             e.g. SRC_GENERATED_INDEXES or NF3_INDEXES from queries.py.
+    """
+
+    def __init__(self, indexes):
+        """
+        Initialize the SchemaManager with the index definitions of a layer.
+
+        Args:
+            indexes (Dict[str, Dict[str, str]]): Table name -> {index name: CREATE INDEX statement}.
+        """
+        self.indexes = indexes
+
+    @staticmethod
+    def is_table_empty(cursor, table_name):
+        """
+        Checks if a given table is empty, without counting its rows.
+
+        Args:
+            cursor (object): A database cursor object.
+            table_name (str): The name of the table to check.
+
+        Returns:
+            bool: True if the table is empty, False otherwise.
+        """
+        cursor.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {table_name})")
+        return cursor.fetchone()[0]
+
+    def get_indexes(self, cursor):
+        """
+        Reads the existing indexes of the managed tables from pg_indexes.
+
+        Args:
+            cursor (object): A database cursor object.
+
+        Returns:
+            Dict[str, str]: Index name -> index definition, for every index of the managed tables.
+        """
+        cursor.execute(GET_INDEXES_QUERY, {'table_names': list(self.indexes)})
+        return {index_name: index_def for _, index_name, index_def in cursor.fetchall()}
+
+    def missing_indexes(self, cursor):
+        """
+        Lists the managed indexes that do not exist yet.
+
+        Args:
+            cursor (object): A database cursor object.
+
+        Returns:
+            List[str]: The names of the missing indexes.
+        """
+        existing = self.get_indexes(cursor)
+        return [index_name for table_indexes in self.indexes.values()
+                for index_name in table_indexes if index_name not in existing]
+
+    def defer_indexes(self, cursor):
+        """
+        Drops the managed indexes of the tables that are empty, before they are bulk loaded.
+
+        Args:
+            cursor (object): A database cursor object.
+
+        Returns:
+            List[str]: The names of the tables whose indexes were deferred.
+        """
+        deferred = []
+        for table_name, table_indexes in self.indexes.items():
+            if self.is_table_empty(cursor, table_name):
+                for index_name in table_indexes:
+                    cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+                deferred.append(table_name)
+        if deferred:
+            logging.info(f"Deferred index creation until after the load of: {', '.join(deferred)}")
+        return deferred
+
+    def create_indexes(self, cursor):
+        """
+        Creates the managed indexes that do not exist yet.
+
+        Args:
+            cursor (object): A database cursor object.
+        """
+        for table_indexes in self.indexes.values():
+            for create_query in table_indexes.values():
+                cursor.execute(create_query)
+
+    def verify_indexes(self, cursor):
+        """
+        Verifies that every managed index exists and that unique indexes are unique.
+
+        Args:
+            cursor (object): A database cursor object.
+
+        Raises:
+            RuntimeError: If an index is missing or does not match its definition.
+        """
+        existing = self.get_indexes(cursor)
+        problems = []
+        for table_indexes in self.indexes.values():
+            for index_name, create_query in table_indexes.items():
+                if index_name not in existing:
+                    problems.append(f"{index_name} is missing")
+                elif ('UNIQUE' in create_query) != existing[index_name].startswith('CREATE UNIQUE INDEX'):
+                    problems.append(f"{index_name} does not match its definition: {existing[index_name]}")
+        if problems:
+            raise RuntimeError(f"Index verification failed: {'; '.join(problems)}")
+
+    @staticmethod
+    def is_partitioned(cursor, table_name):
+        """
+        Checks if a table is a partitioned table.
+
+        Args:
+            cursor (object): A database cursor object.
+            table_name (str): The name of the table to check.
+
+        Returns:
+            bool: True if the table exists and is partitioned, False otherwise.
+        """
+        cursor.execute(IS_TABLE_PARTITIONED_QUERY, {'table_name': table_name})
+        row = cursor.fetchone()
+        return bool(row and row[0])
+
+    @staticmethod
+    def create_monthly_partitions(cursor, table_name, months):
+        """
+        Creates the missing monthly range partitions of a partitioned table.
+
+        Partitions are named <table_name>_pYYYYMM and cover [first day of month, first day of next month).
+        Indexes defined on the partitioned table are created on new partitions by Postgres.
+
+        Args:
+            cursor (object): A database cursor object.
+            table_name (str): The name of the partitioned table.
+            months (List[date]): The first day of every month that needs a partition.
+        """
+        for month_start in months:
+            month_end = month_start.replace(year=month_start.year + month_start.month // 12,
+                                            month=month_start.month % 12 + 1)
+            partition_name = f"{table_name}_p{month_start:%Y%m}"
+            cursor.execute(CREATE_MONTHLY_PARTITION_QUERY.format(partition_name=partition_name, table_name=table_name),
+                           {'month_start': month_start, 'month_end': month_end})
+        if months:
+            logging.info(f"{table_name}: partitions ensured from {months[0]:%Y-%m} to {months[-1]:%Y-%m}")
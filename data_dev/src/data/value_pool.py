@@ -0,0 +1,84 @@
+import logging
+import os
+
+import faker
+import pandas as pd
+
+# Pool column -> Faker provider method used to fill it
+POOL_PROVIDERS = {
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'address': 'address',
+    'company': 'company'
+}
+
+
+def generate_value_pools(fake, size):
+    """
+    Generates one pool of Faker values per entry of POOL_PROVIDERS.
+
+    Faker may return the same value more than once, so a pool holds at most size distinct values.
+
+    Args:
+        fake (Faker): The seeded Faker instance used to fill the pools.
+        size (int): The number of values per pool.
+
+    Returns:
+        DataFrame: A DataFrame with size rows and one column per pool.
+    """
+    return pd.DataFrame({
+        column: [getattr(fake, provider)() for _ in range(size)]
+        for column, provider in POOL_PROVIDERS.items()
+    })
+
+
+def value_pool_path(cache_dir, locale, seed, size):
+    """
+    Builds the cache file path of a set of value pools.
+
+    The Faker version is part of the key, because provider data changes between releases.
+
+    Args:
+        cache_dir (str): The directory holding cached pools.
+        locale (str): The Faker locale of the pools.
+        seed (int): The root seed the pools were generated from.
+        size (int): The number of values per pool.
+
+    Returns:
+        str: The path of the Parquet file holding the pools.
+    """
+    return os.path.join(cache_dir, f"value_pools_{locale}_seed{seed}_size{size}_faker{faker.VERSION}.parquet")
+
+
+def load_value_pools(fake, locale, seed, size, cache_dir=None):
+    """
+    Loads value pools from the on-disk cache, generating and caching them on a miss.
+
+    Pools are only cached for a fixed seed: without one every run is expected to produce new values.
+    The cache file is written to a temporary path and renamed, so concurrent runs never read a partial file.
+
+    Args:
+        fake (Faker): The seeded Faker instance used to fill the pools on a cache miss.
+        locale (str): The Faker locale of fake, part of the cache key.
+        seed (Optional[int]): The root seed fake was derived from, part of the cache key.
+        size (int): The number of values per pool.
+        cache_dir (Optional[str]): The directory holding cached pools, None disables the cache.
+
+    Returns:
+        DataFrame: A DataFrame with size rows and one column per pool, see generate_value_pools.
+    """
+    if cache_dir is None or seed is None:
+        return generate_value_pools(fake, size)
+
+    path = value_pool_path(cache_dir, locale, seed, size)
+    if os.path.exists(path):
+        logging.info(f"Using cached value pools {path}")
+        return pd.read_parquet(path)
+
+    pools = generate_value_pools(fake, size)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pools.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    logging.info(f"Cached value pools to {path}")
+    return pools
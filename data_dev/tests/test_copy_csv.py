@@ -0,0 +1,62 @@
+"""
+Unit tests of the COPY CSV conventions parsed by the Arrow CSV reader (no database needed).
+
+Run from the repository root: python -m pytest data_dev/tests
+"""
+import datetime
+import io
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from data_dev.src.connectors.copy_export import arrow_schema, csv_options
+
+# (name, type OID) of a query returning every mapped type and one unmapped type (interval)
+COLUMNS = [('flag', 16), ('big', 20), ('small', 23), ('ratio', 701), ('amount', 1700), ('day', 1082),
+           ('at', 1114), ('at_tz', 1184), ('label', 25), ('duration', 1186)]
+
+# What COPY (...) TO STDOUT WITH (FORMAT csv) writes for three rows:
+# NULL is an unquoted empty field, an empty string is "", booleans are t / f
+COPY_CSV = (
+    b't,9007199254740993,-5,0.25,1234.56,2024-02-29,2024-02-29 23:59:59.123456,2024-02-29 23:59:59+02,'
+    b'"a, ""quoted""\nvalue",01:30:00\n'
+    b'f,0,0,-1e-05,0.00,1999-12-31,2000-01-01 00:00:00,2000-01-01 00:00:00+00,"",00:00:00\n'
+    b',,,,,,,,,\n'
+)
+
+
+def read_copy_csv(data, columns):
+    read_options, parse_options, convert_options = csv_options(columns)
+    table = pa_csv.read_csv(io.BytesIO(data), read_options=read_options, parse_options=parse_options,
+                            convert_options=convert_options)
+    return table.rename_columns([name for name, _ in columns])
+
+
+def test_copy_csv_types():
+    table = read_copy_csv(COPY_CSV, COLUMNS)
+    assert table.schema == arrow_schema(COLUMNS)
+    assert table.schema.field('at_tz').type == pa.timestamp('us', 'UTC')
+    assert table.schema.field('duration').type == pa.string()  # unmapped types are read as text
+
+    first, second, nulls = table.to_pylist()
+    assert first['flag'] is True and second['flag'] is False
+    assert first['big'] == 9007199254740993  # int8 is not rounded through float
+    assert first['amount'] == 1234.56  # numeric is a float, like pd.read_sql(coerce_float=True)
+    assert first['day'] == datetime.date(2024, 2, 29)
+    assert first['at'] == datetime.datetime(2024, 2, 29, 23, 59, 59, 123456)
+    assert first['at_tz'] == datetime.datetime(2024, 2, 29, 21, 59, 59, tzinfo=datetime.timezone.utc)
+    assert first['label'] == 'a, "quoted"\nvalue'
+    assert first['duration'] == '01:30:00'
+    assert second['ratio'] == -1e-05
+
+
+def test_copy_csv_null_and_empty_string():
+    first, second, nulls = read_copy_csv(COPY_CSV, COLUMNS).to_pylist()
+    assert second['label'] == ''
+    assert all(value is None for value in nulls.values())
+
+
+def test_copy_csv_single_column_null_rows():
+    # A NULL in a single column result is an empty line, it must not be skipped
+    table = read_copy_csv(b'a\n\n"b\nc"\n""\n', [('label', 25)])
+    assert table.column('label').to_pylist() == ['a', None, 'b\nc', '']
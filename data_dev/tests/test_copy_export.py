@@ -0,0 +1,129 @@
+"""
+Unit tests of the COPY based export, with a stub cursor in place of psycopg2 (no database needed).
+
+Run from the repository root: python -m pytest data_dev/tests
+"""
+import threading
+
+import psycopg2
+import pyarrow as pa
+import pytest
+
+from data_dev.config import postgres_pool_config
+from data_dev.src.connectors.copy_export import copy_query_to_batches
+from data_dev.src.connectors.postgre_connector import PostgresConnectorContextManager
+
+COLUMNS = [('visit_id', 23), ('address', 25)]
+
+
+def copy_rows(count, start=0):
+    # COPY CSV of (visit_id, address), addresses span two lines like Faker's
+    return ''.join(f'{i},"{i} Main Street\nApt {i}"\n' for i in range(start, start + count)).encode()
+
+
+class StubCursor:
+    """Plays the part of a psycopg2 cursor: describes COLUMNS and writes chunks to the COPY output file"""
+
+    def __init__(self, chunks, error=None, columns=COLUMNS):
+        self.chunks = chunks
+        self.error = error
+        self.description = [(name, oid) for name, oid in columns]
+        self.copy_finished = threading.Event()
+        self.broken_pipe = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params=None):
+        pass
+
+    def copy_expert(self, statement, file):
+        try:
+            for chunk in self.chunks:
+                file.write(chunk)
+            file.flush()
+            if self.error is not None:
+                raise self.error
+        except BrokenPipeError:
+            # what psycopg2 sees when the reader closed the pipe
+            self.broken_pipe = True
+            raise psycopg2.OperationalError('could not write COPY data: broken pipe')
+        finally:
+            self.copy_finished.set()
+
+
+def test_full_read_with_multi_line_values():
+    cursor = StubCursor([copy_rows(20000), copy_rows(20000, start=20000)])
+    with copy_query_to_batches(cursor, 'SELECT ...', block_size=64 * 1024) as reader:
+        table = reader.read_all()
+
+    assert table.schema == pa.schema([('visit_id', pa.int64()), ('address', pa.string())])
+    assert table.num_rows == 40000
+    assert table.column('visit_id').to_pylist() == list(range(40000))
+    assert table.column('address')[12345].as_py() == '12345 Main Street\nApt 12345'
+
+
+def test_empty_result():
+    cursor = StubCursor([])
+    with copy_query_to_batches(cursor, 'SELECT ...') as reader:
+        table = reader.read_all()
+    assert table.num_rows == 0
+    assert table.schema.names == ['visit_id', 'address']
+
+
+def test_stopping_early_ends_the_copy():
+    # much more data than the pipe buffer, COPY blocks until the reader is closed
+    cursor = StubCursor([copy_rows(1000, start=i * 1000) for i in range(200)])
+    with copy_query_to_batches(cursor, 'SELECT ...', block_size=64 * 1024) as reader:
+        first = reader.read_next_batch()
+    assert first.num_rows > 0
+    # leaving the block closed the pipe and waited for COPY, without raising its broken pipe error
+    assert cursor.copy_finished.is_set()
+    assert cursor.broken_pipe
+
+
+def test_copy_error_mid_stream_is_raised():
+    cursor = StubCursor([copy_rows(5000), b'5000,"unterminated'],
+                        error=psycopg2.errors.QueryCanceled('canceling statement due to statement timeout'))
+    with pytest.raises(psycopg2.errors.QueryCanceled):
+        with copy_query_to_batches(cursor, 'SELECT ...', block_size=16 * 1024) as reader:
+            reader.read_all()
+
+
+class StubConnection:
+    """A connection whose rollback fails, like one left in the COPY OUT state"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.closed = 0
+        self.autocommit = False
+
+    def cursor(self):
+        return self._cursor
+
+    def rollback(self):
+        raise psycopg2.InternalError('unexpected state: COPY OUT in progress')
+
+    def close(self):
+        self.closed = 1
+
+
+def test_consumer_error_is_not_hidden_by_rollback(monkeypatch):
+    # The consumer (e.g. the Parquet write) fails mid-COPY: its error is raised, not the rollback error,
+    # and the connection that can not be rolled back is replaced
+    monkeypatch.setattr(postgres_pool_config, 'reconnect_delay', 0.0)
+    broken = StubConnection(StubCursor([copy_rows(1000, start=i * 1000) for i in range(200)]))
+    replacement = StubConnection(StubCursor([]))
+    connector = PostgresConnectorContextManager()
+    connector.connection = broken
+    monkeypatch.setattr(connector, '_connect', lambda: replacement)
+
+    with pytest.raises(OSError, match='disk full'):
+        with connector.get_data_arrow('SELECT ...', block_size=64 * 1024) as reader:
+            reader.read_next_batch()
+            raise OSError('disk full')
+    assert broken.closed
+    assert connector.get_connection() is replacement
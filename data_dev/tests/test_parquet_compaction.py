@@ -0,0 +1,142 @@
+"""
+Unit tests of the LoadParquet compaction decisions on local datasets (no database needed).
+
+Run from the repository root: python -m pytest data_dev/tests
+"""
+import dataclasses
+import datetime
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from data_dev.src.data.parquet_loader import COMPACTION_METADATA_KEY, LoadParquet
+
+PROFILE = dict(compression='zstd', compression_level=3, row_group_size=1000, max_rows_per_file=1000,
+               sort_columns=['visit_date', 'facility_type'], dictionary_columns=None, compact=True)
+
+
+class StubConnector:
+    """Answers read_data with the columns of QUERY_COLUMNS_QUERY and records the queries."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.queries = []
+
+    def get_data_sql(self, query, params=None):
+        self.queries.append(query)
+        return pd.DataFrame(columns=self.columns)
+
+
+def make_loader(**profile):
+    loader = LoadParquet(StubConnector(['facility_type', 'visit_date', 'avg_time_spent']))
+    loader.write_profile = dataclasses.replace(loader.write_profile, **{**PROFILE, **profile})
+    return loader
+
+
+def visits(days, facility_types):
+    return pa.table({
+        'facility_type': facility_types,
+        'visit_date': [datetime.date(2024, 1, 1) + datetime.timedelta(days=day) for day in days],
+        'avg_time_spent': [float(day) for day in days],
+        'partition_date': ['2024-01'] * len(days)
+    })
+
+
+def write(loader, path, table):
+    loader.write_batches(pa.RecordBatchReader.from_batches(table.schema, table.to_batches(max_chunksize=7)),
+                         str(path), ['partition_date'])
+    return snapshot(path)
+
+
+def snapshot(path):
+    partition = os.path.join(path, 'partition_date=2024-01')
+    return {name: os.stat(os.path.join(partition, name)).st_mtime_ns for name in os.listdir(partition)}
+
+
+def read_partition(path):
+    return pq.read_table(os.path.join(path, 'partition_date=2024-01'))
+
+
+def test_sorted_export_is_not_compacted_again(tmp_path):
+    loader = make_loader()
+    days = sorted(list(range(30)) * 2)
+    files = write(loader, tmp_path, visits(days, ['Clinic', 'Hospital'] * 30))
+
+    loader.compact_dataset(str(tmp_path))
+
+    assert snapshot(tmp_path) == files
+
+
+def test_unsorted_export_is_compacted(tmp_path):
+    loader = make_loader()
+    files = write(loader, tmp_path, visits([3, 1, 2, 0], ['Clinic'] * 4))
+
+    loader.compact_dataset(str(tmp_path))
+
+    assert snapshot(tmp_path).keys() != files.keys()
+    table = read_partition(tmp_path)
+    assert table.column('avg_time_spent').to_pylist() == [0.0, 1.0, 2.0, 3.0]
+    assert table.schema.metadata[COMPACTION_METADATA_KEY] == loader.compaction_signature()
+
+
+def test_ties_are_sorted_by_the_next_column(tmp_path):
+    loader = make_loader()
+    write(loader, tmp_path, visits([0, 0, 1], ['Hospital', 'Clinic', 'Clinic']))
+
+    loader.compact_dataset(str(tmp_path))
+
+    assert read_partition(tmp_path).column('facility_type').to_pylist() == ['Clinic', 'Hospital', 'Clinic']
+
+
+def test_small_files_are_merged(tmp_path):
+    loader = make_loader(row_group_size=10, max_rows_per_file=10)
+    days = list(range(25))
+    write(loader, tmp_path, visits(days, ['Clinic'] * 25))
+    # two more files than the 3 a compaction writes for 25 rows
+    partition = os.path.join(tmp_path, 'partition_date=2024-01')
+    pq.write_table(visits([25], ['Clinic']).drop_columns(['partition_date']), os.path.join(partition, 'z-0.parquet'))
+    pq.write_table(visits([26], ['Clinic']).drop_columns(['partition_date']), os.path.join(partition, 'z-1.parquet'))
+
+    loader.compact_dataset(str(tmp_path))
+
+    assert len(os.listdir(partition)) == 3
+    assert read_partition(tmp_path).column('avg_time_spent').to_pylist() == [float(day) for day in range(27)]
+
+
+def test_profile_change_recompacts_sorted_partitions(tmp_path):
+    loader = make_loader()
+    write(loader, tmp_path, visits([3, 1, 2, 0], ['Clinic'] * 4))
+    loader.compact_dataset(str(tmp_path))
+    compacted = snapshot(tmp_path)
+
+    loader.compact_dataset(str(tmp_path))
+    assert snapshot(tmp_path) == compacted
+
+    loader = make_loader(compression='snappy', compression_level=None)
+    loader.compact_dataset(str(tmp_path))
+    assert snapshot(tmp_path).keys() != compacted.keys()
+    assert read_partition(tmp_path).schema.metadata[COMPACTION_METADATA_KEY] == loader.compaction_signature()
+
+
+@pytest.mark.parametrize('profile, ordered', [({}, True), ({'compact': False}, False), ({'sort_columns': []}, False),
+                                              ({'sort_columns': ['full_name']}, False)])
+def test_export_order(profile, ordered):
+    loader = make_loader(**profile)
+    query = loader.export_order('SELECT facility_type, visit_date, avg_time_spent FROM visit_stats;')
+    if ordered:
+        assert query.strip().endswith('ORDER BY "visit_date", "facility_type"')
+        assert 'LIMIT 0' in loader.connection_object.queries[0]
+    else:
+        assert query == 'SELECT facility_type, visit_date, avg_time_spent FROM visit_stats;'
+
+
+def test_export_order_reads_the_columns_of_the_unparametrized_query():
+    loader = make_loader()
+    month_query = 'SELECT * FROM (SELECT 1) AS q WHERE visit_date >= %(month_start)s'
+    query = loader.export_order(month_query, columns_query='SELECT 1;')
+
+    assert '%(month_start)s' not in loader.connection_object.queries[0]
+    assert month_query in query
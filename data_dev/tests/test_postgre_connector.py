@@ -0,0 +1,206 @@
+"""
+Unit tests of the pooled Postgres connector, with psycopg2 mocked out (no database needed).
+
+Run from the repository root: python -m pytest data_dev/tests
+"""
+import pandas as pd
+import psycopg2
+import pytest
+
+from data_dev.config import postgres_pool_config
+from data_dev.src.connectors import postgre_connector
+from data_dev.src.connectors.postgre_connector import (
+    PostgresConnectionPool,
+    PostgresConnectorContextManager,
+    retry_on_connection_error
+)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            self.conn.closed = 2
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+
+
+class FakeConnection:
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.closed = 0
+        self.autocommit = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeThreadedConnectionPool:
+    """Stands in for psycopg2's ThreadedConnectionPool, hands out the queued connections first"""
+    queued = []
+
+    def __init__(self, min_connections, max_connections, **kwargs):
+        self.idle = []
+        self.opened = 0
+        self.discarded = []
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        self.opened += 1
+        return self.queued.pop(0) if self.queued else FakeConnection()
+
+    def putconn(self, conn, close=False):
+        if close:
+            self.discarded.append(conn)
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(postgres_pool_config, 'reconnect_attempts', 2)
+    monkeypatch.setattr(postgres_pool_config, 'reconnect_delay', 0.0)
+    monkeypatch.setattr(postgres_pool_config, 'health_check', True)
+    monkeypatch.setattr(postgres_pool_config, 'checkout_timeout', 0.05)
+    monkeypatch.setattr(postgre_connector, 'ThreadedConnectionPool', FakeThreadedConnectionPool)
+    FakeThreadedConnectionPool.queued = []
+
+
+def test_retry_on_connection_error_retries_then_succeeds():
+    calls = []
+
+    def action():
+        calls.append(1)
+        if len(calls) < 3:
+            raise psycopg2.OperationalError('could not connect to server')
+        return 'connected'
+
+    assert retry_on_connection_error(action, 'Connecting') == 'connected'
+    assert len(calls) == 3
+
+
+def test_retry_on_connection_error_gives_up():
+    calls = []
+
+    def action():
+        calls.append(1)
+        raise psycopg2.OperationalError('could not connect to server')
+
+    with pytest.raises(psycopg2.OperationalError):
+        retry_on_connection_error(action, 'Connecting')
+    assert len(calls) == postgres_pool_config.reconnect_attempts + 1
+
+
+def test_retry_on_connection_error_does_not_retry_query_errors():
+    calls = []
+
+    def action():
+        calls.append(1)
+        raise psycopg2.ProgrammingError('syntax error')
+
+    with pytest.raises(psycopg2.ProgrammingError):
+        retry_on_connection_error(action, 'Querying')
+    assert len(calls) == 1
+
+
+def test_checkout_waits_then_times_out():
+    pool = PostgresConnectionPool(max_connections=1)
+    conn = pool.getconn()
+    with pytest.raises(TimeoutError):
+        pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_health_check_replaces_broken_connection():
+    FakeThreadedConnectionPool.queued = [FakeConnection(broken=True)]
+    pool = PostgresConnectionPool(max_connections=1)
+    conn = pool.getconn()
+    assert not conn.broken
+    assert len(pool._pool.discarded) == 1
+
+
+def test_failed_checkout_releases_its_slot():
+    FakeThreadedConnectionPool.queued = [FakeConnection(broken=True) for _ in range(6)]
+    pool = PostgresConnectionPool(max_connections=1)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    # the slot was given back, the next checkout gets a healthy connection
+    assert not pool.getconn().broken
+
+
+def test_connector_checks_out_and_returns_connection():
+    pool = PostgresConnectionPool(max_connections=1)
+    with pool.connector(autocommit=True) as connector:
+        conn = connector.get_connection()
+        assert conn.autocommit
+    assert connector.get_connection() is None
+    assert pool._pool.idle == [conn]
+
+
+def test_read_is_retried_on_lost_connection():
+    pool = PostgresConnectionPool(max_connections=1)
+    with pool.connector() as connector:
+        first = connector.get_connection()
+        calls = []
+
+        def read():
+            calls.append(connector.get_connection())
+            if len(calls) == 1:
+                first.closed = 2
+                # pandas wraps the driver error, the psycopg2 error is its cause
+                raise pd.errors.DatabaseError('Execution failed') from psycopg2.OperationalError('connection lost')
+            return 'rows'
+
+        assert connector._with_reconnect(read) == 'rows'
+        assert calls[1] is not first
+        assert first in pool._pool.discarded
+
+
+def test_query_error_is_not_retried():
+    with PostgresConnectionPool(max_connections=1).connector() as connector:
+        calls = []
+
+        def read():
+            calls.append(1)
+            raise psycopg2.ProgrammingError('syntax error')
+
+        with pytest.raises(psycopg2.ProgrammingError):
+            connector._with_reconnect(read)
+        assert len(calls) == 1
+
+
+def test_failed_reconnect_raises_the_connection_error(monkeypatch):
+    connector = PostgresConnectorContextManager()
+    connector.connection = FakeConnection()
+
+    def connect(**kwargs):
+        raise psycopg2.OperationalError('could not connect to server')
+
+    monkeypatch.setattr(postgre_connector.psycopg2, 'connect', connect)
+
+    def read():
+        connector.connection.closed = 2
+        raise psycopg2.OperationalError('connection lost')
+
+    # not an AttributeError on the released connection
+    with pytest.raises(psycopg2.OperationalError, match='could not connect'):
+        connector._with_reconnect(read)
+    assert connector.connection is None